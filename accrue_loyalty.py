@@ -0,0 +1,45 @@
+# accrue_loyalty.py
+
+# Awards Falconflyer miles for checked-in bookings on departed flights that
+# haven't earned yet (see services/loyalty.py). Safe to run as often as you
+# like, e.g. from cron every few minutes:
+#     python accrue_loyalty.py
+#     python accrue_loyalty.py --flight-id 12 --flight-id 13
+import argparse
+import json
+import time
+from datetime import datetime
+
+from database import SessionLocal
+# Import all models to ensure they are registered
+from models.user import UserModel
+from models.flight import FlightModel
+from models.booking import BookingModel
+from models.aircraft import AircraftModel
+from models.airport import AirportModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from services.loyalty import ACCRUAL_CHUNK_SIZE, accrue_pending
+
+parser = argparse.ArgumentParser(description="Award loyalty miles for checked-in bookings")
+parser.add_argument("--flight-id", type=int, action="append", help="Only these flights (departed or not)")
+parser.add_argument("--departed-before", type=datetime.fromisoformat,
+                    help="Flights departing up to this time (default: now, unless --flight-id is given)")
+parser.add_argument("--chunk-size", type=int, default=ACCRUAL_CHUNK_SIZE)
+parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+args = parser.parse_args()
+
+departed_before = args.departed_before or (None if args.flight_id else datetime.now())
+
+try:
+    start = time.perf_counter()
+    with SessionLocal() as db:
+        report = accrue_pending(db, flight_ids=args.flight_id, departed_before=departed_before, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(f"Awarded {report.miles} miles and {report.points} points for {report.bookings} bookings "
+              f"to {len(report.user_ids)} members in {elapsed:.1f}s, {len(report.tier_changes)} tier changes")
+except Exception as e:
+    print("An error occurred:", e)
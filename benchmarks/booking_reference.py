@@ -0,0 +1,82 @@
+# =============================================================================
+# BOOKING REFERENCE BENCHMARK - Cost per reference as the count grows
+# =============================================================================
+# Allocates millions of booking references from a throwaway SQLite database and
+# reports the time per reference for each million. The cost should stay flat:
+# there is no per-reference query, only one UPDATE per block.
+#
+#     python -m benchmarks.booking_reference [--count 3000000] [--block-size 1000] [--json]
+
+import argparse
+import json
+import time
+
+from sqlalchemy import create_engine
+from models.sequence import SequenceModel
+from services.booking_reference import ALPHABET, CAPACITY, BookingReferenceAllocator
+
+CHUNK = 1_000_000
+
+
+def decode_payload(reference: str) -> int:
+    """The 30-bit number behind a reference (without the check character)"""
+    number = 0
+    for char in reference[:-1]:
+        number = number * 32 + ALPHABET.index(char)
+    return number
+
+
+def run(count: int, block_size: int) -> dict:
+    engine = create_engine("sqlite://")
+    SequenceModel.__table__.create(bind=engine)
+    allocator = BookingReferenceAllocator(block_size=block_size)
+
+    seen = bytearray(CAPACITY // 8)  # One bit per possible reference
+    duplicates = 0
+    chunks = []
+    # The first reference reserves the first block, which reads the permutation
+    # key, and builds that key's lookup tables. Both stay outside the timed loop.
+    number = decode_payload(allocator.next(engine))
+    seen[number >> 3] |= 1 << (number & 7)
+    done = 1
+    while done < count:
+        size = min(CHUNK - done % CHUNK, count - done)
+        start = time.perf_counter()
+        references = [allocator.next(engine) for _ in range(size)]
+        elapsed = time.perf_counter() - start
+        for reference in references:
+            number = decode_payload(reference)
+            if seen[number >> 3] & (1 << (number & 7)):
+                duplicates += 1
+            seen[number >> 3] |= 1 << (number & 7)
+        done += size
+        chunks.append({
+            "references_so_far": done,
+            "ns_per_reference": round(elapsed / size * 1e9, 1),
+        })
+
+    return {
+        "benchmark": "booking_reference",
+        "count": count,
+        "block_size": block_size,
+        "database_round_trips": allocator.blocks_reserved,
+        "duplicates": duplicates,
+        "chunks": chunks,
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Booking reference allocation benchmark")
+    parser.add_argument("--count", type=int, default=3 * CHUNK)
+    parser.add_argument("--block-size", type=int, default=1000)
+    parser.add_argument("--json", action="store_true", help="Print the results as JSON")
+    args = parser.parse_args()
+
+    results = run(args.count, args.block_size)
+    if args.json:
+        print(json.dumps(results, indent=2))
+    else:
+        print(f"{results['count']:,} references, {results['database_round_trips']:,} database round trips, "
+              f"{results['duplicates']} duplicates")
+        for chunk in results["chunks"]:
+            print(f"  up to {chunk['references_so_far']:>12,}: {chunk['ns_per_reference']:>8} ns/reference")
@@ -0,0 +1,350 @@
+# =============================================================================
+# LOAD BENCHMARK - Throughput, latency and correctness under concurrency
+# =============================================================================
+# Drives the FastAPI app from main.py in process over ASGI (no server, no
+# network) against a throwaway database seeded with data/synthetic.py:
+#   search   - flight list pages and route searches
+#   booking  - many users booking random seats on the same flight at once
+#   login    - a burst of /auth/login calls (bcrypt worker pool)
+#   checkin  - a burst of check-ins, every booking sent twice
+# Each scenario reports p50/p95/p99 latency, requests/sec and status codes.
+# The booking and check-in scenarios also count oversold flights, double-booked
+# seats and double check-ins, which must always be 0.
+#
+#     python -m benchmarks.load [--scenarios search,booking] [--concurrency 32] [--json results.json]
+#
+# By default it uses a new SQLite file in a temp directory. --database-url points
+# it at another database (e.g. a Postgres stand-in), WHICH IT WIPES AND RESEEDS.
+
+import argparse
+import asyncio
+import json
+import os
+import platform
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime, timezone
+
+SCENARIOS = ("search", "booking", "login", "checkin")
+
+
+# =============================================================================
+# MEASURING
+# =============================================================================
+
+def percentile(sorted_values: list, fraction: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(fraction * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+class Recorder:
+    """Latency and status code of every request in one scenario"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.latencies = []
+        self.statuses = Counter()
+        self.started = self.finished = 0.0
+        self.checks = {}
+
+    async def request(self, client, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        response = await client.request(method, url, **kwargs)
+        self.latencies.append(time.perf_counter() - start)
+        self.statuses[response.status_code] += 1
+        return response
+
+    def as_dict(self) -> dict:
+        values = sorted(self.latencies)
+        elapsed = self.finished - self.started
+        return {
+            "requests": len(values),
+            "seconds": round(elapsed, 4),
+            "requests_per_second": round(len(values) / elapsed, 1) if elapsed else 0.0,
+            "latency_ms": {
+                "p50": round(percentile(values, 0.50) * 1000, 3),
+                "p95": round(percentile(values, 0.95) * 1000, 3),
+                "p99": round(percentile(values, 0.99) * 1000, 3),
+                "mean": round(sum(values) / len(values) * 1000, 3) if values else 0.0,
+                "max": round(values[-1] * 1000, 3) if values else 0.0,
+            },
+            "status_codes": {str(code): count for code, count in sorted(self.statuses.items())},
+            "checks": self.checks,
+        }
+
+
+async def run_all(recorder: Recorder, jobs: list, concurrency: int) -> None:
+    """Run coroutine factories with at most `concurrency` in flight, timing the whole batch"""
+    queue = list(reversed(jobs))
+
+    async def worker():
+        while queue:
+            await queue.pop()()
+
+    recorder.started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(min(concurrency, len(jobs)))))
+    recorder.finished = time.perf_counter()
+
+
+# =============================================================================
+# SETUP
+# =============================================================================
+
+def use_database(url: str) -> None:
+    """Point the app at the benchmark database. Must run before main/database are imported."""
+    from config import environment
+    environment.db_URI = url
+
+
+def seed(args) -> None:
+    from database import engine
+    from models.base import Base
+    from migrations import mark_all_applied
+    from data.synthetic import generate
+    import main  # noqa: F401 - registers every model
+
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    mark_all_applied(engine)
+    generate(engine, users=args.users, flights=args.flights, bookings=args.seed_bookings, seed=args.seed)
+
+
+async def log_in(client, usernames: list) -> dict:
+    """Bearer headers for some users, logged in before anything is timed"""
+    from data.synthetic import SYNTHETIC_PASSWORD
+    headers = {}
+    for username in usernames:
+        response = await client.post("/auth/login", json={"username": username, "password": SYNTHETIC_PASSWORD})
+        response.raise_for_status()
+        headers[username] = {"Authorization": f"Bearer {response.json()['token']}"}
+    return headers
+
+
+# =============================================================================
+# SCENARIOS
+# =============================================================================
+
+async def scenario_search(client, args, rng, tokens) -> Recorder:
+    from data.gulf_air_flights import GULF_AIR_ROUTES
+    from dependencies.pagination import encode_cursor
+    recorder = Recorder("search")
+    jobs = []
+    for _ in range(args.requests):
+        if rng.random() < 0.5:
+            route = rng.choice(GULF_AIR_ROUTES)
+            url = f"/api/flights/search/{route['from']}/{route['to']}"
+        else:
+            url = f"/api/flights?limit=50&after={encode_cursor(rng.randint(1, args.flights))}"
+        jobs.append(lambda url=url: recorder.request(client, "GET", url))
+    await run_all(recorder, jobs, args.concurrency)
+    return recorder
+
+
+async def scenario_booking(client, args, rng, tokens) -> Recorder:
+    """Everyone books the same flight: more attempts than seats, many on the same seat"""
+    from sqlalchemy import func, select
+    from database import engine
+    from models.aircraft import AircraftModel
+    from models.booking import BookingModel, LIVE_BOOKING_STATUSES
+    from models.flight import FlightModel
+    from data.synthetic import cabin_seats
+
+    with engine.connect() as connection:
+        flight = connection.execute(
+            select(FlightModel.id, AircraftModel.aircraft_type, AircraftModel.economy_seats, AircraftModel.business_seats)
+            .join(AircraftModel, AircraftModel.id == FlightModel.aircraft_id)
+            .order_by(AircraftModel.economy_seats + AircraftModel.business_seats, FlightModel.id.desc())
+        ).first()
+        already = connection.execute(select(func.count()).where(
+            BookingModel.flight_id == flight.id, BookingModel.booking_status.in_(LIVE_BOOKING_STATUSES)
+        )).scalar()
+    seats = cabin_seats(flight.aircraft_type, flight.business_seats, flight.economy_seats)
+    attempts = max(args.requests, 2 * len(seats))
+
+    recorder = Recorder("booking")
+    headers = list(tokens.values())
+    jobs = []
+    for index in range(attempts):
+        seat_number, seat_class = rng.choice(seats)
+        body = {
+            "flight_id": flight.id, "passenger_name": f"Load Test {index}", "passenger_email": "load@example.com",
+            "passport_number": f"L{index:07d}", "seat_class": seat_class, "seat_number": seat_number, "total_price": 1.0,
+        }
+        jobs.append(lambda body=body, auth=rng.choice(headers): recorder.request(
+            client, "POST", "/api/bookings", json=body, headers=auth))
+    await run_all(recorder, jobs, args.concurrency)
+
+    # Correctness: no seat sold twice, counters match the bookings, never below zero
+    with engine.connect() as connection:
+        live = (BookingModel.flight_id == flight.id) & BookingModel.booking_status.in_(LIVE_BOOKING_STATUSES)
+        double_booked = connection.execute(
+            select(func.count()).select_from(
+                select(BookingModel.seat_number).where(live).group_by(BookingModel.seat_number)
+                .having(func.count() > 1).subquery()
+            )
+        ).scalar()
+        booked = dict(connection.execute(
+            select(BookingModel.seat_class, func.count()).where(live).group_by(BookingModel.seat_class)
+        ).all())
+        counters = connection.execute(
+            select(FlightModel.available_economy_seats, FlightModel.available_business_seats)
+            .where(FlightModel.id == flight.id)
+        ).one()
+    mismatched = 0
+    for seat_class, capacity, available in (("economy", flight.economy_seats, counters[0]),
+                                            ("business", flight.business_seats, counters[1])):
+        mismatched += available < 0 or available != capacity - booked.get(seat_class, 0)
+    recorder.checks = {
+        "flight_id": flight.id,
+        "seats_on_flight": len(seats),
+        "booked_before": already,
+        "bookings_created": recorder.statuses[200],
+        "double_booked_seats": double_booked,
+        "oversold_or_mismatched_classes": mismatched,
+    }
+    return recorder
+
+
+async def scenario_login(client, args, rng, tokens) -> Recorder:
+    from data.synthetic import SYNTHETIC_PASSWORD
+    recorder = Recorder("login")
+    jobs = []
+    for _ in range(args.logins):
+        username = f"user{rng.randint(1, args.users):08d}"
+        password = SYNTHETIC_PASSWORD if rng.random() < 0.9 else "wrong-password"
+        jobs.append(lambda body={"username": username, "password": password}: recorder.request(
+            client, "POST", "/auth/login", json=body))
+    await run_all(recorder, jobs, args.concurrency)
+    return recorder
+
+
+async def scenario_checkin(client, args, rng, tokens) -> Recorder:
+    """Every confirmed booking of the logged-in users is checked in twice at the same time"""
+    from sqlalchemy import select
+    from database import engine
+    from models.booking import BookingModel
+    from models.user import UserModel
+
+    with engine.connect() as connection:
+        rows = connection.execute(
+            select(BookingModel.id, UserModel.username)
+            .join(UserModel, UserModel.id == BookingModel.user_id)
+            .where(UserModel.username.in_(list(tokens)), BookingModel.booking_status == "confirmed")
+        ).all()
+
+    recorder = Recorder("checkin")
+    successes = Counter()
+
+    async def check_in(booking_id, auth):
+        response = await recorder.request(client, "POST", f"/api/bookings/{booking_id}/checkin", headers=auth)
+        if response.status_code == 200:
+            successes[booking_id] += 1
+
+    jobs = [lambda booking_id=booking_id, auth=tokens[username]: check_in(booking_id, auth)
+            for booking_id, username in rows for _ in range(2)]
+    rng.shuffle(jobs)
+    await run_all(recorder, jobs, args.concurrency)
+
+    with engine.connect() as connection:
+        still_confirmed = connection.execute(
+            select(BookingModel.id).where(BookingModel.id.in_([row.id for row in rows]),
+                                          BookingModel.booking_status == "confirmed")
+        ).all()
+    recorder.checks = {
+        "bookings": len(rows),
+        "double_check_ins": sum(1 for count in successes.values() if count > 1),
+        "not_checked_in": len(still_confirmed),
+    }
+    return recorder
+
+
+SCENARIO_FUNCTIONS = {
+    "search": scenario_search,
+    "booking": scenario_booking,
+    "login": scenario_login,
+    "checkin": scenario_checkin,
+}
+
+
+async def run(args) -> dict:
+    import httpx
+    import sqlalchemy
+    from main import app
+    from services.password_pool import password_pool
+
+    rng = random.Random(args.seed)
+    results = {
+        "benchmark": "load",
+        "timestamp": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "sqlalchemy": sqlalchemy.__version__,
+        "database": args.database_url.split("://")[0],
+        "settings": {key: getattr(args, key) for key in
+                     ("users", "flights", "seed_bookings", "requests", "logins", "concurrency", "seed")},
+        "scenarios": {},
+    }
+    transport = httpx.ASGITransport(app=app)
+    try:
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            usernames = [f"user{user_id:08d}" for user_id in range(1, min(args.users, args.logged_in_users) + 1)]
+            tokens = await log_in(client, usernames)
+            for name in args.scenarios:
+                recorder = await SCENARIO_FUNCTIONS[name](client, args, rng, tokens)
+                results["scenarios"][name] = recorder.as_dict()
+    finally:
+        password_pool.shutdown()
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(f"{'scenario':<10}{'requests':>10}{'req/s':>10}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}  status codes")
+    for name, result in results["scenarios"].items():
+        latency = result["latency_ms"]
+        print(f"{name:<10}{result['requests']:>10}{result['requests_per_second']:>10}"
+              f"{latency['p50']:>10}{latency['p95']:>10}{latency['p99']:>10}  {result['status_codes']}")
+        if result["checks"]:
+            print(f"{'':<10}checks: {result['checks']}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="In-process load and contention benchmark")
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="Comma separated, from: " + ", ".join(SCENARIOS))
+    parser.add_argument("--database-url", help="Database to wipe and seed (default: a temporary SQLite file)")
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--seed-bookings", type=int, default=20000, help="Bookings created before the run")
+    parser.add_argument("--logged-in-users", type=int, default=20, help="Users who book and check in")
+    parser.add_argument("--requests", type=int, default=2000, help="Requests for the search and booking scenarios")
+    parser.add_argument("--logins", type=int, default=100)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+    args.scenarios = [name.strip() for name in args.scenarios.split(",") if name.strip()]
+    unknown = set(args.scenarios) - set(SCENARIOS)
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(sorted(unknown))}")
+
+    temp_dir = None
+    if not args.database_url:
+        temp_dir = tempfile.TemporaryDirectory()
+        args.database_url = "sqlite:///" + os.path.join(temp_dir.name, "benchmark.db")
+    use_database(args.database_url)
+    seed(args)
+
+    results = asyncio.run(run(args))
+    if args.json == "-":
+        json.dump(results, sys.stdout, indent=2)
+        print()
+    else:
+        print_results(results)
+        if args.json:
+            with open(args.json, "w") as output:
+                json.dump(results, output, indent=2)
+    if temp_dir:
+        temp_dir.cleanup()
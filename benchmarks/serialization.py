@@ -0,0 +1,141 @@
+# =============================================================================
+# SERIALIZATION BENCHMARK - List endpoints: response_model vs the fast path
+# =============================================================================
+# Times one page of flights and one page of bookings, from the query to the
+# finished JSON bytes, three ways:
+#   response_model - ORM objects run through FastAPI's response_model
+#                    validation and JSONResponse (how the endpoints used to work)
+#   orm_adapter    - ORM objects, a precompiled TypeAdapter and dump_json
+#   core_adapter   - plain column rows, the same TypeAdapter (what the
+#                    endpoints do now, see controllers/flights.py and bookings.py)
+# Each path's output is checked against the others before it is timed. The ORM
+# paths use the endpoints' loader options (bookings: no ?expand=).
+#
+#     python -m benchmarks.serialization [--sizes 100,1000] [--repeat 20] [--json results.json]
+
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import tempfile
+import time
+from typing import List
+
+
+def use_database(url: str) -> None:
+    """Point the app at the benchmark database. Must run before database is imported."""
+    from config import environment
+    environment.db_URI = url
+
+
+def seed(args) -> None:
+    from database import engine
+    from models.base import Base
+    from migrations import mark_all_applied
+    from data.synthetic import generate
+    import main  # noqa: F401 - registers every model
+
+    Base.metadata.create_all(bind=engine)
+    mark_all_applied(engine)
+    generate(engine, users=args.users, flights=args.flights, bookings=args.bookings, seed=args.seed)
+
+
+def paths(model, schema, options: list, size: int) -> dict:
+    """The three ways to turn `size` rows of `model` into JSON bytes"""
+    from fastapi.responses import JSONResponse
+    from fastapi.routing import serialize_response
+    from fastapi.utils import create_response_field
+    from pydantic import TypeAdapter
+    from database import SessionLocal
+
+    field = create_response_field(name="response", type_=List[schema])
+    adapter = TypeAdapter(List[schema])
+    loop = asyncio.new_event_loop()
+
+    def response_model() -> bytes:
+        with SessionLocal() as db:
+            rows = db.query(model).options(*options).order_by(model.id).limit(size).all()
+            content = loop.run_until_complete(serialize_response(field=field, response_content=rows, is_coroutine=True))
+            return JSONResponse(content).body
+
+    def orm_adapter() -> bytes:
+        with SessionLocal() as db:
+            rows = db.query(model).options(*options).order_by(model.id).limit(size).all()
+            return adapter.dump_json(adapter.validate_python(rows, from_attributes=True))
+
+    def core_adapter() -> bytes:
+        with SessionLocal() as db:
+            rows = db.query(*model.__table__.columns).order_by(model.id).limit(size).all()
+            return adapter.dump_json(adapter.validate_python([row._asdict() for row in rows]))
+
+    return {"response_model": response_model, "orm_adapter": orm_adapter, "core_adapter": core_adapter}
+
+
+def time_path(function, repeat: int) -> dict:
+    function()  # Warm up (first query, adapter compilation)
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        function()
+        timings.append((time.perf_counter() - start) * 1000)
+    return {"median_ms": round(statistics.median(timings), 3), "min_ms": round(min(timings), 3)}
+
+
+def run(args) -> dict:
+    from models.booking import BookingModel
+    from models.flight import FlightModel
+    from serializers.booking import BookingSchema
+    from serializers.flight import FlightSchema
+    from dependencies.expand import booking_load_options
+
+    results = {"benchmark": "serialization", "repeat": args.repeat, "lists": {}}
+    lists = (
+        ("flights", FlightModel, FlightSchema, []),
+        ("bookings", BookingModel, BookingSchema, booking_load_options(frozenset())),
+    )
+    for name, model, schema, options in lists:
+        for size in args.sizes:
+            functions = paths(model, schema, options, size)
+            outputs = {path: json.loads(function()) for path, function in functions.items()}
+            if any(output != outputs["response_model"] for output in outputs.values()):
+                raise RuntimeError(f"The {name} paths disagree for {size} rows")
+            timings = {path: time_path(function, args.repeat) for path, function in functions.items()}
+            baseline = timings["response_model"]["median_ms"]
+            for timing in timings.values():
+                timing["speedup"] = round(baseline / timing["median_ms"], 2)
+            results["lists"][f"{name}_{size}"] = timings
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(f"{'list':<16}{'path':<16}{'median ms':>11}{'min ms':>10}{'speedup':>9}")
+    for name, timings in results["lists"].items():
+        for path, timing in timings.items():
+            print(f"{name:<16}{path:<16}{timing['median_ms']:>11}{timing['min_ms']:>10}{timing['speedup']:>8}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare JSON serialization paths for list endpoints")
+    parser.add_argument("--sizes", default="100,1000", help="Comma separated page sizes")
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--flights", type=int, default=2000)
+    parser.add_argument("--bookings", type=int, default=20000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+    args.sizes = [int(size) for size in args.sizes.split(",")]
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        use_database("sqlite:///" + os.path.join(temp_dir, "benchmark.db"))
+        seed(args)
+        results = run(args)
+
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+        if args.json:
+            with open(args.json, "w") as output:
+                json.dump(results, output, indent=2)
@@ -0,0 +1,195 @@
+# =============================================================================
+# STARTUP BENCHMARK - Cold start to first request
+# =============================================================================
+# Starts the API in a brand new process --runs times, the way an autoscaled
+# worker starts, against a small throwaway database, and measures:
+#   import_ms          - importing main.py (every controller, model and middleware)
+#   ready_ms           - from launching uvicorn until GET / answers
+#   first_request_ms   - the first GET /api/flights after that (first database
+#                        connection, empty caches)
+#   second_request_ms  - the same request again, for comparison
+# It also lists the slowest single modules from `python -X importtime`, so a
+# change that pulls a heavy library back into startup shows up by name.
+#
+# With --budget-ms it exits with status 1 when the median ready_ms is over the
+# budget, so CI can keep startup from creeping up.
+#
+#     python -m benchmarks.startup [--runs 5] [--budget-ms 3000] [--json results.json]
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Run in the child processes. The database is switched before main is imported.
+IMPORT_MAIN = """
+import sys, time
+from config import environment
+environment.db_URI = sys.argv[1]
+start = time.perf_counter()
+import main
+print(time.perf_counter() - start)
+"""
+
+SERVE = """
+import sys
+from config import environment
+environment.db_URI = sys.argv[1]
+import uvicorn
+uvicorn.run("main:app", host="127.0.0.1", port=int(sys.argv[2]), log_level="warning")
+"""
+
+
+def use_database(url: str) -> None:
+    """Point this process at the benchmark database. Must run before database is imported."""
+    from config import environment
+    environment.db_URI = url
+
+
+def seed(args) -> None:
+    from database import engine
+    from models.base import Base
+    from migrations import mark_all_applied
+    from data.synthetic import generate
+    import main  # noqa: F401 - registers every model
+
+    Base.metadata.create_all(bind=engine)
+    mark_all_applied(engine)
+    generate(engine, users=args.users, flights=args.flights, bookings=args.bookings, seed=args.seed)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get(url: str) -> float:
+    """Milliseconds for one GET, which must succeed"""
+    start = time.perf_counter()
+    with urllib.request.urlopen(url, timeout=30) as response:
+        response.read()
+    return (time.perf_counter() - start) * 1000
+
+
+def cold_start(database_url: str, timeout: float) -> dict:
+    """Launch one server process and time it up to its second request"""
+    port = free_port()
+    base = f"http://127.0.0.1:{port}"
+    start = time.perf_counter()
+    server = subprocess.Popen([sys.executable, "-c", SERVE, database_url, str(port)], cwd=ROOT)
+    try:
+        while True:
+            if server.poll() is not None:
+                raise RuntimeError(f"The server exited with status {server.returncode} before it was ready")
+            if time.perf_counter() - start > timeout:
+                raise RuntimeError(f"The server wasn't ready after {timeout}s")
+            try:
+                get(base + "/")
+                break
+            except OSError:
+                time.sleep(0.005)
+        ready_ms = (time.perf_counter() - start) * 1000
+        return {
+            "ready_ms": ready_ms,
+            "first_request_ms": get(base + "/api/flights?limit=100"),
+            "second_request_ms": get(base + "/api/flights?limit=100"),
+        }
+    finally:
+        server.terminate()
+        server.wait()
+
+
+def import_time(database_url: str) -> float:
+    output = subprocess.run([sys.executable, "-c", IMPORT_MAIN, database_url], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stdout
+    return float(output.split()[-1]) * 1000
+
+
+def slowest_imports(database_url: str, count: int) -> list:
+    """Modules with the highest self import time when importing main"""
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", IMPORT_MAIN, database_url], cwd=ROOT,
+                            capture_output=True, text=True, check=True).stderr
+    modules = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            self_us, cumulative_us, name = line[len("import time:"):].split("|")
+            if self_us.strip().isdigit():
+                modules.append({"module": name.strip(), "self_ms": int(self_us) / 1000, "cumulative_ms": int(cumulative_us) / 1000})
+    modules.sort(key=lambda module: module["self_ms"], reverse=True)
+    return modules[:count]
+
+
+def summarize(values: list) -> dict:
+    return {"median_ms": round(statistics.median(values), 1), "min_ms": round(min(values), 1), "max_ms": round(max(values), 1)}
+
+
+def run(args, database_url: str) -> dict:
+    imports, starts = [], []
+    for _ in range(args.runs):
+        imports.append(import_time(database_url))
+        starts.append(cold_start(database_url, args.timeout))
+    results = {
+        "benchmark": "startup",
+        "runs": args.runs,
+        "python": sys.version.split()[0],
+        "import_ms": summarize(imports),
+        **{key: summarize([start[key] for start in starts]) for key in starts[0]},
+        "slowest_imports": slowest_imports(database_url, args.top),
+    }
+    if args.budget_ms is not None:
+        results["budget_ms"] = args.budget_ms
+        results["within_budget"] = results["ready_ms"]["median_ms"] <= args.budget_ms
+    return results
+
+
+def print_results(results: dict) -> None:
+    print(f"{results['runs']} cold starts, Python {results['python']}")
+    print(f"{'measure':<20}{'median ms':>11}{'min ms':>10}{'max ms':>10}")
+    for key in ("import_ms", "ready_ms", "first_request_ms", "second_request_ms"):
+        timing = results[key]
+        print(f"{key:<20}{timing['median_ms']:>11}{timing['min_ms']:>10}{timing['max_ms']:>10}")
+    print("\nSlowest imports (self time):")
+    for module in results["slowest_imports"]:
+        print(f"  {module['self_ms']:>8.1f} ms  {module['module']}")
+    if "budget_ms" in results:
+        verdict = "within" if results["within_budget"] else "OVER"
+        print(f"\nMedian ready_ms {results['ready_ms']['median_ms']} is {verdict} the {results['budget_ms']} ms budget")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure cold start to first request")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--budget-ms", type=float, help="Fail if the median ready_ms is higher than this")
+    parser.add_argument("--timeout", type=float, default=60, help="Seconds to wait for a server to come up")
+    parser.add_argument("--top", type=int, default=10, help="How many of the slowest imports to list")
+    parser.add_argument("--users", type=int, default=100)
+    parser.add_argument("--flights", type=int, default=500)
+    parser.add_argument("--bookings", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--json", metavar="PATH", help="Write the results as JSON to PATH ('-' for stdout)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as temp_dir:
+        database_url = "sqlite:///" + os.path.join(temp_dir, "benchmark.db")
+        use_database(database_url)
+        seed(args)
+        results = run(args, database_url)
+
+    if args.json == "-":
+        print(json.dumps(results, indent=2))
+    else:
+        print_results(results)
+        if args.json:
+            with open(args.json, "w") as output:
+                json.dump(results, output, indent=2)
+    if results.get("within_budget") is False:
+        sys.exit(1)
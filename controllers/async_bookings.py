@@ -0,0 +1,70 @@
+# =============================================================================
+# ASYNC BOOKINGS CONTROLLER - asyncio versions of the booking read endpoints
+# =============================================================================
+# Only mounted when DB_ASYNC = True (see database.py and main.py). These routes
+# take over the same paths as the read endpoints in controllers/bookings.py.
+# Creating, changing, cancelling and checking in bookings stays on the sync
+# controller, which owns the seat inventory logic.
+#
+# Async sessions can't lazy load, so the nested user and flight in
+# BookingSchema are only ever loaded up front, with ?expand= (see
+# dependencies/expand.py).
+
+from fastapi import APIRouter, HTTPException, Depends, Response
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.booking import BookingModel
+from models.user import UserModel
+from serializers.booking import BookingSchema
+from typing import List
+from database import get_async_db
+from dependencies.get_current_user import get_current_user_async
+from dependencies.pagination import PageParams, get_page_params, page_response
+from dependencies.expand import booking_load_options, get_booking_expand
+from services.booking_reference import is_plausible_reference
+from controllers.bookings import build_booking_page
+
+router = APIRouter()
+
+# =============================================================================
+# GET USER'S BOOKINGS - Returns all bookings for the logged-in user
+# =============================================================================
+@router.get('/bookings', response_model=List[BookingSchema])
+async def get_bookings(response: Response, page: PageParams = Depends(get_page_params), expand: frozenset = Depends(get_booking_expand), db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_user_async)):
+    """Get all bookings for the current user"""
+    user_id = current_user.id
+    body = await db.run_sync(lambda session: build_booking_page(session, user_id, page, expand, response))
+    return page_response(body, response)
+
+
+# =============================================================================
+# GET SINGLE BOOKING - Returns one specific booking by ID
+# =============================================================================
+@router.get("/bookings/{booking_id}", response_model=BookingSchema)
+async def get_single_booking(booking_id: int, expand: frozenset = Depends(get_booking_expand), db: AsyncSession = Depends(get_async_db), current_user: UserModel = Depends(get_current_user_async)):
+    """Get a specific booking by ID (only if it belongs to the current user)"""
+    result = await db.execute(select(BookingModel).options(*booking_load_options(expand)).where(
+        BookingModel.id == booking_id,
+        BookingModel.user_id == current_user.id
+    ))
+    booking = result.scalars().first()
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return booking
+
+
+# =============================================================================
+# FIND BOOKING BY REFERENCE - Find booking using booking reference number
+# =============================================================================
+@router.get("/bookings/reference/{booking_reference}", response_model=BookingSchema)
+async def get_booking_by_reference(booking_reference: str, expand: frozenset = Depends(get_booking_expand), db: AsyncSession = Depends(get_async_db)):
+    """Find a booking using its reference number (like GA8C30A70F)"""
+    if not is_plausible_reference(booking_reference):
+        raise HTTPException(status_code=404, detail="Booking not found")
+    result = await db.execute(select(BookingModel).options(*booking_load_options(expand)).where(
+        BookingModel.booking_reference == booking_reference
+    ))
+    booking = result.scalars().first()
+    if not booking:
+        raise HTTPException(status_code=404, detail="Booking not found")
+    return booking
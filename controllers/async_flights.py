@@ -0,0 +1,76 @@
+# =============================================================================
+# ASYNC FLIGHTS CONTROLLER - asyncio versions of the flight read endpoints
+# =============================================================================
+# Only mounted when DB_ASYNC = True (see database.py and main.py). These routes
+# take over the same paths as the read endpoints in controllers/flights.py and
+# return the same responses, so the two stacks can be compared side by side.
+# Creating, updating and deleting flights stays on the sync controller.
+
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import ORJSONResponse
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from models.flight import FlightModel
+from serializers.flight import FlightSchema
+from typing import List
+from database import get_async_db
+from dependencies.pagination import PageParams, get_page_params
+from services.flight_cache import flight_cache, cached_response
+from controllers.flights import flight_list_key, build_booked_seats, build_flight_list, build_single_flight, build_flight_status
+
+router = APIRouter()
+
+
+# ------------------------
+# Get all flights (one page at a time, cached, supports If-None-Match)
+# ------------------------
+# The response builders are shared with the sync controller, run_sync lets
+# them use this async connection on a cache miss.
+@router.get('/flights', response_model=List[FlightSchema])
+async def get_flights(request: Request, page: PageParams = Depends(get_page_params), db: AsyncSession = Depends(get_async_db)):
+    entry = flight_cache.get(flight_list_key(page)) or await db.run_sync(build_flight_list, page)
+    return cached_response(request, entry)
+
+
+# ------------------------
+# Get booked seats for a flight (from the in-memory seat map)
+# ------------------------
+@router.get("/flights/{flight_id}/booked-seats")
+async def get_booked_seats(flight_id: int, db: AsyncSession = Depends(get_async_db)):
+    return await db.run_sync(build_booked_seats, flight_id)
+
+
+# ------------------------
+# Get one flight by ID (cached, supports If-None-Match)
+# ------------------------
+@router.get("/flights/{flight_id}", response_model=FlightSchema)
+async def get_single_flight(flight_id: int, request: Request, db: AsyncSession = Depends(get_async_db)):
+    entry = flight_cache.get(("flight", flight_id)) or await db.run_sync(build_single_flight, flight_id)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return cached_response(request, entry)
+
+
+# ------------------------
+# Search flight by departure and arrival
+# ------------------------
+@router.get("/flights/search/{departure_airport}/{arrival_airport}")
+async def search_flights(departure_airport: str, arrival_airport: str, db: AsyncSession = Depends(get_async_db)):
+    result = await db.execute(select(FlightModel.__table__).where(
+        FlightModel.departure_airport == departure_airport,
+        FlightModel.arrival_airport == arrival_airport,
+        #  only upcoming scheduled flights
+        FlightModel.status == "scheduled"
+    ))
+    return ORJSONResponse([dict(flight) for flight in result.mappings()])
+
+
+# ------------------------
+# Get the status of a flight by flight number (cached, supports If-None-Match)
+# ------------------------
+@router.get("/flights/status/{flight_number}")
+async def get_flight_status(flight_number: str, request: Request, db: AsyncSession = Depends(get_async_db)):
+    entry = flight_cache.get(("status", flight_number)) or await db.run_sync(build_flight_status, flight_number)
+    if not entry:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    return cached_response(request, entry)
@@ -4,159 +4,48 @@
 # This controller manages flight bookings including creation, updates, cancellations
 # and check-in functionality. It includes complex business logic for seat management.
 
-from fastapi import APIRouter, HTTPException, Depends
+from fastapi import APIRouter, HTTPException, Depends, Response
+from sqlalchemy import insert
 from sqlalchemy.orm import Session
+from sqlalchemy.exc import IntegrityError
 from models.booking import BookingModel
 from models.flight import FlightModel
-from serializers.booking import BookingSchema, BookingCreate as BookingCreateSchema, BookingUpdate as BookingUpdateSchema
-from pydantic import BaseModel
+from serializers.booking import BookingSchema, BookingCreate as BookingCreateSchema, BookingUpdate as BookingUpdateSchema, GroupBookingCreate as GroupBookingCreateSchema
+from pydantic import BaseModel, TypeAdapter
 from models.user import UserModel
 from typing import List
 from database import get_db
-from dependencies.get_current_user import get_current_user
-import random
-import string
+from dependencies.get_current_user import get_current_user, invalidate_user
+from dependencies.pagination import PageParams, get_page_params, page_response, paginate
+from dependencies.expand import booking_load_options, get_booking_expand, load_booking
+from dependencies.read_db import get_read_db
+from services.seat_inventory import SEAT_COLUMNS, reserve_seat, release_seat, is_seat_conflict
+from services.seat_map import seat_maps
+from services.seat_holds import seat_holds
+from services.flight_cache import flight_cache
+from services.booking_reference import reference_allocator, is_plausible_reference
+from services.loyalty import accrue_bookings, flight_distance, next_tier_threshold
 import uuid
+from collections import Counter
 from datetime import datetime
-import random
-import string
-import math
 
 router = APIRouter()
 
+booking_list_adapter = TypeAdapter(List[BookingSchema])
 
-# =============================================================================
-# LOYALTY PROGRAM UTILITIES - Calculate miles and points for flights
-# =============================================================================
-
-def calculate_flight_distance(departure_airport: str, arrival_airport: str) -> int:
-    """Calculate approximate flight distance in miles between two airports"""
-    # Simple airport coordinates for major Gulf Air destinations
-    airport_coords = {
-        "BAH": (26.2708, 50.6336),  # Bahrain
-        "DXB": (25.2532, 55.3657),  # Dubai
-        "DOH": (25.2611, 51.5651),  # Doha
-        "KWI": (29.2269, 47.9789),  # Kuwait
-        "RUH": (24.6408, 46.7728),  # Riyadh
-        "JED": (21.6796, 39.1565),  # Jeddah
-        "CAI": (30.1127, 31.4000),  # Cairo
-        "BEY": (33.8209, 35.4883),  # Beirut
-        "AMM": (31.7225, 35.9933),  # Amman
-        "LHR": (51.4700, -0.4543),  # London
-        "CDG": (49.0097, 2.5479),   # Paris
-        "FRA": (50.0379, 8.5622),   # Frankfurt
-        "MAD": (40.4839, -3.5680),  # Madrid
-        "FCO": (41.8003, 12.2389),  # Rome
-        "ATH": (37.9364, 23.9445),  # Athens
-        "BOM": (19.0896, 72.8656),  # Mumbai
-        "DEL": (28.5562, 77.1000),  # Delhi
-        "BKK": (13.6900, 100.7501), # Bangkok
-        "KUL": (2.7456, 101.7099),  # Kuala Lumpur
-        "SIN": (1.3644, 103.9915),  # Singapore
-        "HKG": (22.3080, 113.9185), # Hong Kong
-        "NBO": (-1.3192, 36.9278),  # Nairobi
-        "JNB": (-26.1367, 28.2411), # Johannesburg
-    }
-    
-    if departure_airport not in airport_coords or arrival_airport not in airport_coords:
-        # Default distance for unknown airports
-        return 500
-    
-    # Get coordinates
-    lat1, lon1 = airport_coords[departure_airport]
-    lat2, lon2 = airport_coords[arrival_airport]
-    
-    # Haversine formula to calculate distance
-    R = 3959  # Earth's radius in miles
-    
-    dlat = math.radians(lat2 - lat1)
-    dlon = math.radians(lon2 - lon1)
-    a = (math.sin(dlat/2) * math.sin(dlat/2) + 
-         math.cos(math.radians(lat1)) * math.cos(math.radians(lat2)) * 
-         math.sin(dlon/2) * math.sin(dlon/2))
-    c = 2 * math.atan2(math.sqrt(a), math.sqrt(1-a))
-    distance = R * c
-    
-    return int(distance)
 
-
-def calculate_miles_earned(distance: int, seat_class: str, loyalty_tier: str) -> int:
-    """Calculate miles earned based on distance, seat class, and loyalty tier"""
-    # Base miles = distance
-    base_miles = distance
-    
-    # Seat class multiplier
-    if seat_class == "business":
-        seat_multiplier = 1.5  # Business class gets 50% bonus
+def build_booking_page(db: Session, user_id: int, page: PageParams, expand: frozenset, response: Response) -> bytes:
+    """One page of a user's bookings as JSON. Takes a plain Session so the async controller can run it too."""
+    if expand:
+        query = db.query(BookingModel).options(*booking_load_options(expand))
     else:
-        seat_multiplier = 1.0  # Economy class gets base miles
-    
-    # Loyalty tier multiplier
-    tier_multipliers = {
-        "BLUE": 1.0,      # Base tier
-        "SILVER": 1.25,   # 25% bonus
-        "GOLD": 1.5,      # 50% bonus
-        "PLATINUM": 2.0   # 100% bonus
-    }
-    
-    tier_multiplier = tier_multipliers.get(loyalty_tier, 1.0)
-    
-    # Calculate total miles
-    total_miles = int(base_miles * seat_multiplier * tier_multiplier)
-    
-    return total_miles
-
-
-def calculate_points_earned(miles: int) -> int:
-    """Calculate loyalty points earned (typically 1 point per 10 miles)"""
-    return miles // 10
-
-
-def check_and_upgrade_loyalty_tier(user: UserModel) -> dict:
-    """Check if user qualifies for tier upgrade based on total loyalty points"""
-    total_points = user.loyalty_points or 0
-    current_tier = user.loyalty_tier or "BLUE"
-    
-    # Define tier thresholds (loyalty points required for each tier)
-    tier_thresholds = {
-        "BLUE": 0,      # Starting tier
-        "SILVER": 500,  # 500 points for Silver
-        "GOLD": 1000,   # 1,000 points for Gold
-        "PLATINUM": 2000 # 2,000 points for Platinum
-    }
-    
-    # Determine what tier the user should be based on points
-    new_tier = "BLUE"
-    for tier, threshold in sorted(tier_thresholds.items(), key=lambda x: x[1], reverse=True):
-        if total_points >= threshold:
-            new_tier = tier
-            break
-    
-    # Check if user was upgraded
-    tier_upgraded = False
-    if new_tier != current_tier:
-        tier_upgraded = True
-        user.loyalty_tier = new_tier
-    
-    return {
-        "tier_upgraded": tier_upgraded,
-        "old_tier": current_tier,
-        "new_tier": new_tier,
-        "total_points": total_points,
-        "next_tier_threshold": get_next_tier_threshold(new_tier, tier_thresholds)
-    }
-
-
-def get_next_tier_threshold(current_tier: str, tier_thresholds: dict) -> int:
-    """Get the miles threshold for the next tier up"""
-    tier_order = ["BLUE", "SILVER", "GOLD", "PLATINUM"]
-    current_index = tier_order.index(current_tier)
-    
-    if current_index < len(tier_order) - 1:
-        next_tier = tier_order[current_index + 1]
-        return tier_thresholds[next_tier]
+        query = db.query(*BookingModel.__table__.columns)
+    rows = paginate(query.filter(BookingModel.user_id == user_id), BookingModel.id, page, response)
+    if expand:
+        bookings = booking_list_adapter.validate_python(rows, from_attributes=True)
     else:
-        return None  # Already at highest tier
+        bookings = booking_list_adapter.validate_python([row._asdict() for row in rows])
+    return booking_list_adapter.dump_json(bookings)
 
 
 # =============================================================================
@@ -164,12 +53,16 @@ def get_next_tier_threshold(current_tier: str, tier_thresholds: dict) -> int:
 # =============================================================================
 # This endpoint shows all bookings made by the current user
 # Only shows bookings that belong to the authenticated user
+# Results are paged with ?limit= and ?after= (see dependencies/pagination.py)
+# Nested flight/user are only included with ?expand= (see dependencies/expand.py)
+# The page is serialized straight to JSON bytes by booking_list_adapter, which
+# is much faster than FastAPI's response_model path for long lists. Without
+# ?expand= the rows are read as plain column tuples, skipping the ORM entirely.
 
 @router.get('/bookings', response_model=List[BookingSchema])
-def get_bookings(db: Session=Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+def get_bookings(response: Response, page: PageParams = Depends(get_page_params), expand: frozenset = Depends(get_booking_expand), db: Session=Depends(get_read_db), current_user: UserModel = Depends(get_current_user)):
     """Get all bookings for the current user"""
-    bookings = db.query(BookingModel).filter(BookingModel.user_id == current_user.id).all()
-    return bookings
+    return page_response(build_booking_page(db, current_user.id, page, expand, response), response)
 
 # =============================================================================
 # GET SINGLE BOOKING - Returns one specific booking by ID
@@ -178,9 +71,9 @@ def get_bookings(db: Session=Depends(get_db), current_user: UserModel = Depends(
 # Only works if the booking belongs to the current user
 
 @router.get("/bookings/{booking_id}", response_model=BookingSchema)
-def get_single_booking(booking_id: int, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+def get_single_booking(booking_id: int, expand: frozenset = Depends(get_booking_expand), db: Session = Depends(get_read_db), current_user: UserModel = Depends(get_current_user)):
     """Get a specific booking by ID (only if it belongs to the current user)"""
-    booking = db.query(BookingModel).filter(
+    booking = db.query(BookingModel).options(*booking_load_options(expand)).filter(
         BookingModel.id == booking_id,
         BookingModel.user_id == current_user.id
     ).first()
@@ -196,7 +89,7 @@ def get_single_booking(booking_id: int, db: Session = Depends(get_db), current_u
 # and updates flight seat counts. Includes business logic for seat management.
 
 @router.post("/bookings", response_model=BookingSchema)
-def create_booking(booking: BookingCreateSchema, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+def create_booking(booking: BookingCreateSchema, expand: frozenset = Depends(get_booking_expand), db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
     """Create a new flight booking with seat validation and availability checks"""
     
     # STEP 1: Validate that the flight exists
@@ -204,54 +97,159 @@ def create_booking(booking: BookingCreateSchema, db: Session = Depends(get_db),
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
     
-    # STEP 2: Check seat availability by class (economy vs business)
-    if booking.seat_class == "economy":
-        if flight.available_economy_seats <= 0:
-            raise HTTPException(status_code=400, detail="No available economy seats on this flight")
-    elif booking.seat_class == "business":
-        if flight.available_business_seats <= 0:
-            raise HTTPException(status_code=400, detail="No available business seats on this flight")
-    else:
-        raise HTTPException(status_code=400, detail="Invalid seat class. Must be 'economy' or 'business'")
+    # STEP 2: Generate unique booking reference (no database lookup, see services/booking_reference.py).
+    # Done before any writes, as reserving a new block of references needs its own transaction.
+    booking_reference = reference_allocator.next(db.get_bind())
     
-    # STEP 3: Check if the specific seat is already taken
-    existing_booking = db.query(BookingModel).filter(
-        BookingModel.flight_id == booking.flight_id,
-        BookingModel.seat_number == booking.seat_number,
-        BookingModel.booking_status == "confirmed"
-    ).first()
-    if existing_booking:
+    # STEP 3: Check if the specific seat is already taken (in-memory seat map).
+    # The uq_bookings_live_seat index is still the final word, see STEP 6.
+    if booking.seat_class not in ("economy", "business"):
+        raise HTTPException(status_code=400, detail="Invalid seat class. Must be 'economy' or 'business'")
+    if seat_maps.is_taken(db, booking.flight_id, booking.seat_number):
         raise HTTPException(status_code=400, detail="Seat already taken")
     
-    # STEP 4: Generate unique booking reference (6 random letters)
-    booking_reference = ''.join(random.choices(string.ascii_uppercase, k=6))
-    
-    # STEP 5: Create the booking record
-    new_booking = BookingModel(
-        booking_reference=booking_reference,
-        user_id=current_user.id,
-        flight_id=booking.flight_id,
-        passenger_name=booking.passenger_name,
-        passenger_email=booking.passenger_email,
-        passport_number=booking.passport_number,
-        seat_class=booking.seat_class,
-        seat_number=booking.seat_number,
-        total_price=booking.total_price,
-        booking_date=datetime.now()
-    )
-    
-    db.add(new_booking)
-    
-    # STEP 6: Update flight seat availability (reduce available seats)
-    if booking.seat_class == "economy":
-        flight.available_economy_seats -= 1
-    elif booking.seat_class == "business":
-        flight.available_business_seats -= 1
-    
-    # STEP 7: Save everything to database
-    db.commit()
-    db.refresh(new_booking)
-    return new_booking
+    # Hold the seat for this user (or renew their hold from the seat map), so
+    # nobody else can grab it before the commit (see services/seat_holds.py)
+    seat = [(booking.flight_id, booking.seat_number)]
+    if seat_holds.claim(current_user.id, seat):
+        raise HTTPException(status_code=400, detail="Seat is on hold for another customer")
+    
+    # From here on, any failure rolls back and lets go of the hold
+    try:
+        # STEP 4: Take a seat of the requested class (economy vs business).
+        # This is one atomic UPDATE, so parallel bookings can't oversell the flight.
+        if not reserve_seat(db, booking.flight_id, booking.seat_class):
+            raise HTTPException(status_code=400, detail=f"No available {booking.seat_class} seats on this flight")
+
+        # STEP 5: Create the booking record
+        new_booking = BookingModel(
+            booking_reference=booking_reference,
+            user_id=current_user.id,
+            flight_id=booking.flight_id,
+            passenger_name=booking.passenger_name,
+            passenger_email=booking.passenger_email,
+            passport_number=booking.passport_number,
+            seat_class=booking.seat_class,
+            seat_number=booking.seat_number,
+            total_price=booking.total_price,
+            booking_date=datetime.now()
+        )
+
+        db.add(new_booking)
+
+        # STEP 6: Insert the booking. If another live booking already holds this seat
+        # the unique index rejects it and the rollback also gives the seat count back.
+        try:
+            db.flush()
+        except IntegrityError as error:
+            if not is_seat_conflict(error):
+                raise
+            seat_maps.mark_taken(booking.flight_id, booking.seat_number)
+            raise HTTPException(status_code=400, detail="Seat already taken")
+
+        # STEP 7: Save everything to database. The hold has become the booking.
+        db.commit()
+    except Exception:
+        db.rollback()
+        seat_holds.release(seat, current_user.id)
+        raise
+    seat_maps.mark_taken(booking.flight_id, booking.seat_number)
+    seat_holds.release(seat, current_user.id, booked=True)
+    flight_cache.invalidate(booking.flight_id)  # Seat count changed
+    return load_booking(db, new_booking.id, expand)
+
+# =============================================================================
+# CREATE GROUP BOOKING - Books several passengers in one transaction
+# =============================================================================
+# A family or group books every passenger (on one flight, or on each flight of
+# an itinerary) in one request. Seat counts are taken with one UPDATE per flight
+# and seat class, all bookings are inserted with one statement, and there is a
+# single commit. If any seat can't be booked, nothing is booked.
+
+@router.post("/bookings/group", response_model=List[BookingSchema])
+def create_group_booking(group: GroupBookingCreateSchema, expand: frozenset = Depends(get_booking_expand), db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+    """Book several passengers on one flight or an itinerary, all or nothing"""
+
+    passengers = [(segment.flight_id, passenger) for segment in group.segments for passenger in segment.passengers]
+    flight_ids = {segment.flight_id for segment in group.segments}
+
+    # STEP 1: Check the request itself before touching the database
+    if len(flight_ids) != len(group.segments):
+        raise HTTPException(status_code=400, detail="Each flight can only appear once in a group booking")
+    if any(passenger.seat_class not in SEAT_COLUMNS for _, passenger in passengers):
+        raise HTTPException(status_code=400, detail="Invalid seat class. Must be 'economy' or 'business'")
+    seats = [(flight_id, passenger.seat_number) for flight_id, passenger in passengers]
+    if len(set(seats)) != len(seats):
+        raise HTTPException(status_code=400, detail="The same seat was requested twice")
+
+    # STEP 2: Validate that every flight exists (one query for all of them)
+    found = {flight_id for (flight_id,) in db.query(FlightModel.id).filter(FlightModel.id.in_(flight_ids))}
+    missing = flight_ids - found
+    if missing:
+        raise HTTPException(status_code=404, detail=f"Flight {min(missing)} not found")
+
+    # STEP 3: Check the seats against the in-memory seat maps
+    taken = [f"{seat_number} (flight {flight_id})" for flight_id, seat_number in seats if seat_maps.is_taken(db, flight_id, seat_number)]
+    if taken:
+        raise HTTPException(status_code=400, detail=f"Seats already taken: {', '.join(taken)}")
+    held = seat_holds.claim(current_user.id, seats)  # All or nothing, like the booking itself
+    if held:
+        held = [f"{seat_number} (flight {flight_id})" for flight_id, seat_number in held]
+        raise HTTPException(status_code=400, detail=f"Seats on hold for another customer: {', '.join(held)}")
+
+    # From here on, any failure rolls back (giving back seats taken on earlier
+    # flights/classes) and lets go of the holds
+    try:
+        # STEP 4: Booking references, before any writes (see create_booking)
+        engine = db.get_bind()
+        references = [reference_allocator.next(engine) for _ in passengers]
+
+        # STEP 5: Take the seats, one atomic UPDATE per flight and seat class.
+        # Always in the same order, so two groups on the same flights can't deadlock.
+        needed = Counter((flight_id, passenger.seat_class) for flight_id, passenger in passengers)
+        for (flight_id, seat_class), count in sorted(needed.items()):
+            if not reserve_seat(db, flight_id, seat_class, count):
+                raise HTTPException(status_code=400, detail=f"Not enough {seat_class} seats on flight {flight_id} for this group")
+
+        # STEP 6: Insert every booking with one statement. If another live booking
+        # already holds one of the seats, the unique index rejects the whole group.
+        booking_date = datetime.now()
+        rows = [
+            {
+                "booking_reference": reference,
+                "user_id": current_user.id,
+                "flight_id": flight_id,
+                "passenger_name": passenger.passenger_name,
+                "passenger_email": passenger.passenger_email,
+                "passport_number": passenger.passport_number,
+                "seat_class": passenger.seat_class,
+                "seat_number": passenger.seat_number,
+                "total_price": passenger.total_price,
+                "booking_date": booking_date,
+            }
+            for reference, (flight_id, passenger) in zip(references, passengers)
+        ]
+        try:
+            booking_ids = db.scalars(insert(BookingModel).returning(BookingModel.id), rows).all()
+        except IntegrityError as error:
+            if not is_seat_conflict(error):
+                raise
+            for flight_id in flight_ids:
+                seat_maps.invalidate(flight_id)  # Our map missed a seat, rebuild it on next use
+            raise HTTPException(status_code=400, detail="One or more seats are already taken")
+
+        # STEP 7: Save everything to database
+        db.commit()
+    except Exception:
+        db.rollback()
+        seat_holds.release(seats, current_user.id)
+        raise
+    for flight_id, seat_number in seats:
+        seat_maps.mark_taken(flight_id, seat_number)
+    seat_holds.release(seats, current_user.id, booked=True)
+    for flight_id in flight_ids:
+        flight_cache.invalidate(flight_id)  # Seat counts changed
+    return db.query(BookingModel).options(*booking_load_options(expand)).filter(BookingModel.id.in_(booking_ids)).order_by(BookingModel.id).all()
 
 # =============================================================================
 # UPDATE BOOKING - Allows users to modify their booking details
@@ -260,7 +258,7 @@ def create_booking(booking: BookingCreateSchema, db: Session = Depends(get_db),
 # Only works for bookings that belong to the current user
 
 @router.put("/bookings/{booking_id}", response_model=BookingSchema)
-def update_booking(booking_id: int, booking: BookingUpdateSchema, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+def update_booking(booking_id: int, booking: BookingUpdateSchema, expand: frozenset = Depends(get_booking_expand), db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
     """Update booking details (only if it belongs to the current user)"""
     
     # Find the booking and verify ownership
@@ -273,12 +271,44 @@ def update_booking(booking_id: int, booking: BookingUpdateSchema, db: Session =
     
     # Update only the fields that were provided (partial updates)
     booking_data = booking.dict(exclude_unset=True, exclude={'id'})
+
+    # A class change moves the seat between the flight's class counters, with
+    # the same atomic UPDATE as a new booking (cancelled bookings hold no seat)
+    class_changed = False
+    new_class = booking_data.get("seat_class")
+    if new_class and new_class != db_booking.seat_class:
+        if new_class not in SEAT_COLUMNS:
+            raise HTTPException(status_code=400, detail="Invalid seat class. Must be 'economy' or 'business'")
+        if db_booking.booking_status != "cancelled":
+            if not reserve_seat(db, db_booking.flight_id, new_class):
+                raise HTTPException(status_code=400, detail=f"No available {new_class} seats on this flight")
+            release_seat(db, db_booking.flight_id, db_booking.seat_class)
+            class_changed = True
+    elif "seat_class" in booking_data and not new_class:
+        booking_data.pop("seat_class")  # null means unchanged
+
+    new_seat = []
+    if booking_data.get("seat_number") and booking_data["seat_number"] != db_booking.seat_number:
+        new_seat = [(db_booking.flight_id, booking_data["seat_number"])]
+        if seat_holds.claim(current_user.id, new_seat):
+            raise HTTPException(status_code=400, detail="Seat is on hold for another customer")
     for key, value in booking_data.items():
         setattr(db_booking, key, value)
 
-    db.commit()  # Save changes to database
-    db.refresh(db_booking)  # Get updated data
-    return db_booking
+    try:
+        db.commit()  # Save changes to database
+    except Exception as error:
+        db.rollback()
+        seat_holds.release(new_seat, current_user.id)
+        if isinstance(error, IntegrityError) and is_seat_conflict(error):
+            raise HTTPException(status_code=400, detail="Seat already taken")
+        raise
+    # The seat may have changed, so rebuild this flight's seat map on next use
+    seat_maps.invalidate(db_booking.flight_id)
+    seat_holds.release(new_seat, current_user.id, booked=True)
+    if class_changed:
+        flight_cache.invalidate(db_booking.flight_id)  # Seat counts changed
+    return load_booking(db, booking_id, expand)  # Get updated data
 
 
 # =============================================================================
@@ -299,22 +329,21 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db), current_user:
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
-    # Check if already cancelled
-    if db_booking.booking_status == "cancelled":
+    # Mark booking as cancelled. The status check is part of the UPDATE itself,
+    # so two parallel cancels can't both return the seat to the flight.
+    cancelled = db.query(BookingModel).filter(
+        BookingModel.id == booking_id,
+        BookingModel.booking_status != "cancelled"
+    ).update({BookingModel.booking_status: "cancelled"}, synchronize_session=False)
+    if not cancelled:
         raise HTTPException(status_code=400, detail="Booking already cancelled")
-
-    # Mark booking as cancelled
-    db_booking.booking_status = "cancelled"
     
     # Return the seat to available seats on the flight
-    flight = db.query(FlightModel).filter(FlightModel.id == db_booking.flight_id).first()
-    if flight:
-        if db_booking.seat_class == "economy":
-            flight.available_economy_seats += 1
-        elif db_booking.seat_class == "business":
-            flight.available_business_seats += 1
+    release_seat(db, db_booking.flight_id, db_booking.seat_class)
 
     db.commit()  # Save changes
+    seat_maps.mark_free(db_booking.flight_id, db_booking.seat_number)
+    flight_cache.invalidate(db_booking.flight_id)  # Seat count changed
     return {
         "message": f"Booking {db_booking.booking_reference} has been cancelled",
         "booking_reference": db_booking.booking_reference,
@@ -329,9 +358,12 @@ def cancel_booking(booking_id: int, db: Session = Depends(get_db), current_user:
 # No authentication required - anyone with the reference can view the booking
 
 @router.get("/bookings/reference/{booking_reference}", response_model=BookingSchema)
-def get_booking_by_reference(booking_reference: str, db: Session = Depends(get_db)):
+def get_booking_by_reference(booking_reference: str, expand: frozenset = Depends(get_booking_expand), db: Session = Depends(get_read_db)):
     """Find a booking using its reference number (like GA8C30A70F)"""
-    booking = db.query(BookingModel).filter(BookingModel.booking_reference == booking_reference).first()
+    # Mistyped references fail their check character, no need to ask the database
+    if not is_plausible_reference(booking_reference):
+        raise HTTPException(status_code=404, detail="Booking not found")
+    booking = db.query(BookingModel).options(*booking_load_options(expand)).filter(BookingModel.booking_reference == booking_reference).first()
     if not booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     return booking
@@ -376,59 +408,71 @@ def reschedule_booking(booking_id: int, payload: RescheduleRequest, db: Session
     requested_seat_class = payload.seat_class or original_booking.seat_class
     requested_seat_number = payload.seat_number or original_booking.seat_number
 
-    if requested_seat_class == "economy":
-        if new_flight.available_economy_seats <= 0:
-            raise HTTPException(status_code=400, detail="No available economy seats on the new flight")
-    elif requested_seat_class == "business":
-        if new_flight.available_business_seats <= 0:
-            raise HTTPException(status_code=400, detail="No available business seats on the new flight")
+    if requested_seat_class not in ("economy", "business"):
+        raise HTTPException(status_code=400, detail="Invalid seat class. Must be 'economy' or 'business'")
     
-    # Check if the same seat is available on the new flight
-    existing_booking = db.query(BookingModel).filter(
-        BookingModel.flight_id == payload.new_flight_id,
-        BookingModel.seat_number == requested_seat_number,
-        BookingModel.booking_status == "confirmed"
-    ).first()
-    if existing_booking:
+    # Check if the same seat is available on the new flight (in-memory seat map)
+    if seat_maps.is_taken(db, payload.new_flight_id, requested_seat_number):
         raise HTTPException(status_code=400, detail="Your preferred seat is not available on the new flight")
-    
-    # Cancel the original booking (return seat to availability)
-    original_booking.booking_status = "cancelled"
-    original_flight = db.query(FlightModel).filter(FlightModel.id == original_booking.flight_id).first()
-    if original_flight:
-        if original_booking.seat_class == "economy":
-            original_flight.available_economy_seats += 1
-        elif original_booking.seat_class == "business":
-            original_flight.available_business_seats += 1
-    
-    # Create new unique booking reference (6 uppercase letters)
-    new_reference = ''.join(random.choices(string.ascii_uppercase, k=6))
-    while db.query(BookingModel).filter(BookingModel.booking_reference == new_reference).first():
-        new_reference = ''.join(random.choices(string.ascii_uppercase, k=6))
-
-    # Create new booking with same passenger info but new flight
-    new_booking = BookingModel(
-        booking_reference=new_reference,
-        user_id=current_user.id,
-        flight_id=payload.new_flight_id,
-        passenger_name=original_booking.passenger_name,
-        passenger_email=original_booking.passenger_email,
-        passport_number=original_booking.passport_number,
-        seat_class=requested_seat_class,
-        seat_number=requested_seat_number,
-        total_price=original_booking.total_price,  # Keep same price for now
-        booking_date=datetime.now()
-    )
-    
-    db.add(new_booking)
-    
-    # Update new flight seat availability
-    if requested_seat_class == "economy":
-        new_flight.available_economy_seats -= 1
-    elif requested_seat_class == "business":
-        new_flight.available_business_seats -= 1
-    
-    db.commit()
+    new_seat = [(payload.new_flight_id, requested_seat_number)]
+    if seat_holds.claim(current_user.id, new_seat):
+        raise HTTPException(status_code=400, detail="Your preferred seat is on hold for another customer")
+    
+    # From here on, any failure rolls back and lets go of the hold
+    try:
+        # Create new unique booking reference (no database lookup, see services/booking_reference.py).
+        # Done before any writes, as reserving a new block of references needs its own transaction.
+        new_reference = reference_allocator.next(db.get_bind())
+
+        # Cancel the original booking (return seat to availability). Only a still
+        # confirmed booking can be moved, checked atomically in the UPDATE.
+        cancelled = db.query(BookingModel).filter(
+            BookingModel.id == booking_id,
+            BookingModel.booking_status == "confirmed"
+        ).update({BookingModel.booking_status: "cancelled"}, synchronize_session=False)
+        if not cancelled:
+            raise HTTPException(status_code=400, detail="Booking can no longer be rescheduled")
+        release_seat(db, original_booking.flight_id, original_booking.seat_class)
+
+        # Take a seat on the new flight (atomic, rolled back with everything else on failure)
+        if not reserve_seat(db, payload.new_flight_id, requested_seat_class):
+            raise HTTPException(status_code=400, detail=f"No available {requested_seat_class} seats on the new flight")
+
+        # Create new booking with same passenger info but new flight
+        new_booking = BookingModel(
+            booking_reference=new_reference,
+            user_id=current_user.id,
+            flight_id=payload.new_flight_id,
+            passenger_name=original_booking.passenger_name,
+            passenger_email=original_booking.passenger_email,
+            passport_number=original_booking.passport_number,
+            seat_class=requested_seat_class,
+            seat_number=requested_seat_number,
+            total_price=original_booking.total_price,  # Keep same price for now
+            booking_date=datetime.now()
+        )
+
+        db.add(new_booking)
+
+        # Insert the new booking. The unique index rejects it if the seat is taken.
+        try:
+            db.flush()
+        except IntegrityError as error:
+            if not is_seat_conflict(error):
+                raise
+            seat_maps.mark_taken(payload.new_flight_id, requested_seat_number)
+            raise HTTPException(status_code=400, detail="Your preferred seat is not available on the new flight")
+
+        db.commit()
+    except Exception:
+        db.rollback()
+        seat_holds.release(new_seat, current_user.id)
+        raise
+    seat_maps.mark_free(original_booking.flight_id, original_booking.seat_number)
+    seat_maps.mark_taken(payload.new_flight_id, requested_seat_number)
+    seat_holds.release(new_seat, current_user.id, booked=True)
+    flight_cache.invalidate(original_booking.flight_id)  # Seat counts changed on both flights
+    flight_cache.invalidate(payload.new_flight_id)
     db.refresh(new_booking)
     
     return {
@@ -455,40 +499,39 @@ def check_in_booking(booking_id: int, db: Session = Depends(get_db), current_use
     if not db_booking:
         raise HTTPException(status_code=404, detail="Booking not found")
     
-    # Only confirmed bookings can be checked in
-    if db_booking.booking_status != "confirmed":
-        raise HTTPException(status_code=400, detail="Only confirmed bookings can be checked in")
-    
     # Get the flight details for miles calculation
     flight = db.query(FlightModel).filter(FlightModel.id == db_booking.flight_id).first()
     if not flight:
         raise HTTPException(status_code=404, detail="Flight not found")
     
-    # Calculate miles and points earned
-    distance = calculate_flight_distance(flight.departure_airport, flight.arrival_airport)
-    miles_earned = calculate_miles_earned(distance, db_booking.seat_class, current_user.loyalty_tier or "BLUE")
-    points_earned = calculate_points_earned(miles_earned)
-    
-    # Update user's loyalty data
-    current_user.loyalty_miles = (current_user.loyalty_miles or 0) + miles_earned
-    current_user.loyalty_points = (current_user.loyalty_points or 0) + points_earned
-    
-    # Check for tier upgrade after adding miles
-    tier_upgrade_info = check_and_upgrade_loyalty_tier(current_user)
-    
-    # Mark booking as checked in
-    db_booking.booking_status = "checked_in"
+    # Mark booking as checked in. Only confirmed bookings can be checked in, and
+    # the status check is part of the UPDATE itself, so two parallel check-ins
+    # of the same booking can't both award miles.
+    checked_in = db.query(BookingModel).filter(
+        BookingModel.id == booking_id,
+        BookingModel.booking_status == "confirmed"
+    ).update({BookingModel.booking_status: "checked_in"}, synchronize_session=False)
+    if not checked_in:
+        raise HTTPException(status_code=400, detail="Only confirmed bookings can be checked in")
     
-    # Save all changes
+    # Award the miles, points and any tier upgrade in the same transaction
+    # (see services/loyalty.py). A booking that already earned gets nothing.
+    accruals = accrue_bookings(db, [booking_id]).accruals
     db.commit()
+    invalidate_user(current_user.id)  # Loyalty fields changed
     db.refresh(current_user)
     
+    accrual = accruals[0] if accruals else None
+    old_tier = accrual.loyalty_tier if accrual else current_user.loyalty_tier or "BLUE"
+    distance = accrual.flight_distance if accrual else flight_distance(flight.distance_miles, flight.departure_airport, flight.arrival_airport)
+    new_tier = current_user.loyalty_tier or "BLUE"
+    
     # Prepare response with tier upgrade information
     response_data = {
         "message": f"Successfully checked in for booking {db_booking.booking_reference}",
         "loyalty_rewards": {
-            "miles_earned": miles_earned,
-            "points_earned": points_earned,
+            "miles_earned": accrual.miles if accrual else 0,
+            "points_earned": accrual.points if accrual else 0,
             "total_miles": current_user.loyalty_miles,
             "total_points": current_user.loyalty_points,
             "flight_distance": distance,
@@ -498,20 +541,20 @@ def check_in_booking(booking_id: int, db: Session = Depends(get_db), current_use
     }
     
     # Add tier upgrade information if user was upgraded
-    if tier_upgrade_info["tier_upgraded"]:
+    if new_tier != old_tier:
         response_data["tier_upgrade"] = {
             "upgraded": True,
-            "old_tier": tier_upgrade_info["old_tier"],
-            "new_tier": tier_upgrade_info["new_tier"],
-            "total_points": tier_upgrade_info["total_points"],
-            "next_tier_threshold": tier_upgrade_info["next_tier_threshold"]
+            "old_tier": old_tier,
+            "new_tier": new_tier,
+            "total_points": current_user.loyalty_points,
+            "next_tier_threshold": next_tier_threshold(new_tier)
         }
     else:
         response_data["tier_upgrade"] = {
             "upgraded": False,
             "current_tier": current_user.loyalty_tier,
             "total_points": current_user.loyalty_points,
-            "next_tier_threshold": tier_upgrade_info["next_tier_threshold"]
+            "next_tier_threshold": next_tier_threshold(new_tier)
         }
     
     return response_data
@@ -1,43 +1,153 @@
-from fastapi import APIRouter, HTTPException, Depends
+import tempfile
+from fastapi import APIRouter, HTTPException, Depends, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+from pydantic import TypeAdapter
+from sqlalchemy import select
 from sqlalchemy.orm import Session
 from models.flight import FlightModel
+from models.user import UserModel
 from serializers.flight import FlightSchema, FlightCreate as FlightCreateSchema, FlightUpdate as FlightUpdateSchema
 from typing import List
-from database import get_db
+from database import get_db, engine
+from dependencies.get_current_user import get_current_user, get_admin_user, invalidate_user
+from dependencies.pagination import PageParams, PAGE_HEADERS, get_page_params, paginate
+from dependencies.read_db import get_read_db
+from services.seat_map import seat_maps
+from services.seat_holds import seat_holds
+from services.read_replicas import stale_seconds
+from services.flight_cache import CachedResponse, flight_cache, cached_response
+from services.schedule_import import FORMATS as IMPORT_FORMATS, import_schedule
+from services.route_distance import route_distance
+from services.loyalty import accrue_pending
 
 router = APIRouter()
 
+flight_list_adapter = TypeAdapter(List[FlightSchema])
+
+
+# =============================================================================
+# CACHED RESPONSE BUILDERS - Used by the polled GET endpoints below
+# =============================================================================
+# Each builder queries the data, serializes it once and stores it in
+# flight_cache (see services/flight_cache.py). They take a plain Session so
+# the async controller can run them too.
+
+def flight_list_key(page: PageParams) -> tuple:
+    return ("flights", page.limit, page.after, page.count)
+
+
+def build_flight_list(db: Session, page: PageParams) -> CachedResponse:
+    version = flight_cache.version()
+    headers = Response()
+    # Plain column tuples: nothing here needs ORM objects
+    flights = paginate(db.query(*FlightModel.__table__.columns), FlightModel.id, page, headers)
+    body = flight_list_adapter.dump_json(flight_list_adapter.validate_python([flight._asdict() for flight in flights]))
+    page_headers = {name: headers.headers[name] for name in PAGE_HEADERS if name in headers.headers}
+    return flight_cache.put(flight_list_key(page), version, body, page_headers, stale_seconds=stale_seconds(db))
+
+
+def build_booked_seats(db: Session, flight_id: int) -> dict:
+    """Taken and held seats for the seat map screen (not cached, holds change by the second)"""
+    seat_map = seat_maps.get(db, flight_id)
+    if seat_map is None:
+        return {"booked_seats": [], "held_seats": []}
+    held = sorted(hold.seat_number for hold in seat_holds.holds_for(flight_id))
+    return {"booked_seats": seat_map.taken_seats(), "held_seats": held, "seat_map": seat_map.encode(held)}
+
+
+def build_single_flight(db: Session, flight_id: int):
+    version = flight_cache.version(flight_id)
+    flight = db.query(FlightModel).filter(FlightModel.id == flight_id).first()
+    if not flight:
+        return None
+    body = FlightSchema.model_validate(flight, from_attributes=True).model_dump_json().encode()
+    return flight_cache.put(("flight", flight_id), version, body, flight_id=flight_id, stale_seconds=stale_seconds(db))
+
+
+def build_flight_status(db: Session, flight_number: str):
+    flight = db.query(FlightModel).filter(FlightModel.flight_number == flight_number).first()
+    if not flight:
+        return None
+    # The flight ID is only known after the query, so the version is read here.
+    # A change committed in between is picked up when the entry expires.
+    version = flight_cache.version(flight.id)
+    body = JSONResponse(jsonable_encoder({
+        "flight_number": flight.flight_number,
+        "status": flight.status,
+        "departure_airport": flight.departure_airport,
+        "arrival_airport": flight.arrival_airport,
+        "departure_time": flight.departure_time,
+        "arrival_time": flight.arrival_time
+    })).body
+    return flight_cache.put(("status", flight_number), version, body, flight_id=flight.id, stale_seconds=stale_seconds(db))
+
 
 # ------------------------
-# Get all flights
+# Get all flights (one page at a time, see dependencies/pagination.py)
+# Cached, supports If-None-Match
 # ------------------------
 @router.get('/flights', response_model=List[FlightSchema])
-def get_flights(db: Session=Depends(get_db)):
-    flights = db.query(FlightModel).all()
-    return flights
+def get_flights(request: Request, page: PageParams = Depends(get_page_params), db: Session=Depends(get_read_db)):
+    entry = flight_cache.get(flight_list_key(page)) or build_flight_list(db, page)
+    return cached_response(request, entry)
 
 # =============================================================================
 # GET BOOKED SEATS - Returns all taken seats for a specific flight
 # =============================================================================
 @router.get("/flights/{flight_id}/booked-seats")
 def get_booked_seats(flight_id: int, db: Session = Depends(get_db)):
-    """Get all booked seat numbers for a flight so the seat map can show availability"""
-    from models.booking import BookingModel
-    booked = db.query(BookingModel.seat_number).filter(
-        BookingModel.flight_id == flight_id,
-        BookingModel.booking_status == "confirmed"
-    ).all()
-    return {"booked_seats": [seat[0] for seat in booked if seat[0]]}
+    """Get all booked seat numbers for a flight so the seat map can show availability.
+
+    Served from the in-memory seat map. "held_seats" are seats on hold during
+    someone's checkout, which can't be booked either. "seat_map" is the same
+    data as compact bitmaps (see SeatMap.encode) for clients that render the
+    whole cabin.
+    """
+    return build_booked_seats(db, flight_id)
+
+
+# =============================================================================
+# SEAT HOLDS - Keep a seat for a few minutes while the customer checks out
+# =============================================================================
+# The seat map shows held seats as unavailable, and nobody else can hold or
+# book a held seat until the hold is released, booked or expires
+# (see services/seat_holds.py).
+
+@router.post("/flights/{flight_id}/seats/{seat_number}/hold")
+def hold_seat(flight_id: int, seat_number: str, db: Session = Depends(get_db), current_user: UserModel = Depends(get_current_user)):
+    """Hold a seat for the current user. Holding it again renews the hold."""
+    seat_map = seat_maps.get(db, flight_id)
+    if seat_map is None:
+        raise HTTPException(status_code=404, detail="Flight not found")
+    if seat_map.is_taken(seat_number):
+        raise HTTPException(status_code=400, detail="Seat already taken")
+    own_holds = {hold.seat_number for hold in seat_holds.holds_for(flight_id) if hold.user_id == current_user.id}
+    if seat_number not in own_holds and len(own_holds) >= seat_holds.max_per_flight:
+        raise HTTPException(status_code=400, detail=f"You can hold at most {seat_holds.max_per_flight} seats on a flight")
+    hold = seat_holds.hold(flight_id, seat_number, current_user.id)
+    if hold is None:
+        raise HTTPException(status_code=400, detail="Seat is on hold for another customer")
+    return hold.as_dict()
+
+
+@router.delete("/flights/{flight_id}/seats/{seat_number}/hold")
+def release_seat_hold(flight_id: int, seat_number: str, current_user: UserModel = Depends(get_current_user)):
+    """Give up the current user's hold on a seat"""
+    if not seat_holds.release([(flight_id, seat_number)], current_user.id):
+        raise HTTPException(status_code=404, detail="Hold not found")
+    return {"message": f"Seat {seat_number} released"}
     
 # ------------------------
-# Get on flight by ID
+# Get on flight by ID (cached, supports If-None-Match)
 # ------------------------
 @router.get("/flights/{flight_id}", response_model=FlightSchema)
-def get_single_flight(flight_id: int, db: Session = Depends(get_db)):
-    flight = db.query(FlightModel).filter(FlightModel.id == flight_id).first()
-    if not flight:
+def get_single_flight(flight_id: int, request: Request, db: Session = Depends(get_read_db)):
+    entry = flight_cache.get(("flight", flight_id)) or build_single_flight(db, flight_id)
+    if not entry:
         raise HTTPException(status_code=404, detail="Flight not found")
-    return flight
+    return cached_response(request, entry)
 
 
 # ------------------------
@@ -52,14 +162,63 @@ def create_flight(flight: FlightCreateSchema, db: Session = Depends(get_db)):
     
     
     new_flight = FlightModel(**flight.dict())  # Unpack all data into the model
+    new_flight.distance_miles = route_distance(flight.departure_airport, flight.arrival_airport)
     
     # save in the database
     db.add(new_flight)
     db.commit()
+    flight_cache.invalidate()  # New flight shows up in the flight list
     db.refresh(new_flight)  # Refresh to get the new ID
     return new_flight
 
 
+# ------------------------
+# Bulk import a schedule from CSV or NDJSON (see services/schedule_import.py)
+# ------------------------
+# The body is the raw file, e.g.
+#     curl -X POST --data-binary @schedule.csv -H "Content-Type: text/csv" .../api/flights/import
+# Rows that fail validation are listed in the response, the rest are imported.
+# Admins only (ADMIN_USERNAMES), as one request can change thousands of flights.
+IMPORT_SPOOL_BYTES = 8 * 1024 * 1024  # Bigger uploads are buffered on disk, not in memory
+IMPORT_CONTENT_TYPES = {"text/csv": "csv", "application/x-ndjson": "ndjson", "application/jsonl": "ndjson"}
+
+
+@router.post("/flights/import", dependencies=[Depends(get_admin_user)])
+async def import_flights(request: Request, format: str = Query(None, description="csv or ndjson (default: from Content-Type)")):
+    file_format = format or IMPORT_CONTENT_TYPES.get(request.headers.get("content-type", "").split(";")[0].strip())
+    if file_format not in IMPORT_FORMATS:
+        raise HTTPException(status_code=400, detail="Send text/csv or application/x-ndjson, or pass ?format=csv|ndjson")
+
+    with tempfile.SpooledTemporaryFile(max_size=IMPORT_SPOOL_BYTES) as upload:
+        async for data in request.stream():
+            upload.write(data)
+        upload.seek(0)
+        # Parsing and database writes block, so they run on a worker thread
+        report = await run_in_threadpool(import_schedule, engine, upload, file_format)
+
+    if report.created or report.updated:
+        seat_maps.invalidate()  # Aircraft may have changed
+        flight_cache.invalidate_all()
+    return report.as_dict()
+
+
+# ------------------------
+# Award loyalty miles for a flight's check-ins
+# ------------------------
+# Meant to run when the flight departs. Every checked-in booking on it that
+# hasn't earned yet gets its miles in one batch (see services/loyalty.py), so
+# running it again, or after some passengers already earned at check-in, is safe.
+# Admins only (ADMIN_USERNAMES).
+@router.post("/flights/{flight_id}/loyalty-accrual", dependencies=[Depends(get_admin_user)])
+def accrue_flight_loyalty(flight_id: int, db: Session = Depends(get_db)):
+    if not db.query(FlightModel.id).filter(FlightModel.id == flight_id).first():
+        raise HTTPException(status_code=404, detail="Flight not found")
+    report = accrue_pending(db, flight_ids=[flight_id])
+    for user_id in report.user_ids:
+        invalidate_user(user_id)  # Loyalty fields changed
+    return report.as_dict()
+
+
 # ------------------------
 # Update an existing flight
 # ------------------------
@@ -73,8 +232,11 @@ def update_flight(flight_id: int, flight: FlightUpdateSchema, db: Session = Depe
     flight_data = flight.dict(exclude_unset=True, exclude={'id'}) 
     for key, value in flight_data.items():
         setattr(db_flight, key, value)
+    db_flight.distance_miles = route_distance(db_flight.departure_airport, db_flight.arrival_airport)
 
     db.commit()  # Save changes
+    seat_maps.invalidate(flight_id)  # Aircraft may have changed
+    flight_cache.invalidate(flight_id)
     db.refresh(db_flight)  # Refresh to get updated data
     return db_flight
 
@@ -91,6 +253,8 @@ def delete_flight(flight_id: int, db: Session = Depends(get_db)):
 
     db.delete(db_flight)  # Remove from database
     db.commit()  # Save changes
+    seat_maps.invalidate(flight_id)
+    flight_cache.invalidate(flight_id)
     return {"message": f"Flight with ID {flight_id} has been deleted"}
 
 
@@ -99,30 +263,24 @@ def delete_flight(flight_id: int, db: Session = Depends(get_db)):
 # Search flight by departure and arrival 
 # ------------------------
 @router.get("/flights/search/{departure_airport}/{arrival_airport}")
-def search_flights(departure_airport: str, arrival_airport: str, db: Session = Depends(get_db)):
-    flights = db.query(FlightModel).filter(
+def search_flights(departure_airport: str, arrival_airport: str, db: Session = Depends(get_read_db)):
+    flights = db.execute(select(FlightModel.__table__).where(
         FlightModel.departure_airport == departure_airport,
         FlightModel.arrival_airport == arrival_airport,
         #  only upcoming scheduled flights 
         FlightModel.status == "scheduled"
-    ).all()
-    return flights
+    )).mappings()
+    # Plain rows, written by orjson as they are (no ORM objects, no jsonable_encoder)
+    return ORJSONResponse([dict(flight) for flight in flights])
 
 
 # ------------------------
-# Get the status of a flight by flight number
+# Get the status of a flight by flight number (cached, supports If-None-Match)
 # ------------------------
 @router.get("/flights/status/{flight_number}")
-def get_flight_status(flight_number: str, db: Session = Depends(get_db)):
-    flight = db.query(FlightModel).filter(FlightModel.flight_number == flight_number).first()
-    if not flight:
+def get_flight_status(flight_number: str, request: Request, db: Session = Depends(get_read_db)):
+    entry = flight_cache.get(("status", flight_number)) or build_flight_status(db, flight_number)
+    if not entry:
         raise HTTPException(status_code=404, detail="Flight not found")
-    return {
-        "flight_number": flight.flight_number,
-        "status": flight.status,
-        "departure_airport": flight.departure_airport,
-        "arrival_airport": flight.arrival_airport,
-        "departure_time": flight.departure_time,
-        "arrival_time": flight.arrival_time
-    }
+    return cached_response(request, entry)
 
@@ -0,0 +1,74 @@
+# =============================================================================
+# SYSTEM CONTROLLER - Operational endpoints for monitoring the API itself
+# =============================================================================
+# Nothing here touches flights, bookings or users. These endpoints report how
+# the server is doing (connection pools, seat holds etc.) so it can be tuned in
+# production. Every endpoint here is for admins only (ADMIN_USERNAMES).
+
+from fastapi import APIRouter, Depends
+from pydantic import BaseModel, Field
+from database import get_pool_stats
+from services.seat_holds import seat_holds
+from services.read_replicas import replica_router
+from middleware.idempotency import get_idempotency_stats
+from middleware.profiling import settings as profiling_settings, set_profiling
+from dependencies.get_current_user import get_admin_user
+
+router = APIRouter(dependencies=[Depends(get_admin_user)])
+
+
+# ------------------------
+# Database connection pool usage
+# ------------------------
+@router.get("/db-pool")
+def get_db_pool():
+    """Checked-out/overflow connections and time spent waiting for one"""
+    return get_pool_stats()
+
+
+# ------------------------
+# Read replicas (see services/read_replicas.py)
+# ------------------------
+@router.get("/replicas")
+def get_replicas():
+    """Each replica's lag and health, and how many reads went to the primary instead"""
+    return replica_router.stats()
+
+
+# ------------------------
+# Seat holds (see services/seat_holds.py)
+# ------------------------
+@router.get("/seat-holds")
+def get_seat_holds():
+    """Live holds in this worker and how many were booked or expired"""
+    return seat_holds.stats()
+
+
+# ------------------------
+# Stored Idempotency-Key responses (see middleware/idempotency.py)
+# ------------------------
+@router.get("/idempotency")
+def get_idempotency():
+    """Stored responses, requests still running and how many retries were replayed"""
+    return get_idempotency_stats()
+
+
+# ------------------------
+# SQL profiling and N+1 detection (see middleware/profiling.py)
+# ------------------------
+class ProfilingUpdate(BaseModel):
+    enabled: bool
+    slow_query_ms: float | None = Field(None, ge=0)  # Unchanged if left out
+    repeat_threshold: int | None = Field(None, ge=2)
+
+
+@router.get("/profiling")
+def get_profiling():
+    """Whether SQL profiling is on, its thresholds and what it has found"""
+    return profiling_settings.as_dict()
+
+
+@router.put("/profiling")
+def update_profiling(update: ProfilingUpdate):
+    """Turn SQL profiling on or off without a restart"""
+    return set_profiling(update.enabled, update.slow_query_ms, update.repeat_threshold)
@@ -1,10 +1,14 @@
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Response
+from fastapi.concurrency import run_in_threadpool
 from sqlalchemy.orm import Session
 from typing import List
 from models.user import UserModel
 from serializers.user import UserSchema, UserToken, UserLogin, UserResponseSchema
 from database import get_db
-from dependencies.get_current_user import get_current_user
+from services.password_pool import password_pool
+from dependencies.password_slot import password_slot
+from dependencies.get_current_user import get_current_user, get_admin_user, get_user_cache_stats
+from dependencies.pagination import PageParams, get_page_params, paginate
 from pydantic import BaseModel
 
 # Create a router for user-related endpoints
@@ -22,13 +26,29 @@ class LoyaltyData(BaseModel):
 # ------------------------
 # User Registration (Signup)
 # ------------------------
-@router.post("/register", response_model=UserResponseSchema)
-def create_user(user: UserSchema, db: Session = Depends(get_db)):
-    # Check if the username or email already exists
-    existing_user = db.query(UserModel).filter(
+# Register and login are async so that waiting for bcrypt (on the worker pool,
+# see services/password_pool.py) doesn't hold a threadpool thread. Their
+# database work still runs on the threadpool, inside the request's password
+# pool slot (dependencies/password_slot.py).
+
+def find_existing_user(db: Session, user: UserSchema):
+    return db.query(UserModel).filter(
         (UserModel.username == user.username) | (UserModel.email == user.email)
     ).first()
 
+
+def save_new_user(db: Session, new_user: UserModel) -> UserModel:
+    db.add(new_user)
+    db.commit()
+    db.refresh(new_user)
+    return new_user
+
+
+@router.post("/register", response_model=UserResponseSchema)
+async def create_user(user: UserSchema, _slot: None = Depends(password_slot), db: Session = Depends(get_db)):
+    # Check if the username or email already exists
+    existing_user = await run_in_threadpool(find_existing_user, db, user)
+
     if existing_user:
         raise HTTPException(status_code=400, detail="Username or email already exists")
     
@@ -40,44 +60,53 @@ def create_user(user: UserSchema, db: Session = Depends(get_db)):
         last_name=user.last_name,
         phone_number=user.phone_number or None  # Handle optional phone number
     )
-    # Use the set_password method to hash the password before saving
-    new_user.set_password(user.password)
+    # Hash the password on the bcrypt worker pool before saving
+    new_user.password_hash = await password_pool.hash(user.password)
     
     # Save user in database
-    db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
-
-    return new_user # Response will hide the password (using schema)
+    return await run_in_threadpool(save_new_user, db, new_user)  # Response will hide the password (using schema)
 
 
 # ------------------------
 # User Login (Authentication)
 # ------------------------
+def find_login_user(db: Session, user: UserLogin):
+    """Find the user by email, Falcon Flyer number, or username"""
+    if user.email:
+        # Login with email
+        return db.query(UserModel).filter(UserModel.email == user.email).first()
+    if user.falcon_flyer_number:
+        # Login with Falcon Flyer number (using username field for now)
+        # In a real app, you'd have a separate Falcon Flyer number field
+        return db.query(UserModel).filter(UserModel.username == user.falcon_flyer_number).first()
+    # Login with username
+    return db.query(UserModel).filter(UserModel.username == user.username).first()
+
+
+def save_password_hash(db: Session, db_user: UserModel, password_hash: str) -> None:
+    db_user.password_hash = password_hash
+    db.commit()
+
+
 @router.post("/login", response_model=UserToken)
-def login(user: UserLogin, db: Session = Depends(get_db)):
+async def login(user: UserLogin, _slot: None = Depends(password_slot), db: Session = Depends(get_db)):
     
     # Validate that at least one identifier is provided
     if not any([user.email, user.falcon_flyer_number, user.username]):
         raise HTTPException(status_code=400, detail="Please provide email, Falcon Flyer number, or username")
     
-    # Find the user by email, Falcon Flyer number, or username
-    db_user = None
-    
-    if user.email:
-        # Login with email
-        db_user = db.query(UserModel).filter(UserModel.email == user.email).first()
-    elif user.falcon_flyer_number:
-        # Login with Falcon Flyer number (using username field for now)
-        # In a real app, you'd have a separate Falcon Flyer number field
-        db_user = db.query(UserModel).filter(UserModel.username == user.falcon_flyer_number).first()
-    elif user.username:
-        # Login with username
-        db_user = db.query(UserModel).filter(UserModel.username == user.username).first()
+    db_user = await run_in_threadpool(find_login_user, db, user)
 
-    # Check if the user exists and if the password is correct
-    if not db_user or not db_user.verify_password(user.password):
+    # Check if the user exists and if the password is correct (on the bcrypt worker pool)
+    if not db_user:
         raise HTTPException(status_code=400, detail="Invalid credentials")
+    valid, new_hash = await password_pool.verify_and_update(user.password, db_user.password_hash)
+    if not valid:
+        raise HTTPException(status_code=400, detail="Invalid credentials")
+
+    # The bcrypt cost factor has changed since this hash was made, so store a fresh one
+    if new_hash:
+        await run_in_threadpool(save_password_hash, db, db_user, new_hash)
 
     # Generate JWT token
     token = db_user.generate_token()
@@ -87,11 +116,11 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
 
 
 # ------------------------
-# Get all users
+# Get all users (one page at a time, see dependencies/pagination.py)
 # ------------------------
 @router.get('/users', response_model=List[UserResponseSchema])
-def get_users(db: Session=Depends(get_db)):
-    users = db.query(UserModel).all()
+def get_users(response: Response, page: PageParams = Depends(get_page_params), db: Session=Depends(get_db)):
+    users = paginate(db.query(UserModel), UserModel.id, page, response)
     return users
 
 
@@ -120,3 +149,13 @@ def get_loyalty_data(current_user: UserModel = Depends(get_current_user)):
         first_name=current_user.first_name or "",
         last_name=current_user.last_name or ""
     )
+
+
+# ------------------------
+# Auth cache statistics (for sizing USER_CACHE_SIZE / USER_CACHE_TTL_SECONDS)
+# Admins only (ADMIN_USERNAMES)
+# ------------------------
+@router.get("/cache-stats", dependencies=[Depends(get_admin_user)])
+def get_cache_stats():
+    """Hit/miss counters for the user and token caches used by get_current_user"""
+    return get_user_cache_stats()
@@ -0,0 +1,39 @@
+# data/airport_data.py
+
+# Airports on the Gulf Air network. This list is the seed data for the airports
+# table, which the route distance matrix in services/route_distance.py is built
+# from. It is only used directly while that table doesn't exist yet.
+
+AIRPORTS = [
+    # Middle East
+    {"code": "BAH", "name": "Bahrain International", "city": "Bahrain", "country": "Bahrain", "latitude": 26.2708, "longitude": 50.6336},
+    {"code": "DXB", "name": "Dubai International", "city": "Dubai", "country": "United Arab Emirates", "latitude": 25.2532, "longitude": 55.3657},
+    {"code": "DOH", "name": "Hamad International", "city": "Doha", "country": "Qatar", "latitude": 25.2611, "longitude": 51.5651},
+    {"code": "KWI", "name": "Kuwait International", "city": "Kuwait", "country": "Kuwait", "latitude": 29.2269, "longitude": 47.9789},
+    {"code": "RUH", "name": "King Khalid International", "city": "Riyadh", "country": "Saudi Arabia", "latitude": 24.6408, "longitude": 46.7728},
+    {"code": "JED", "name": "King Abdulaziz International", "city": "Jeddah", "country": "Saudi Arabia", "latitude": 21.6796, "longitude": 39.1565},
+    {"code": "CAI", "name": "Cairo International", "city": "Cairo", "country": "Egypt", "latitude": 30.1127, "longitude": 31.4000},
+    {"code": "BEY", "name": "Beirut-Rafic Hariri International", "city": "Beirut", "country": "Lebanon", "latitude": 33.8209, "longitude": 35.4883},
+    {"code": "AMM", "name": "Queen Alia International", "city": "Amman", "country": "Jordan", "latitude": 31.7225, "longitude": 35.9933},
+
+    # Europe
+    {"code": "LHR", "name": "Heathrow", "city": "London", "country": "United Kingdom", "latitude": 51.4700, "longitude": -0.4543},
+    {"code": "CDG", "name": "Charles de Gaulle", "city": "Paris", "country": "France", "latitude": 49.0097, "longitude": 2.5479},
+    {"code": "FRA", "name": "Frankfurt", "city": "Frankfurt", "country": "Germany", "latitude": 50.0379, "longitude": 8.5622},
+    {"code": "MAD", "name": "Adolfo Suarez Madrid-Barajas", "city": "Madrid", "country": "Spain", "latitude": 40.4839, "longitude": -3.5680},
+    {"code": "FCO", "name": "Leonardo da Vinci-Fiumicino", "city": "Rome", "country": "Italy", "latitude": 41.8003, "longitude": 12.2389},
+    {"code": "ATH", "name": "Athens International", "city": "Athens", "country": "Greece", "latitude": 37.9364, "longitude": 23.9445},
+
+    # Asia
+    {"code": "BOM", "name": "Chhatrapati Shivaji Maharaj International", "city": "Mumbai", "country": "India", "latitude": 19.0896, "longitude": 72.8656},
+    {"code": "DEL", "name": "Indira Gandhi International", "city": "Delhi", "country": "India", "latitude": 28.5562, "longitude": 77.1000},
+    {"code": "BKK", "name": "Suvarnabhumi", "city": "Bangkok", "country": "Thailand", "latitude": 13.6900, "longitude": 100.7501},
+    {"code": "KUL", "name": "Kuala Lumpur International", "city": "Kuala Lumpur", "country": "Malaysia", "latitude": 2.7456, "longitude": 101.7099},
+    {"code": "SIN", "name": "Changi", "city": "Singapore", "country": "Singapore", "latitude": 1.3644, "longitude": 103.9915},
+    {"code": "HKG", "name": "Hong Kong International", "city": "Hong Kong", "country": "Hong Kong", "latitude": 22.3080, "longitude": 113.9185},
+
+    # Africa
+    {"code": "NBO", "name": "Jomo Kenyatta International", "city": "Nairobi", "country": "Kenya", "latitude": -1.3192, "longitude": 36.9278},
+    {"code": "JNB", "name": "O. R. Tambo International", "city": "Johannesburg", "country": "South Africa", "latitude": -26.1367, "longitude": 28.2411},
+    {"code": "ADD", "name": "Addis Ababa Bole International", "city": "Addis Ababa", "country": "Ethiopia", "latitude": 8.9779, "longitude": 38.7993},
+]
@@ -45,5 +45,3 @@ def create_bookings():
         booking_date=datetime.now() - timedelta(days=3)
     )
     ]
-
-bookings_list = create_bookings()
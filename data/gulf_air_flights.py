@@ -7,60 +7,80 @@
 from models.flight import FlightModel
 from models.aircraft import AircraftModel
 from datetime import datetime, timedelta
+from services.route_distance import route_distance
 import random
 
-def create_gulf_air_flights():
-    """Create realistic Gulf Air flights using curated route data"""
-    
-    # =============================================================================
-    # GULF AIR ROUTES - Curated routes based on real Gulf Air operations
-    # =============================================================================
-    # These are actual routes that Gulf Air operates, with real airport codes
-    # Routes are organized by region for better organization
-    
-    gulf_air_routes = [
-        # Middle East routes
-        {"from": "BAH", "to": "DXB", "from_city": "Bahrain", "to_city": "Dubai"},
-        {"from": "BAH", "to": "DOH", "from_city": "Bahrain", "to_city": "Doha"},
-        {"from": "BAH", "to": "KWI", "from_city": "Bahrain", "to_city": "Kuwait"},
-        {"from": "BAH", "to": "RUH", "from_city": "Bahrain", "to_city": "Riyadh"},
-        {"from": "BAH", "to": "JED", "from_city": "Bahrain", "to_city": "Jeddah"},
-        {"from": "BAH", "to": "CAI", "from_city": "Bahrain", "to_city": "Cairo"},
-        {"from": "BAH", "to": "BEY", "from_city": "Bahrain", "to_city": "Beirut"},
-        {"from": "BAH", "to": "AMM", "from_city": "Bahrain", "to_city": "Amman"},
-        
-        # European routes
-        {"from": "BAH", "to": "LHR", "from_city": "Bahrain", "to_city": "London"},
-        {"from": "BAH", "to": "CDG", "from_city": "Bahrain", "to_city": "Paris"},
-        {"from": "BAH", "to": "FRA", "from_city": "Bahrain", "to_city": "Frankfurt"},
-        {"from": "BAH", "to": "MAD", "from_city": "Bahrain", "to_city": "Madrid"},
-        {"from": "BAH", "to": "FCO", "from_city": "Bahrain", "to_city": "Rome"},
-        {"from": "BAH", "to": "ATH", "from_city": "Bahrain", "to_city": "Athens"},
-        
-        # Asian routes
-        {"from": "BAH", "to": "BOM", "from_city": "Bahrain", "to_city": "Mumbai"},
-        {"from": "BAH", "to": "DEL", "from_city": "Bahrain", "to_city": "Delhi"},
-        {"from": "BAH", "to": "BKK", "from_city": "Bahrain", "to_city": "Bangkok"},
-        {"from": "BAH", "to": "KUL", "from_city": "Bahrain", "to_city": "Kuala Lumpur"},
-        {"from": "BAH", "to": "SIN", "from_city": "Bahrain", "to_city": "Singapore"},
-        {"from": "BAH", "to": "HKG", "from_city": "Bahrain", "to_city": "Hong Kong"},
-        
-        # African routes
-        {"from": "BAH", "to": "NBO", "from_city": "Bahrain", "to_city": "Nairobi"},
-        {"from": "BAH", "to": "JNB", "from_city": "Bahrain", "to_city": "Johannesburg"},
-        {"from": "BAH", "to": "ADD", "from_city": "Bahrain", "to_city": "Addis Ababa"},
-    ]
-    
-    # =============================================================================
-    # AIRCRAFT TYPES - Gulf Air's simplified fleet specifications
-    # =============================================================================
-    # Only 2 aircraft types: Boeing 787 for long-haul and A320 for smaller routes
-    # Each aircraft has different seat configurations for economy and business classes
-    
-    aircraft_types = [
-        {"id": 1, "type": "Boeing 787 Dreamliner", "economy_seats": 252, "business_seats": 30},
-        {"id": 2, "type": "Airbus A320", "economy_seats": 132, "business_seats": 12},
-    ]
+# Average speed in the air, used for flight durations
+CRUISE_SPEED_MPH = 500
+
+# =============================================================================
+# GULF AIR ROUTES - Curated routes based on real Gulf Air operations
+# =============================================================================
+# These are actual routes that Gulf Air operates, with real airport codes
+# Routes are organized by region for better organization
+
+GULF_AIR_ROUTES = [
+    # Middle East routes
+    {"from": "BAH", "to": "DXB", "from_city": "Bahrain", "to_city": "Dubai"},
+    {"from": "BAH", "to": "DOH", "from_city": "Bahrain", "to_city": "Doha"},
+    {"from": "BAH", "to": "KWI", "from_city": "Bahrain", "to_city": "Kuwait"},
+    {"from": "BAH", "to": "RUH", "from_city": "Bahrain", "to_city": "Riyadh"},
+    {"from": "BAH", "to": "JED", "from_city": "Bahrain", "to_city": "Jeddah"},
+    {"from": "BAH", "to": "CAI", "from_city": "Bahrain", "to_city": "Cairo"},
+    {"from": "BAH", "to": "BEY", "from_city": "Bahrain", "to_city": "Beirut"},
+    {"from": "BAH", "to": "AMM", "from_city": "Bahrain", "to_city": "Amman"},
+
+    # European routes
+    {"from": "BAH", "to": "LHR", "from_city": "Bahrain", "to_city": "London"},
+    {"from": "BAH", "to": "CDG", "from_city": "Bahrain", "to_city": "Paris"},
+    {"from": "BAH", "to": "FRA", "from_city": "Bahrain", "to_city": "Frankfurt"},
+    {"from": "BAH", "to": "MAD", "from_city": "Bahrain", "to_city": "Madrid"},
+    {"from": "BAH", "to": "FCO", "from_city": "Bahrain", "to_city": "Rome"},
+    {"from": "BAH", "to": "ATH", "from_city": "Bahrain", "to_city": "Athens"},
+
+    # Asian routes
+    {"from": "BAH", "to": "BOM", "from_city": "Bahrain", "to_city": "Mumbai"},
+    {"from": "BAH", "to": "DEL", "from_city": "Bahrain", "to_city": "Delhi"},
+    {"from": "BAH", "to": "BKK", "from_city": "Bahrain", "to_city": "Bangkok"},
+    {"from": "BAH", "to": "KUL", "from_city": "Bahrain", "to_city": "Kuala Lumpur"},
+    {"from": "BAH", "to": "SIN", "from_city": "Bahrain", "to_city": "Singapore"},
+    {"from": "BAH", "to": "HKG", "from_city": "Bahrain", "to_city": "Hong Kong"},
+
+    # African routes
+    {"from": "BAH", "to": "NBO", "from_city": "Bahrain", "to_city": "Nairobi"},
+    {"from": "BAH", "to": "JNB", "from_city": "Bahrain", "to_city": "Johannesburg"},
+    {"from": "BAH", "to": "ADD", "from_city": "Bahrain", "to_city": "Addis Ababa"},
+]
+
+# =============================================================================
+# AIRCRAFT TYPES - Gulf Air's simplified fleet specifications
+# =============================================================================
+# Only 2 aircraft types: Boeing 787 for long-haul and A320 for smaller routes
+# Each aircraft has different seat configurations for economy and business classes
+
+AIRCRAFT_TYPES = [
+    {"id": 1, "type": "Boeing 787 Dreamliner", "economy_seats": 252, "business_seats": 30},
+    {"id": 2, "type": "Airbus A320", "economy_seats": 132, "business_seats": 12},
+]
+
+# Popular routes get at least one flight every day
+POPULAR_ROUTES = [
+    {"from": "BAH", "to": "DXB", "from_city": "Bahrain", "to_city": "Dubai"},
+    {"from": "BAH", "to": "KWI", "from_city": "Bahrain", "to_city": "Kuwait"},
+    {"from": "BAH", "to": "DOH", "from_city": "Bahrain", "to_city": "Doha"},
+    {"from": "BAH", "to": "CAI", "from_city": "Bahrain", "to_city": "Cairo"},
+]
+
+# Long-haul destinations are flown with the Boeing 787, everything else with the A320
+LONG_HAUL_DESTINATIONS = ["LHR", "CDG", "FRA", "BKK", "KUL", "SIN", "HKG", "JNB"]
+
+
+def create_gulf_air_flights(rng=random, start_date=None, days=30):
+    """Create realistic Gulf Air flights using curated route data.
+
+    Pass a random.Random(seed) as rng (and a fixed start_date) to get the same flights every time.
+    """
+    aircraft_types = AIRCRAFT_TYPES
     
     # =============================================================================
     # FLIGHT GENERATION - Create realistic flight schedule
@@ -69,41 +89,40 @@ def create_gulf_air_flights():
     
     flights = []
     flight_number = 1
+    start_date = start_date or datetime.now()
     
-    # Create flights for the next 30 days
-    for day in range(30):
-        current_date = datetime.now() + timedelta(days=day)
+    # Create flights for the next `days` days (30 by default)
+    for day in range(days):
+        current_date = start_date + timedelta(days=day)
         
         # Create 2-4 flights per day (realistic frequency)
-        daily_flights = random.randint(2, 4)
-        
-        # Ensure popular routes have flights every day
-        popular_routes = [
-            {"from": "BAH", "to": "DXB", "from_city": "Bahrain", "to_city": "Dubai"},
-            {"from": "BAH", "to": "KWI", "from_city": "Bahrain", "to_city": "Kuwait"},
-            {"from": "BAH", "to": "DOH", "from_city": "Bahrain", "to_city": "Doha"},
-            {"from": "BAH", "to": "CAI", "from_city": "Bahrain", "to_city": "Cairo"},
-        ]
+        daily_flights = rng.randint(2, 4)
         
         # Always create at least one flight for a popular route each day
         if daily_flights > 0:
-            route = random.choice(popular_routes)
-            create_flight_for_route(route, current_date, aircraft_types, flight_number, flights)
+            route = rng.choice(POPULAR_ROUTES)
+            create_flight_for_route(route, current_date, aircraft_types, flight_number, flights, rng)
             flight_number += 1
             daily_flights -= 1
         
         # Create remaining flights with random routes
         for flight_idx in range(daily_flights):
             # Select random route from Gulf Air's network
-            route = random.choice(gulf_air_routes)
-            create_flight_for_route(route, current_date, aircraft_types, flight_number, flights)
+            route = rng.choice(GULF_AIR_ROUTES)
+            create_flight_for_route(route, current_date, aircraft_types, flight_number, flights, rng)
             flight_number += 1
     
     return flights
 
 
-def create_flight_for_route(route, current_date, aircraft_types, flight_number, flights):
+def create_flight_for_route(route, current_date, aircraft_types, flight_number, flights, rng=random):
     """Create a single flight for a specific route and date"""
+    values = build_flight_values(route, current_date, aircraft_types, rng)
+    flights.append(FlightModel(flight_number=f"GF{flight_number:03d}", **values))  # Gulf Air flight numbers
+
+
+def build_flight_values(route, current_date, aircraft_types, rng=random):
+    """Column values for one flight (without the flight number), shared with data/synthetic.py"""
     
     # =============================================================================
     # AIRCRAFT SELECTION - Choose appropriate aircraft for route
@@ -111,7 +130,7 @@ def create_flight_for_route(route, current_date, aircraft_types, flight_number,
     # Long-haul routes use Boeing 787 Dreamliner
     # Short/medium-haul routes use Airbus A320
     
-    if route["to"] in ["LHR", "CDG", "FRA", "BKK", "KUL", "SIN", "HKG", "JNB"]:
+    if route["to"] in LONG_HAUL_DESTINATIONS:
         # Long-haul routes use Boeing 787 Dreamliner
         aircraft = aircraft_types[0]  # Boeing 787 Dreamliner
     else:
@@ -123,12 +142,12 @@ def create_flight_for_route(route, current_date, aircraft_types, flight_number,
     # =============================================================================
     # Departure times are between 6 AM and 11 PM with 15-minute intervals
     
-    departure_hour = random.randint(6, 23)
-    departure_minute = random.choice([0, 15, 30, 45])
+    departure_hour = rng.randint(6, 23)
+    departure_minute = rng.choice([0, 15, 30, 45])
     departure_time = current_date.replace(hour=departure_hour, minute=departure_minute, second=0, microsecond=0)
     
     # Calculate arrival time based on actual flight duration
-    flight_duration_hours = get_flight_duration(route["from"], route["to"])
+    flight_duration_hours = get_flight_duration(route["from"], route["to"], rng)
     arrival_time = departure_time + timedelta(hours=flight_duration_hours)
     
     # =============================================================================
@@ -136,7 +155,7 @@ def create_flight_for_route(route, current_date, aircraft_types, flight_number,
     # =============================================================================
     # Economy and business class pricing with realistic ratios
     
-    base_price = get_base_price(route["from"], route["to"])
+    base_price = get_base_price(route["from"], route["to"], rng)
     economy_price = base_price
     business_price = base_price * 2.5  # Business class is 2.5x economy price
     
@@ -144,10 +163,10 @@ def create_flight_for_route(route, current_date, aircraft_types, flight_number,
     # FLIGHT CREATION - Create the flight record
     # =============================================================================
     
-    flight = FlightModel(
-        flight_number=f"GF{flight_number:03d}",  # Gulf Air flight numbers
+    return dict(
         departure_airport=route["from"],  # Airport code
         arrival_airport=route["to"],      # Airport code
+        distance_miles=route_distance(route["from"], route["to"]),  # Route distance
         departure_time=departure_time,    # When flight leaves
         arrival_time=arrival_time,        # When flight arrives
         aircraft_id=aircraft["id"],       # Which aircraft to use
@@ -157,54 +176,25 @@ def create_flight_for_route(route, current_date, aircraft_types, flight_number,
         available_business_seats=aircraft["business_seats"],
         status="scheduled"
     )
-    
-    flights.append(flight)
 
 # =============================================================================
 # HELPER FUNCTIONS - Support functions for flight generation
 # =============================================================================
 
-def get_flight_duration(departure_airport, arrival_airport):
-    """Estimate flight duration based on route distance"""
-    # This is a simplified calculation - in reality you'd use great circle distance
-    # Routes are categorized by distance from Bahrain (BAH)
-    
-    # Short routes (Middle East) - 1.5-3 hours
-    short_routes = ["DXB", "DOH", "KWI", "RUH", "JED", "CAI", "BEY", "AMM"]
-    # Medium routes (Asia/Africa) - 4-7 hours  
-    medium_routes = ["BOM", "DEL", "BKK", "KUL", "SIN", "HKG", "NBO", "ADD"]
-    # Long routes (Europe) - 6-8 hours
-    long_routes = ["LHR", "CDG", "FRA", "MAD", "FCO", "ATH", "JNB"]
-    
-    if arrival_airport in short_routes:
-        return random.uniform(1.5, 3.0)  # 1.5-3 hours
-    elif arrival_airport in medium_routes:
-        return random.uniform(4.0, 7.0)  # 4-7 hours
-    elif arrival_airport in long_routes:
-        return random.uniform(6.0, 8.0)  # 6-8 hours
-    else:
-        return random.uniform(2.0, 4.0)  # Default 2-4 hours
+def get_flight_duration(departure_airport, arrival_airport, rng=random):
+    """Estimate flight duration from the route distance"""
+    distance = route_distance(departure_airport, arrival_airport)
+    if distance is None:
+        return rng.uniform(2.0, 4.0)  # Unknown airport: 2-4 hours
+    # Half an hour for taxi, climb and descent, then the distance at cruise speed
+    return 0.5 + distance / CRUISE_SPEED_MPH
 
-def get_base_price(departure_airport, arrival_airport):
+def get_base_price(departure_airport, arrival_airport, rng=random):
     """Generate base economy price based on route distance"""
     # This is a simplified pricing model - real airlines use complex algorithms
-    # Prices are based on distance and market demand
-    
-    # Short routes (Middle East) - $150-300
-    short_routes = ["DXB", "DOH", "KWI", "RUH", "JED", "CAI", "BEY", "AMM"]
-    # Medium routes (Asia/Africa) - $300-600
-    medium_routes = ["BOM", "DEL", "BKK", "KUL", "SIN", "HKG", "NBO", "ADD"]
-    # Long routes (Europe) - $600-1200
-    long_routes = ["LHR", "CDG", "FRA", "MAD", "FCO", "ATH", "JNB"]
-    
-    if arrival_airport in short_routes:
-        return random.uniform(150, 300)  # $150-300
-    elif arrival_airport in medium_routes:
-        return random.uniform(300, 600)  # $300-600
-    elif arrival_airport in long_routes:
-        return random.uniform(500, 1000)  # $500-1000
-    else:
-        return random.uniform(200, 400)  # Default $200-400
-
-# Create the flights list
-flights_list = create_gulf_air_flights()
+    # Prices are a fixed part plus a per-mile part, +/- 15% for market demand
+    # (about $180 to Dubai, $750 to London)
+    distance = route_distance(departure_airport, arrival_airport)
+    if distance is None:
+        return rng.uniform(200, 400)  # Default $200-400
+    return (120 + 0.2 * distance) * rng.uniform(0.85, 1.15)
@@ -0,0 +1,234 @@
+# =============================================================================
+# SYNTHETIC DATA - Production-sized datasets for capacity testing
+# =============================================================================
+# Generates any number of users, flights and bookings from the same route and
+# aircraft tables that seed.py uses (data/gulf_air_flights.py and the fleet in
+# models/aircraft.py).
+#   - Deterministic: everything comes from one random.Random(seed), so the same
+#     seed, sizes and start date give the same rows on the same database.
+#   - Streaming: rows are built as plain dicts and written with Core insert()
+#     in batches, so memory use stays flat from thousands to millions of rows.
+#   - Consistent: every booking has its own seat, and each flight's seat counters
+#     already have its live bookings taken off.
+#
+# New rows get IDs after the highest existing ones, so this can run on top of
+# the normal seed data. Run it with generate_data.py.
+
+import math
+import random
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+
+from sqlalchemy import func, select
+from sqlalchemy.engine import Engine
+from models.aircraft import AircraftModel
+from models.airport import AirportModel
+from models.booking import BookingModel
+from models.flight import FlightModel
+from models.user import UserModel
+from data.gulf_air_flights import AIRCRAFT_TYPES, GULF_AIR_ROUTES, POPULAR_ROUTES, build_flight_values
+from data.airport_data import AIRPORTS
+from data.gulf_air_fleet_info import get_seat_configuration
+from services.booking_reference import reference_allocator
+from services.loyalty import tier_for_points
+from services.password_pool import get_pwd_context
+from services.seat_map import ROW_LETTERS, seats_per_row
+
+DEFAULT_SEED = 42
+DEFAULT_START_DATE = datetime(2026, 1, 1)
+DEFAULT_DAYS = 365
+DEFAULT_BATCH_SIZE = 5000
+SYNTHETIC_PASSWORD = "password123"  # Every generated user can log in with this
+
+FIRST_NAMES = ["Ahmed", "Fatima", "Mohammed", "Aisha", "Ali", "Maryam", "Hassan", "Noor",
+               "Omar", "Layla", "Yusuf", "Sara", "John", "Emma", "Raj", "Priya"]
+LAST_NAMES = ["Al Khalifa", "Ahmed", "Hassan", "Ali", "Burashid", "Al Sayed", "Smith",
+              "Khan", "Sharma", "Haddad", "Saleh", "Mansoor", "Jones", "Nair"]
+
+@dataclass
+class GenerationReport:
+    users: int = 0
+    flights: int = 0
+    bookings: int = 0
+
+
+def cabin_seats(aircraft_type: str, business_seats: int, economy_seats: int) -> list:
+    """Every seat on an aircraft as (seat_number, seat_class), laid out like services/seat_map.py"""
+    config = get_seat_configuration(aircraft_type)
+    seats = []
+    row = 1
+    for seat_class, count in (("business", business_seats), ("economy", economy_seats)):
+        width = seats_per_row(config[seat_class]["layout"])
+        letters = ROW_LETTERS.get(width, "ABCDEFGHK"[:width])
+        for index in range(count):
+            seats.append((f"{row + index // width}{letters[index % width]}", seat_class))
+        row += math.ceil(count / width)
+    return seats
+
+
+def next_id(connection, model) -> int:
+    return (connection.execute(select(func.max(model.id))).scalar() or 0) + 1
+
+
+# =============================================================================
+# ROW GENERATORS - One dict per row, in ID order
+# =============================================================================
+
+def generate_users(rng: random.Random, first_id: int, count: int, password_hash: str):
+    for user_id in range(first_id, first_id + count):
+        points = rng.randint(0, 3000)
+        yield {
+            "id": user_id,
+            "username": f"user{user_id:08d}",
+            "email": f"user{user_id:08d}@example.com",
+            "password_hash": password_hash,
+            "first_name": rng.choice(FIRST_NAMES),
+            "last_name": rng.choice(LAST_NAMES),
+            "phone_number": f"+973{rng.randrange(10**7, 10**8)}",
+            "loyalty_miles": points * 10 + rng.randint(0, 9),
+            "loyalty_points": points,
+            "loyalty_tier": tier_for_points(points),
+            "membership_number": f"GS{user_id:08d}",
+        }
+
+
+def generate_flights(rng: random.Random, first_id: int, count: int, start_date: datetime, days: int, aircraft_types: list):
+    """Flights spread evenly over `days`, the first of each day on a popular route (like seed.py)"""
+    previous_day = None
+    for index in range(count):
+        day = index * days // count
+        route = rng.choice(POPULAR_ROUTES if day != previous_day else GULF_AIR_ROUTES)
+        previous_day = day
+        flight_id = first_id + index
+        values = build_flight_values(route, start_date + timedelta(days=day), aircraft_types, rng)
+        values.update(id=flight_id, flight_number=f"GS{flight_id:07d}")
+        yield values
+
+
+def generate_bookings(rng: random.Random, flight: dict, seats: list, count: int, user_ids: tuple, references):
+    """`count` bookings on distinct seats of one flight. Takes live bookings off the flight's seat counters."""
+    bookings = []
+    for seat_number, seat_class in rng.sample(seats, count):
+        user_id = rng.randint(*user_ids)
+        first_name, last_name = rng.choice(FIRST_NAMES), rng.choice(LAST_NAMES)
+        roll = rng.random()
+        status = "cancelled" if roll < 0.05 else "checked_in" if roll < 0.15 else "confirmed"
+        if status != "cancelled":
+            flight[f"available_{seat_class}_seats"] -= 1
+        bookings.append({
+            "booking_reference": reference_allocator.format(next(references)),
+            "user_id": user_id,
+            "flight_id": flight["id"],
+            "passenger_name": f"{first_name} {last_name}",
+            "passenger_email": f"{first_name}.{last_name.replace(' ', '')}{user_id}@example.com".lower(),
+            "passport_number": f"P{rng.randrange(10**7, 10**8)}",
+            "seat_class": seat_class,
+            "seat_number": seat_number,
+            "booking_status": status,
+            "total_price": round(flight[f"{seat_class}_price"], 2),
+            "booking_date": flight["departure_time"] - timedelta(days=rng.randint(1, 90)),
+        })
+    return bookings
+
+
+# =============================================================================
+# WRITING - Batched Core inserts, one transaction per batch
+# =============================================================================
+
+def ensure_aircraft(engine: Engine) -> dict:
+    """Aircraft rows by type, adding the Gulf Air fleet if the table is empty"""
+    table = AircraftModel.__table__
+    with engine.begin() as connection:
+        rows = connection.execute(select(table)).mappings().all()
+        if not rows:
+            connection.execute(table.insert(), AircraftModel.get_gulf_air_fleet())
+            rows = connection.execute(select(table)).mappings().all()
+    return {row["aircraft_type"]: row for row in rows}
+
+
+def ensure_airports(engine: Engine) -> None:
+    """Fill the airports table if it is empty"""
+    with engine.begin() as connection:
+        if connection.execute(select(func.count()).select_from(AirportModel.__table__)).scalar() == 0:
+            connection.execute(AirportModel.__table__.insert(), AIRPORTS)
+
+
+def insert_rows(engine: Engine, model, rows: list) -> None:
+    if rows:
+        with engine.begin() as connection:
+            connection.execute(model.__table__.insert(), rows)
+
+
+def generate(engine: Engine, users: int = 0, flights: int = 0, bookings: int = 0, seed: int = DEFAULT_SEED,
+             start_date: datetime = DEFAULT_START_DATE, days: int = DEFAULT_DAYS,
+             batch_size: int = DEFAULT_BATCH_SIZE, progress=None) -> GenerationReport:
+    """Add `users`, `flights` and `bookings` generated rows to the database"""
+    rng = random.Random(seed)
+    report = GenerationReport()
+    fleet = ensure_aircraft(engine)
+    ensure_airports(engine)
+    aircraft_types = [dict(aircraft, id=fleet[aircraft["type"]]["id"]) for aircraft in AIRCRAFT_TYPES]
+    smallest_cabin = min(aircraft["economy_seats"] + aircraft["business_seats"] for aircraft in aircraft_types)
+    if bookings and not flights:
+        raise ValueError("Bookings are only generated on new flights, so --flights must be more than 0")
+    if bookings > flights * smallest_cabin:
+        raise ValueError(f"At most {flights * smallest_cabin} bookings fit on {flights} flights")
+
+    with engine.connect() as connection:
+        first_user_id = next_id(connection, UserModel)
+        first_flight_id = next_id(connection, FlightModel)
+        existing_user_ids = connection.execute(select(func.min(UserModel.id), func.max(UserModel.id))).one()
+
+    # USERS - one bcrypt hash shared by all of them, hashing millions would take days
+    password_hash = get_pwd_context().hash(SYNTHETIC_PASSWORD)
+    batch = []
+    for row in generate_users(rng, first_user_id, users, password_hash):
+        batch.append(row)
+        if len(batch) >= batch_size:
+            insert_rows(engine, UserModel, batch)
+            report.users += len(batch)
+            batch = []
+            progress and progress(report)
+    insert_rows(engine, UserModel, batch)
+    report.users += len(batch)
+
+    # Bookings go to the new users, or to the existing ones if no users were asked for
+    user_ids = (first_user_id, first_user_id + users - 1) if users else tuple(existing_user_ids)
+    if bookings and user_ids[0] is None:
+        raise ValueError("There are no users to make the bookings, pass --users")
+
+    # FLIGHTS + BOOKINGS - each flight's bookings are made with it, so its seat
+    # counters are right when it is inserted. Flights go in before their bookings.
+    references = iter(reference_allocator.reserve_range(engine, bookings)) if bookings else iter(())
+    seats_by_type = {
+        aircraft_type: cabin_seats(aircraft_type, row["business_seats"], row["economy_seats"])
+        for aircraft_type, row in fleet.items()
+    }
+    type_by_id = {aircraft["id"]: aircraft["type"] for aircraft in aircraft_types}
+    flight_batch, booking_batch = [], []
+    for index, flight in enumerate(generate_flights(rng, first_flight_id, flights, start_date, days, aircraft_types)):
+        count = (index + 1) * bookings // flights - index * bookings // flights
+        if count:
+            seats = seats_by_type[type_by_id[flight["aircraft_id"]]]
+            booking_batch.extend(generate_bookings(rng, flight, seats, count, user_ids, references))
+        flight_batch.append(flight)
+        if len(flight_batch) >= batch_size or len(booking_batch) >= batch_size:
+            insert_rows(engine, FlightModel, flight_batch)
+            insert_rows(engine, BookingModel, booking_batch)
+            report.flights += len(flight_batch)
+            report.bookings += len(booking_batch)
+            flight_batch, booking_batch = [], []
+            progress and progress(report)
+    insert_rows(engine, FlightModel, flight_batch)
+    insert_rows(engine, BookingModel, booking_batch)
+    report.flights += len(flight_batch)
+    report.bookings += len(booking_batch)
+
+    if engine.dialect.name == "postgresql":
+        # IDs were given explicitly, so move the ID sequences past them
+        with engine.begin() as connection:
+            for table in ("users", "flights", "bookings"):
+                connection.exec_driver_sql(
+                    f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), COALESCE((SELECT MAX(id) FROM {table}), 1))"
+                )
+    return report
@@ -69,5 +69,3 @@ def create_test_users():
     user5.set_password("alia123")
 
     return [user1, user2, user3, user4, user5]
-
-user_list = create_test_users()
@@ -1,20 +1,113 @@
+import threading
+import time
 from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeoutError
 from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.pool import QueuePool
+from config import environment
 from config.environment import db_URI
 
+# =============================================================================
+# CONNECTION POOL SETTINGS - all optional, set them in config/environment.py
+# =============================================================================
+# Size, overflow and timeout apply to every database except in-memory SQLite.
+# Pre-ping and recycle only matter for server databases like Postgres.
+DB_POOL_SIZE = getattr(environment, "DB_POOL_SIZE", 5)  # Connections kept open
+DB_MAX_OVERFLOW = getattr(environment, "DB_MAX_OVERFLOW", 10)  # Extra connections allowed under load
+DB_POOL_TIMEOUT = getattr(environment, "DB_POOL_TIMEOUT", 30)  # Seconds to wait for a free connection
+DB_POOL_RECYCLE = getattr(environment, "DB_POOL_RECYCLE", 1800)  # Reconnect connections older than this (seconds)
+DB_POOL_PRE_PING = getattr(environment, "DB_POOL_PRE_PING", True)  # Test connections before handing them out
+
+# SQLite tuning. WAL lets readers keep reading while a booking is being written.
+SQLITE_JOURNAL_MODE = getattr(environment, "SQLITE_JOURNAL_MODE", "WAL")
+SQLITE_SYNCHRONOUS = getattr(environment, "SQLITE_SYNCHRONOUS", "NORMAL")  # Safe with WAL, far fewer fsyncs
+SQLITE_BUSY_TIMEOUT_MS = getattr(environment, "SQLITE_BUSY_TIMEOUT_MS", 5000)  # Wait for the write lock instead of failing
+SQLITE_MMAP_SIZE = getattr(environment, "SQLITE_MMAP_SIZE", 256 * 1024 * 1024)  # Bytes of the file to memory-map
+SQLITE_CACHE_SIZE_KB = getattr(environment, "SQLITE_CACHE_SIZE_KB", 64 * 1024)  # Page cache per connection
+
+is_sqlite = "sqlite" in db_URI
+is_memory_db = is_sqlite and (make_url(db_URI).database or ":memory:") == ":memory:"
+
+
+class PoolWaitStats:
+    """How often and how long requests waited for a pooled connection"""
+
+    def __init__(self):
+        self.checkouts = 0
+        self.timeouts = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+        self._lock = threading.Lock()
+
+    def record(self, seconds: float, timed_out: bool = False) -> None:
+        with self._lock:
+            self.checkouts += 1
+            self.timeouts += timed_out
+            self.total_wait += seconds
+            self.max_wait = max(self.max_wait, seconds)
+
+    def as_dict(self) -> dict:
+        return {
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "total_wait_seconds": round(self.total_wait, 6),
+            "avg_wait_seconds": round(self.total_wait / self.checkouts, 6) if self.checkouts else 0.0,
+            "max_wait_seconds": round(self.max_wait, 6),
+        }
+
+
+pool_wait_stats = PoolWaitStats()
+
+
+class TimedQueuePool(QueuePool):
+    """QueuePool that records how long each checkout waited for a connection"""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            connection = super()._do_get()
+        except PoolTimeoutError:
+            pool_wait_stats.record(time.perf_counter() - start, timed_out=True)
+            raise
+        pool_wait_stats.record(time.perf_counter() - start)
+        return connection
+
+
+def get_engine_options() -> dict:
+    """Keyword arguments for create_engine based on the settings above"""
+    if is_memory_db:
+        # In-memory SQLite lives inside one connection, so keep SQLAlchemy's default pool
+        return {"connect_args": {"check_same_thread": False}}
+    options = {
+        "poolclass": TimedQueuePool,
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+    }
+    if is_sqlite:
+        options["connect_args"] = {"check_same_thread": False}
+    else:
+        options["pool_pre_ping"] = DB_POOL_PRE_PING
+        options["pool_recycle"] = DB_POOL_RECYCLE
+    return options
+
+
 # Connect FastAPI with SQLAlchemy
-# Enable foreign key constraints for SQLite
-engine = create_engine(
-    db_URI,
-    connect_args={"check_same_thread": False} if "sqlite" in db_URI else {}
-)
+engine = create_engine(db_URI, **get_engine_options())
 
-# Enable foreign key constraints for SQLite
+# Enable foreign key constraints and apply the tuning settings for SQLite
 @event.listens_for(engine, "connect")
 def set_sqlite_pragma(dbapi_connection, connection_record):
-    if "sqlite" in db_URI:
+    if is_sqlite:
         cursor = dbapi_connection.cursor()
         cursor.execute("PRAGMA foreign_keys=ON")
+        cursor.execute(f"PRAGMA busy_timeout={int(SQLITE_BUSY_TIMEOUT_MS)}")
+        if not is_memory_db:
+            cursor.execute(f"PRAGMA journal_mode={SQLITE_JOURNAL_MODE}")
+        cursor.execute(f"PRAGMA synchronous={SQLITE_SYNCHRONOUS}")
+        cursor.execute(f"PRAGMA mmap_size={int(SQLITE_MMAP_SIZE)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(SQLITE_CACHE_SIZE_KB)}")  # Negative means KiB, not pages
         cursor.close()
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
@@ -26,3 +119,103 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+# =============================================================================
+# READ REPLICAS - Optional copies of the database for the read endpoints
+# =============================================================================
+# List replica URLs in replica_db_URIs in config/environment.py, e.g.
+#     replica_db_URIs = ["postgresql://reader@replica-1/gulf_air"]
+# and the GET endpoints that use get_read_db read from them. Writes always go
+# to db_URI. Which replica (or the primary) serves a read is decided in
+# services/read_replicas.py. Replicas use the same pool settings as the primary.
+replica_db_URIs = getattr(environment, "replica_db_URIs", [])
+
+
+def create_replica_engine(url: str):
+    options = get_engine_options()
+    if options.get("poolclass") is TimedQueuePool:
+        options["poolclass"] = QueuePool  # pool_wait_stats stays about the primary
+    replica = create_engine(url, **options)
+    event.listen(replica, "connect", set_sqlite_pragma)
+    return replica
+
+
+# "replica1", "replica2", ... in the order listed
+replica_engines = {f"replica{number}": create_replica_engine(url) for number, url in enumerate(replica_db_URIs, 1)}
+
+
+# =============================================================================
+# ASYNC DATABASE ACCESS - Optional asyncio engine for the read endpoints
+# =============================================================================
+# Set DB_ASYNC = True in config/environment.py to serve the read-heavy flight
+# and booking endpoints from controllers/async_*.py with an AsyncSession, so
+# slow clients wait on the event loop instead of holding a threadpool thread.
+# Needs aiosqlite (SQLite) or asyncpg (Postgres). The async URL is derived from
+# db_URI unless async_db_URI is set, e.g. "postgresql+psycopg://..." for psycopg 3.
+DB_ASYNC = getattr(environment, "DB_ASYNC", False)
+
+ASYNC_DRIVERS = {
+    "sqlite": "sqlite+aiosqlite",
+    "postgresql": "postgresql+asyncpg",
+}
+
+
+def get_async_url(url: str) -> str:
+    """The same database URL with an asyncio driver"""
+    url = make_url(url)
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    return url.set(drivername=driver).render_as_string(hide_password=False) if driver else str(url)
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
+
+    # aiosqlite manages its own connections, so pool settings only apply to server databases
+    async_options = {} if is_sqlite else {
+        key: value for key, value in get_engine_options().items() if key != "poolclass"
+    }
+    async_url = getattr(environment, "async_db_URI", get_async_url(db_URI))
+    try:
+        async_engine = create_async_engine(async_url, **async_options)
+    except ModuleNotFoundError as e:
+        # The asyncio drivers aren't in the Pipfile, DB_ASYNC is opt-in
+        raise RuntimeError(
+            f"DB_ASYNC = True needs the {e.name} package for {make_url(async_url).drivername}. "
+            f"Install it (pip install {e.name}) or turn DB_ASYNC off"
+        ) from e
+    event.listen(async_engine.sync_engine, "connect", set_sqlite_pragma)
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+# Async version of get_db for the async endpoints
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+
+def get_pool_stats() -> dict:
+    """Connection pool usage for the sync engine (and the async one and replicas if enabled)"""
+    stats = {"sync": describe_pool(engine.pool)}
+    stats["sync"]["wait"] = pool_wait_stats.as_dict()
+    if async_engine is not None:
+        stats["async"] = describe_pool(async_engine.pool)
+    for name, replica in replica_engines.items():
+        stats[name] = describe_pool(replica.pool)
+    return stats
+
+
+def describe_pool(pool) -> dict:
+    if not isinstance(pool, QueuePool):
+        return {"pool": type(pool).__name__}
+    return {
+        "pool": type(pool).__name__,
+        "size": pool.size(),
+        "checked_out": pool.checkedout(),
+        "checked_in": pool.checkedin(),
+        "overflow": max(pool.overflow(), 0),  # Connections open beyond pool_size
+        "max_overflow": pool._max_overflow,
+    }
@@ -0,0 +1,45 @@
+from typing import Optional
+from fastapi import HTTPException, Query
+from sqlalchemy.orm import Session, joinedload, noload
+from models.booking import BookingModel
+
+# Opt-in nested objects for booking responses.
+# BookingSchema has room for the booking's user and flight, but loading them
+# lazily costs one query per booking, so a page of 100 bookings would need
+# 201 queries. Instead, nothing is loaded unless the client asks for it:
+#   (no expand)         - user and flight are null and never loaded
+#   ?expand=flight,user - loaded in the same query as the bookings (joinedload,
+#                         both are many-to-one so no rows are repeated)
+# Either way serializing the response can't trigger a lazy load.
+
+BOOKING_EXPANSIONS = {"flight": BookingModel.flight, "user": BookingModel.user}
+
+
+# This is a dependency function that reads ?expand=
+def get_booking_expand(
+    expand: Optional[str] = Query(None, description="Nested objects to include, comma separated: flight, user"),
+) -> frozenset:
+    names = frozenset(name.strip() for name in (expand or "").split(",") if name.strip())
+    unknown = names - BOOKING_EXPANSIONS.keys()
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Can't expand {', '.join(sorted(unknown))}. Choose from: {', '.join(BOOKING_EXPANSIONS)}")
+    return names
+
+
+def booking_load_options(expand: frozenset) -> list:
+    """Loader options for a booking query: eager load what was asked for, never lazy load the rest"""
+    return [
+        joinedload(relationship) if name in expand else noload(relationship)
+        for name, relationship in BOOKING_EXPANSIONS.items()
+    ]
+
+
+def load_booking(db: Session, booking_id: int, expand: frozenset) -> BookingModel:
+    """Reload a booking that was just written, ready to return from a write endpoint"""
+    return (
+        db.query(BookingModel)
+        .options(*booking_load_options(expand))
+        .populate_existing()
+        .filter(BookingModel.id == booking_id)
+        .one()
+    )
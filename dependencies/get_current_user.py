@@ -1,14 +1,116 @@
 from fastapi import Depends, HTTPException, status
 from fastapi.security import HTTPBearer
-from sqlalchemy.orm import Session
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.orm.util import identity_key
 from models.user import UserModel
-from database import get_db
+from database import get_db, get_async_db
+from services.cache import TTLCache, MISSING
+import hashlib
+import time
 import jwt
 from jwt.api_jwt import DecodeError, ExpiredSignatureError
+from config import environment
 from config.environment import secret
 
 http_bearer = HTTPBearer()
 
+# Caches so an authenticated request doesn't have to decode the JWT and load
+# the user from the database every time.
+#   token_cache - sha256(token) -> (user ID, expiry timestamp), skips jwt.decode
+#   user_cache  - user ID -> the user's column values, skips the users SELECT
+# Anything that changes a user row must call invalidate_user() afterwards.
+USER_CACHE_SIZE = 10000
+USER_CACHE_TTL_SECONDS = 60
+
+token_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl_seconds=USER_CACHE_TTL_SECONDS)
+user_cache = TTLCache(maxsize=USER_CACHE_SIZE, ttl_seconds=USER_CACHE_TTL_SECONDS)
+
+USER_COLUMNS = [column.key for column in UserModel.__table__.columns]
+
+
+def invalidate_user(user_id: int = None) -> None:
+    """Forget a cached user (or every cached user if no ID is given)"""
+    if user_id is None:
+        user_cache.clear()
+    else:
+        user_cache.delete(user_id)
+
+
+def get_user_cache_stats() -> dict:
+    return {"users": user_cache.stats(), "tokens": token_cache.stats()}
+
+
+def decode_user_id(token: str) -> int:
+    """User ID from a JWT, decoding it only the first time the token is seen"""
+    key = hashlib.sha256(token.encode()).digest()
+    cached = token_cache.get(key)
+    if cached is not MISSING:
+        user_id, expires_at = cached
+        if expires_at > time.time():
+            return user_id
+        # Expired since it was cached - decode again so the usual error is raised
+
+    payload = jwt.decode(token, secret, algorithms=["HS256"])
+    user_id = int(payload.get("sub"))
+    token_cache.set(key, (user_id, payload.get("exp", 0)))
+    return user_id
+
+
+def bearer_user_id(authorization: bytes):
+    """User ID from an "Authorization: Bearer ..." header, or None if it isn't valid"""
+    if not authorization or not authorization.lower().startswith(b"bearer "):
+        return None
+    try:
+        return decode_user_id(authorization[7:].strip().decode())
+    except Exception:
+        return None
+
+
+def cache_user(user: UserModel) -> None:
+    user_cache.set(user.id, {key: getattr(user, key) for key in USER_COLUMNS})
+
+
+def attach_cached_user(db: Session, user_id: int):
+    """Put a cached user into this session without a query. None on a cache miss."""
+    values = user_cache.get(user_id)
+    if values is MISSING:
+        return None
+
+    # The session may already have this user loaded
+    existing = db.identity_map.get(identity_key(UserModel, user_id))
+    if existing is not None:
+        return existing
+
+    # Rebuild the user as if it had just been loaded by a query, so changes made
+    # by the endpoint are still saved with a normal UPDATE on commit.
+    user = UserModel(**values)
+    make_transient_to_detached(user)
+    db.add(user)
+    return user
+
+
+def load_user(db: Session, user_id: int):
+    """Load a user into this request's session, from the cache when possible"""
+    user = attach_cached_user(db, user_id)
+    if user is None:
+        user = db.query(UserModel).filter(UserModel.id == user_id).first()
+        if user:
+            cache_user(user)
+    return user
+
+
+async def load_user_async(db: AsyncSession, user_id: int):
+    """Async version of load_user"""
+    user = attach_cached_user(db.sync_session, user_id)
+    if user is None:
+        result = await db.execute(select(UserModel).where(UserModel.id == user_id))
+        user = result.scalars().first()
+        if user:
+            cache_user(user)
+    return user
+
 # This is a dependency function that validates JWT tokens
 # It extracts the token from the Authorization header
 # Decodes and validates the token
@@ -20,16 +122,20 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(http_be
 
     try:
         # Decode the token using the secret key
-        payload = jwt.decode(token.credentials, secret, algorithms=["HS256"])
+        user_id = decode_user_id(token.credentials)
 
-        # Query the database to find the user with the ID from the token's payload
-        user = db.query(UserModel).filter(UserModel.id == int(payload.get("sub"))).first()
+        # Find the user with the ID from the token's payload
+        user = load_user(db, user_id)
 
         # If no user is found, raise an HTTP 401 Unauthorized error
         if not user:
             raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
                                  detail="Invalid username or password")
 
+        # Remember who this session works for, so the user's commits send
+        # their next reads to the primary (see services/read_replicas.py)
+        db.info["user_id"] = user.id
+
     # Handle decoding errors (invalid token)
     except DecodeError as e:
         raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
@@ -42,3 +148,37 @@ def get_current_user(db: Session = Depends(get_db), token: str = Depends(http_be
 
     # Return the user if the token is valid
     return user
+
+
+# Operational endpoints (/system/*, /auth/cache-stats, batch loyalty accrual)
+# are only for the users listed in ADMIN_USERNAMES in config/environment.py.
+# Nobody is an admin unless the setting lists them.
+ADMIN_USERNAMES = frozenset(getattr(environment, "ADMIN_USERNAMES", ()))
+
+
+def get_admin_user(current_user: UserModel = Depends(get_current_user)):
+    if current_user.username not in ADMIN_USERNAMES:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                             detail="Admin access required")
+    return current_user
+
+
+# Same as get_current_user, for the async endpoints (see DB_ASYNC in database.py)
+async def get_current_user_async(db: AsyncSession = Depends(get_async_db), token: str = Depends(http_bearer)):
+
+    try:
+        user_id = decode_user_id(token.credentials)
+        user = await load_user_async(db, user_id)
+        if not user:
+            raise HTTPException(status_code=status.HTTP_401_UNAUTHORIZED,
+                                 detail="Invalid username or password")
+
+    except DecodeError as e:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                             detail=f'Could not decode token: {str(e)}')
+
+    except ExpiredSignatureError:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN,
+                             detail='Token has expired')
+
+    return user
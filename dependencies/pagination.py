@@ -0,0 +1,67 @@
+from dataclasses import dataclass
+from typing import Optional
+import base64
+from fastapi import HTTPException, Query, Response
+from sqlalchemy.orm import Query as SQLQuery
+
+# Keyset (cursor) pagination for list endpoints.
+# Instead of OFFSET, each page asks for rows with a key greater than the last
+# one it saw, so every page is a single index range scan no matter how deep
+# the client has paged. The response body stays a plain list; paging info is
+# sent in headers:
+#   X-Total-Count - total matching rows (skip it with ?count=false)
+#   X-Next-Cursor - pass as ?after= to get the next page (absent on the last page)
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+PAGE_HEADERS = ("X-Total-Count", "X-Next-Cursor")
+
+
+@dataclass
+class PageParams:
+    limit: int
+    after: Optional[str]
+    count: bool
+
+
+# This is a dependency function that reads the paging query parameters
+def get_page_params(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE, description="Maximum rows to return"),
+    after: Optional[str] = Query(None, description="Cursor from the previous page's X-Next-Cursor header"),
+    count: bool = Query(True, description="Send the X-Total-Count header (costs one COUNT query)"),
+) -> PageParams:
+    return PageParams(limit=limit, after=after, count=count)
+
+
+def encode_cursor(key: int) -> str:
+    return base64.urlsafe_b64encode(str(key).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (ValueError, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid pagination cursor")
+
+
+def paginate(query: SQLQuery, key, page: PageParams, response: Response) -> list:
+    """Return one page of `query` ordered by the indexed integer column `key`"""
+    if page.count:
+        response.headers["X-Total-Count"] = str(query.order_by(None).count())
+
+    if page.after is not None:
+        query = query.filter(key > decode_cursor(page.after))
+
+    # Fetch one extra row to find out whether there is another page
+    rows = query.order_by(key).limit(page.limit + 1).all()
+    if len(rows) > page.limit:
+        rows = rows[:page.limit]
+        response.headers["X-Next-Cursor"] = encode_cursor(getattr(rows[-1], key.key))
+    return rows
+
+
+def page_response(body: bytes, response: Response) -> Response:
+    """A ready-made JSON body as the endpoint's response, keeping the paging headers set by paginate()"""
+    headers = {name: response.headers[name] for name in PAGE_HEADERS if name in response.headers}
+    return Response(content=body, media_type="application/json", headers=headers)
@@ -0,0 +1,20 @@
+# =============================================================================
+# PASSWORD SLOT - Admits a register/login request to the bcrypt pool
+# =============================================================================
+# Add Depends(password_slot) before get_db in endpoints that hash or verify a
+# password. The request holds one of the password pool's slots from before it
+# touches the database until it is done, so the slots bound the bcrypt queue
+# and the threadpool threads a login storm can take (see
+# services/password_pool.py). When every slot is taken the request gets 503.
+
+from fastapi import HTTPException
+from services.password_pool import password_pool
+
+
+def password_slot():
+    if not password_pool.acquire():
+        raise HTTPException(status_code=503, detail="Server busy, please try again", headers={"Retry-After": "1"})
+    try:
+        yield
+    finally:
+        password_pool.release()
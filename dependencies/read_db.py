@@ -0,0 +1,22 @@
+# =============================================================================
+# READ-ONLY DATABASE SESSION - For GET endpoints that can use a replica
+# =============================================================================
+# Use Depends(get_read_db) instead of Depends(get_db) in endpoints that only
+# read. Without replica_db_URIs it is exactly get_db. With replicas the session
+# is bound to whichever engine services/read_replicas.py picks for the caller,
+# so nothing may be written through it.
+
+from fastapi import Request
+from database import SessionLocal
+from dependencies.get_current_user import bearer_user_id
+from services.read_replicas import replica_router
+
+
+def get_read_db(request: Request):
+    # The caller is only looked up when there are replicas to choose from
+    user_id = bearer_user_id(request.headers.get("authorization", "").encode()) if replica_router.replicas else None
+    db = SessionLocal(bind=replica_router.engine_for(user_id))
+    try:
+        yield db
+    finally:
+        db.close()
@@ -0,0 +1,58 @@
+# generate_data.py
+
+# Fills the database in config/environment.py with a large, reproducible
+# dataset for capacity testing (see data/synthetic.py):
+#     python generate_data.py --users 100000 --flights 200000 --bookings 5000000
+# The same --seed (and sizes) always gives the same data. Rows are added on top
+# of what is already there; pass --reset to start from an empty schema instead.
+import argparse
+import time
+from datetime import datetime
+
+from database import engine
+from models.base import Base
+# Import all models to ensure they are registered
+from models.user import UserModel
+from models.flight import FlightModel
+from models.booking import BookingModel
+from models.aircraft import AircraftModel
+from models.sequence import SequenceModel
+from models.airport import AirportModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from migrations import mark_all_applied
+from data.synthetic import DEFAULT_BATCH_SIZE, DEFAULT_DAYS, DEFAULT_SEED, DEFAULT_START_DATE, generate
+
+parser = argparse.ArgumentParser(description="Generate synthetic users, flights and bookings")
+parser.add_argument("--users", type=int, default=0)
+parser.add_argument("--flights", type=int, default=0)
+parser.add_argument("--bookings", type=int, default=0)
+parser.add_argument("--seed", type=int, default=DEFAULT_SEED)
+parser.add_argument("--start-date", type=datetime.fromisoformat, default=DEFAULT_START_DATE)
+parser.add_argument("--days", type=int, default=DEFAULT_DAYS, help="Days the flights are spread over")
+parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+parser.add_argument("--reset", action="store_true", help="Drop and recreate all tables first (deletes everything)")
+args = parser.parse_args()
+
+
+def show_progress(report):
+    print(f"  {report.users} users, {report.flights} flights, {report.bookings} bookings", end="\r", flush=True)
+
+
+try:
+    if args.reset:
+        print("Recreating database...")
+        Base.metadata.drop_all(bind=engine)
+        Base.metadata.create_all(bind=engine)
+        mark_all_applied(engine)
+
+    print(f"Generating data with seed {args.seed}...")
+    start = time.perf_counter()
+    report = generate(engine, users=args.users, flights=args.flights, bookings=args.bookings, seed=args.seed,
+                      start_date=args.start_date, days=args.days, batch_size=args.batch_size, progress=show_progress)
+    elapsed = time.perf_counter() - start
+    rows = report.users + report.flights + report.bookings
+    print(f"Added {report.users} users, {report.flights} flights and {report.bookings} bookings "
+          f"in {elapsed:.1f}s ({rows / elapsed if elapsed else 0:.0f} rows/s) ✈️")
+except Exception as e:
+    print("An error occurred:", e)
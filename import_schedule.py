@@ -0,0 +1,51 @@
+# import_schedule.py
+
+# Imports a flight schedule file into the database in config/environment.py
+# (see services/schedule_import.py):
+#     python import_schedule.py schedule.csv
+#     python import_schedule.py schedule.ndjson --chunk-size 5000
+# The format comes from the file extension unless --format is given.
+import argparse
+import json
+import time
+
+from database import engine
+# Import all models to ensure they are registered
+from models.user import UserModel
+from models.flight import FlightModel
+from models.booking import BookingModel
+from models.aircraft import AircraftModel
+from models.airport import AirportModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from services.schedule_import import FORMATS, IMPORT_CHUNK_SIZE, import_schedule
+
+EXTENSIONS = {".csv": "csv", ".ndjson": "ndjson", ".jsonl": "ndjson"}
+
+parser = argparse.ArgumentParser(description="Bulk import flights from CSV or NDJSON")
+parser.add_argument("path")
+parser.add_argument("--format", choices=FORMATS)
+parser.add_argument("--chunk-size", type=int, default=IMPORT_CHUNK_SIZE)
+parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+args = parser.parse_args()
+
+file_format = args.format or next((fmt for ext, fmt in EXTENSIONS.items() if args.path.lower().endswith(ext)), None)
+if file_format is None:
+    parser.error("Can't tell the format from the file name, pass --format")
+
+try:
+    start = time.perf_counter()
+    with open(args.path, "rb") as stream:
+        report = import_schedule(engine, stream, file_format, chunk_size=args.chunk_size)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        print(f"Read {report.rows} rows in {elapsed:.1f}s: "
+              f"{report.created} created, {report.updated} updated, {report.failed} failed")
+        for error in report.errors:
+            print(f"  line {error['line']}: {error['flight_number'] or '-'}: {error['error']}")
+        if report.failed > len(report.errors):
+            print(f"  ... and {report.failed - len(report.errors)} more errors")
+except Exception as e:
+    print("An error occurred:", e)
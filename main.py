@@ -1,29 +1,80 @@
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse, PlainTextResponse
 from controllers.flights import router as FlightsRouter
 from controllers.bookings import router as BookingsRouter
 from controllers.users import router as UsersRouter
+from controllers.system import router as SystemRouter
 
 # Import all models to ensure they're registered with SQLAlchemy
 from models.user import UserModel
 from models.flight import FlightModel
 from models.booking import BookingModel
 from models.aircraft import AircraftModel
+from models.sequence import SequenceModel
+from models.airport import AirportModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from services.password_pool import password_pool
+from services.read_replicas import replica_router
+from database import DB_ASYNC, async_engine
+from dependencies.pagination import PAGE_HEADERS
+from middleware.idempotency import IdempotencyMiddleware, REPLAYED_HEADER
+from middleware.metrics import MetricsMiddleware, render_metrics
+from middleware.profiling import ProfilingMiddleware, SERVER_TIMING_HEADER
 
-app = FastAPI()
+# orjson renders every JSON response (much faster than the stdlib encoder).
+# The list endpoints go further and send bytes made by pydantic directly.
+app = FastAPI(default_response_class=ORJSONResponse)
 
+# Replays retried booking requests that carry an Idempotency-Key header.
+# Added before CORS so replayed responses still get the CORS headers.
+app.add_middleware(IdempotencyMiddleware)
+# Adds Server-Timing headers while SQL profiling is switched on (PUT /system/profiling)
+app.add_middleware(ProfilingMiddleware)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=['*'],  # Allow all origins for mobile development
     allow_credentials=True,
     allow_methods=['*'],
-    allow_headers=['*']
+    allow_headers=['*'],
+    expose_headers=[*PAGE_HEADERS, 'ETag', REPLAYED_HEADER, SERVER_TIMING_HEADER]  # Pagination, caching, idempotency and profiling headers
 )
 
+# Outermost, so request latency includes everything above (see /metrics below)
+app.add_middleware(MetricsMiddleware)
+
+# With DB_ASYNC on, the async read endpoints are registered first so they take
+# over those paths. Everything else still goes to the sync routers below.
+if DB_ASYNC:
+    from controllers.async_flights import router as AsyncFlightsRouter
+    from controllers.async_bookings import router as AsyncBookingsRouter
+    app.include_router(AsyncFlightsRouter, prefix='/api')
+    app.include_router(AsyncBookingsRouter, prefix='/api')
+
 app.include_router(FlightsRouter, prefix='/api')
 app.include_router(BookingsRouter, prefix='/api')
 app.include_router(UsersRouter, prefix='/auth')
+app.include_router(SystemRouter, prefix='/system')
+
+@app.on_event('startup')
+async def startup():
+    replica_router.start()  # Measures replica lag in the background (only with replica_db_URIs)
+
+@app.on_event('shutdown')
+async def shutdown():
+    password_pool.shutdown()
+    replica_router.stop()
+    if async_engine is not None:
+        await async_engine.dispose()
 
 @app.get('/')
 def home():
     return {'message': 'Welcome to Gulf Air API!'}
+
+# Prometheus scrape endpoint (see middleware/metrics.py). async def so it reads
+# the registry on the event loop, where the middleware writes to it; a plain
+# def would run on a worker thread while requests add new routes and statuses.
+@app.get('/metrics', include_in_schema=False)
+async def metrics():
+    return PlainTextResponse(render_metrics(), media_type='text/plain; version=0.0.4')
@@ -0,0 +1,168 @@
+# =============================================================================
+# IDEMPOTENCY KEYS - Safe retries for booking changes
+# =============================================================================
+# The mobile app retries a booking request when the connection drops, even if
+# the server already handled it. With an Idempotency-Key header (any unique
+# string the app picks per action, e.g. a UUID) the retry gets the first
+# response back instead of running the request again:
+#   - the first response for a key is stored for IDEMPOTENCY_TTL_SECONDS
+#   - a retry with the same key and the same request replays it, marked with
+#     an "Idempotent-Replayed: true" header, without touching the database
+#   - a retry that arrives while the first request is still running waits for
+#     it and gets the same response
+#   - reusing a key for a different request is rejected with 422
+#
+# Keys are per user (from the bearer token), so two users can't collide. Only
+# successful (2xx) responses and 422 validation errors, which depend on nothing
+# but the request itself, are stored. Other errors depend on the state at the
+# time (e.g. "Seat is on hold for another customer" until the hold expires)
+# and changed nothing, so a retry runs again for real. Requests without the
+# header work exactly as before.
+#
+# Responses are kept in this worker's memory. A retry served by another worker
+# runs again, where the database still stops the worst outcomes: the seat index
+# rejects a second booking of the same seat and check-in only awards miles once.
+#
+# Optional settings in config/environment.py:
+#   IDEMPOTENCY_TTL_SECONDS   - how long a response is kept (default 86400)
+#   IDEMPOTENCY_CACHE_SIZE    - responses kept per worker (default 10000)
+
+import asyncio
+import hashlib
+import re
+
+from fastapi.responses import ORJSONResponse
+from config import environment
+from dependencies.get_current_user import bearer_user_id
+from services.cache import TTLCache, MISSING
+
+IDEMPOTENCY_TTL_SECONDS = getattr(environment, "IDEMPOTENCY_TTL_SECONDS", 86400)
+IDEMPOTENCY_CACHE_SIZE = getattr(environment, "IDEMPOTENCY_CACHE_SIZE", 10000)
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# Requests that honour the header: creating, changing, cancelling,
+# rescheduling and checking in bookings
+IDEMPOTENT_METHODS = {"POST", "PUT", "PATCH", "DELETE"}
+IDEMPOTENT_PATHS = re.compile(r"^/api/bookings(/group|/\d+(/reschedule|/checkin)?)?$")
+
+def is_stored(status: int) -> bool:
+    """Whether a response with this status is kept for replay"""
+    return 200 <= status < 300 or status == 422
+
+
+# (user ID, key) -> StoredResponse
+stored_responses = TTLCache(maxsize=IDEMPOTENCY_CACHE_SIZE, ttl_seconds=IDEMPOTENCY_TTL_SECONDS)
+# (user ID, key) -> (fingerprint, asyncio.Event set when the request finishes)
+in_flight = {}
+replay_count = 0
+
+
+def get_idempotency_stats() -> dict:
+    return {**stored_responses.stats(), "in_flight": len(in_flight), "replays": replay_count}
+
+
+class StoredResponse:
+    """A finished response and the request it answered"""
+
+    __slots__ = ("fingerprint", "status", "headers", "body")
+
+    def __init__(self, fingerprint: bytes, status: int, headers: list, body: bytes):
+        self.fingerprint = fingerprint
+        self.status = status
+        self.headers = headers
+        self.body = body
+
+    async def replay(self, send) -> None:
+        await send({
+            "type": "http.response.start",
+            "status": self.status,
+            "headers": self.headers + [(REPLAYED_HEADER.lower().encode(), b"true")],
+        })
+        await send({"type": "http.response.body", "body": self.body})
+
+
+class IdempotencyMiddleware:
+    """ASGI middleware that stores and replays responses by Idempotency-Key"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        global replay_count
+        if scope["type"] != "http" or scope["method"] not in IDEMPOTENT_METHODS or not IDEMPOTENT_PATHS.match(scope["path"]):
+            return await self.app(scope, receive, send)
+        headers = dict(scope["headers"])
+        key = headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return await self.app(scope, receive, send)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return await error(scope, receive, send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+        user_id = bearer_user_id(headers.get(b"authorization"))
+        if user_id is None:
+            return await self.app(scope, receive, send)  # Let the endpoint reject the token as usual
+
+        # Read the whole body up front, it is part of what identifies the request
+        body = b""
+        while True:
+            message = await receive()
+            body += message.get("body", b"")
+            if not message.get("more_body"):
+                break
+        fingerprint = hashlib.sha256(b"\n".join([scope["method"].encode(), scope["path"].encode(), scope["query_string"], body])).digest()
+        cache_key = (user_id, key)
+
+        # Replay a stored response, or wait for the same request to finish first
+        while True:
+            stored = stored_responses.get(cache_key)
+            if stored is not MISSING:
+                if stored.fingerprint != fingerprint:
+                    return await error(scope, receive, send, 422, "Idempotency-Key was already used for a different request")
+                replay_count += 1
+                return await stored.replay(send)
+            running = in_flight.get(cache_key)
+            if running is None:
+                break
+            if running[0] != fingerprint:
+                return await error(scope, receive, send, 422, "Idempotency-Key was already used for a different request")
+            await running[1].wait()  # Then replay it (or run it ourselves if it failed)
+
+        finished = asyncio.Event()
+        in_flight[cache_key] = (fingerprint, finished)
+        try:
+            await self._run(scope, receive, send, body, cache_key, fingerprint)
+        finally:
+            del in_flight[cache_key]
+            finished.set()
+
+    async def _run(self, scope, receive, send, body: bytes, cache_key: tuple, fingerprint: bytes) -> None:
+        """Run the request and store its response"""
+        sent_body = False
+        response = {}
+        chunks = []
+
+        async def replay_body():
+            # The body was read already, hand it over again then pass through
+            nonlocal sent_body
+            if not sent_body:
+                sent_body = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        async def capture(message):
+            if message["type"] == "http.response.start":
+                response.update(message)
+            elif message["type"] == "http.response.body":
+                chunks.append(message.get("body", b""))
+                if not message.get("more_body") and is_stored(response.get("status", 500)):
+                    stored_responses.set(cache_key, StoredResponse(
+                        fingerprint, response["status"], list(response.get("headers", [])), b"".join(chunks)
+                    ))
+            await send(message)
+
+        await self.app(scope, replay_body, capture)
+
+
+async def error(scope, receive, send, status_code: int, detail: str) -> None:
+    await ORJSONResponse({"detail": detail}, status_code=status_code)(scope, receive, send)
@@ -0,0 +1,171 @@
+# =============================================================================
+# METRICS - Per-route latency histograms in Prometheus text format
+# =============================================================================
+# Every HTTP request is timed and counted under its route template (e.g.
+# "/api/flights/{flight_id}", never the raw path, so there is one series per
+# endpoint however many flights there are). GET /metrics returns:
+#   http_request_duration_seconds  - histogram per method and route
+#   http_requests_total            - counter per method, route and status code
+#   http_requests_in_flight        - requests being handled right now
+#   db_pool_*                      - connection pool gauges (see database.py)
+#   password_pool_*                - bcrypt queue depth (see services/password_pool.py)
+#
+# Recording is cheap: each route's bucket counts are a list allocated when the
+# route is first seen, and a request only does a couple of dict lookups, a
+# bisect and some integer adds. Everything runs on the event loop thread (GET
+# /metrics too, which is why it is async def), so no locks are needed. The numbers are per worker process, like every other
+# in-process stat here; Prometheus adds the workers up.
+
+import time
+from bisect import bisect_left
+
+from database import get_pool_stats
+from services.password_pool import password_pool
+
+# Upper bounds in seconds, from cache hits (~1ms) to slow bulk endpoints
+LATENCY_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+UNMATCHED_ROUTE = "<unmatched>"  # 404s, so random paths can't create new series
+
+
+def route_template(scope) -> str:
+    """Route template of the endpoint the router matched, like /api/flights/{flight_id}"""
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return UNMATCHED_ROUTE
+    return next((route.path for route in scope["app"].routes if getattr(route, "endpoint", None) is endpoint), UNMATCHED_ROUTE)
+
+
+class RouteMetrics:
+    """Latency histogram and status counts for one method and route"""
+
+    __slots__ = ("method", "route", "buckets", "total_seconds", "count", "statuses")
+
+    def __init__(self, method: str, route: str):
+        self.method = method
+        self.route = route
+        self.buckets = [0] * (len(LATENCY_BUCKETS) + 1)  # Last one is +Inf
+        self.total_seconds = 0.0
+        self.count = 0
+        self.statuses = {}  # Status code -> requests
+
+    def observe(self, seconds: float, status: int) -> None:
+        self.buckets[bisect_left(LATENCY_BUCKETS, seconds)] += 1
+        self.total_seconds += seconds
+        self.count += 1
+        self.statuses[status] = self.statuses.get(status, 0) + 1
+
+
+class MetricsRegistry:
+    """Every RouteMetrics, found by (method, route template)"""
+
+    def __init__(self):
+        self.routes = {}  # (method, route) -> RouteMetrics
+        self.by_endpoint = {}  # endpoint function -> {method: RouteMetrics}, the fast lookup
+        self.in_flight = 0
+
+    def for_request(self, scope) -> RouteMetrics:
+        endpoint = scope.get("endpoint")
+        methods = self.by_endpoint.get(endpoint)
+        metrics = methods and methods.get(scope["method"])
+        if metrics is None:
+            metrics = self._add(scope, endpoint)
+        return metrics
+
+    def _add(self, scope, endpoint) -> RouteMetrics:
+        # First request to this endpoint and method. The sync and async routers
+        # share route templates, so they share metrics too.
+        key = (scope["method"], route_template(scope))
+        metrics = self.routes.get(key)
+        if metrics is None:
+            metrics = self.routes[key] = RouteMetrics(*key)
+        self.by_endpoint.setdefault(endpoint, {})[scope["method"]] = metrics
+        return metrics
+
+
+registry = MetricsRegistry()
+
+
+class MetricsMiddleware:
+    """ASGI middleware that times every HTTP request into the registry"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+        status = 500  # If the app raises before sending anything
+
+        async def send_with_status(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        registry.in_flight += 1
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            registry.in_flight -= 1
+            # The router has put the matched endpoint into scope by now
+            registry.for_request(scope).observe(time.perf_counter() - start, status)
+
+
+# =============================================================================
+# PROMETHEUS TEXT FORMAT
+# =============================================================================
+
+def label_value(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def render_metrics() -> str:
+    lines = []
+
+    def metric(name: str, kind: str, help_text: str, samples: list) -> None:
+        lines.append(f"# HELP {name} {help_text}")
+        lines.append(f"# TYPE {name} {kind}")
+        for suffix, labels, value in samples:
+            label_text = ",".join(f'{key}="{label_value(val)}"' for key, val in labels)
+            lines.append(f"{name}{suffix}{{{label_text}}} {value}" if label_text else f"{name}{suffix} {value}")
+
+    routes = sorted(registry.routes.values(), key=lambda metrics: (metrics.route, metrics.method))
+    histogram = []
+    for metrics in routes:
+        labels = (("method", metrics.method), ("route", metrics.route))
+        cumulative = 0
+        for bound, count in zip(LATENCY_BUCKETS + ("+Inf",), metrics.buckets):
+            cumulative += count
+            histogram.append(("_bucket", labels + (("le", bound),), cumulative))
+        histogram.append(("_sum", labels, round(metrics.total_seconds, 6)))
+        histogram.append(("_count", labels, metrics.count))
+    metric("http_request_duration_seconds", "histogram", "Time to handle a request, by route template", histogram)
+    metric("http_requests_total", "counter", "Requests handled, by route template and status code", [
+        ("", (("method", metrics.method), ("route", metrics.route), ("status", status)), count)
+        for metrics in routes for status, count in sorted(metrics.statuses.items())
+    ])
+    metric("http_requests_in_flight", "gauge", "Requests being handled right now", [("", (), registry.in_flight)])
+
+    # Connection pools (pools other than QueuePool only report their type)
+    pools = get_pool_stats()
+    for name, help_text, field in (
+        ("db_pool_size", "Connections kept open by the pool", "size"),
+        ("db_pool_checked_out", "Connections in use", "checked_out"),
+        ("db_pool_overflow", "Connections open beyond the pool size", "overflow"),
+    ):
+        metric(name, "gauge", help_text, [
+            ("", (("engine", engine),), stats[field]) for engine, stats in pools.items() if field in stats
+        ])
+    wait = pools["sync"]["wait"]
+    metric("db_pool_checkouts_total", "counter", "Connections handed out by the sync pool", [("", (), wait["checkouts"])])
+    metric("db_pool_timeouts_total", "counter", "Requests that gave up waiting for a connection", [("", (), wait["timeouts"])])
+    metric("db_pool_wait_seconds_total", "counter", "Time spent waiting for a connection", [("", (), wait["total_wait_seconds"])])
+
+    # bcrypt process pool
+    passwords = password_pool.stats()
+    metric("password_pool_workers", "gauge", "Processes hashing passwords", [("", (), passwords["workers"])])
+    metric("password_pool_in_flight", "gauge", "Register/login requests holding a slot (hashing, queued or on the database)", [("", (), passwords["in_flight"])])
+    metric("password_pool_max_pending", "gauge", "Register/login requests allowed at once before they get 503", [("", (), passwords["max_pending"])])
+    metric("password_pool_rejected_total", "counter", "Register/login requests turned away because every slot was taken", [("", (), passwords["rejected"])])
+    return "\n".join(lines) + "\n"
@@ -0,0 +1,183 @@
+# =============================================================================
+# SQL PROFILING - Query counts, DB time and N+1 detection per request
+# =============================================================================
+# Off by default. Turn it on (and off again) while the server is running with
+# PUT /system/profiling, e.g. while chasing a latency spike in production.
+# While it is on, every request:
+#   - counts its SQL statements and the time spent in them, returned in a
+#     Server-Timing header ("db;dur=12.5;desc=\"7 queries\"") that browser dev
+#     tools and most APM agents show next to the request
+#   - logs statements slower than slow_query_ms, with the route that ran them
+#   - logs statements run repeat_threshold or more times with different
+#     parameters, the usual sign of an N+1 (e.g. lazy loads of BookingModel.flight
+#     or .user for every booking in a list) and counts them in the header
+#
+# The cursor hooks are attached to the engines the first time profiling is
+# turned on and stay attached; with profiling off they return after one
+# context variable lookup. Requests already running when it is switched on
+# aren't profiled.
+#
+# Optional settings in config/environment.py (starting values, all can be
+# changed at runtime):
+#   SQL_PROFILING              - profile from startup (default False)
+#   SQL_SLOW_QUERY_MS          - log statements slower than this (default 100)
+#   SQL_REPEAT_THRESHOLD       - same statement this many times in a request is flagged (default 5)
+
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+
+from sqlalchemy import event
+from config import environment
+from database import engine, async_engine
+from middleware.metrics import route_template
+
+logger = logging.getLogger("gulf_air.sql")
+
+SERVER_TIMING_HEADER = "Server-Timing"
+MAX_LOGGED_STATEMENT = 500  # Characters of SQL shown in a log line
+
+
+class ProfilingSettings:
+    def __init__(self):
+        self.enabled = False
+        self.slow_query_ms = getattr(environment, "SQL_SLOW_QUERY_MS", 100)
+        self.repeat_threshold = getattr(environment, "SQL_REPEAT_THRESHOLD", 5)
+        self.requests = 0  # Profiled since startup
+        self.slow_queries = 0
+        self.repeated_statements = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "slow_query_ms": self.slow_query_ms,
+            "repeat_threshold": self.repeat_threshold,
+            "requests": self.requests,
+            "slow_queries": self.slow_queries,
+            "repeated_statements": self.repeated_statements,
+        }
+
+
+settings = ProfilingSettings()
+
+
+class RequestProfile:
+    """SQL statements run while handling one request"""
+
+    __slots__ = ("scope", "queries", "db_seconds", "statements")
+
+    def __init__(self, scope):
+        self.scope = scope
+        self.queries = 0
+        self.db_seconds = 0.0
+        self.statements = Counter()  # SQL text -> times run
+
+    def route(self) -> str:
+        return f"{self.scope['method']} {route_template(self.scope)}"
+
+    def repeated(self) -> list:
+        return [(statement, count) for statement, count in self.statements.items() if count >= settings.repeat_threshold]
+
+
+# The profile of the request being handled. Sync endpoints run in a worker
+# thread with a copy of the request's context, so they see the same profile.
+current_profile = contextvars.ContextVar("current_profile", default=None)
+
+
+def short_sql(statement: str) -> str:
+    statement = " ".join(statement.split())
+    return statement if len(statement) <= MAX_LOGGED_STATEMENT else statement[:MAX_LOGGED_STATEMENT] + "..."
+
+
+# =============================================================================
+# CURSOR HOOKS
+# =============================================================================
+
+def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    if context is not None and current_profile.get() is not None:
+        context._profile_start = time.perf_counter()
+
+
+def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = current_profile.get()
+    start = getattr(context, "_profile_start", None)
+    if profile is None or start is None:
+        return
+    seconds = time.perf_counter() - start
+    profile.queries += 1
+    profile.db_seconds += seconds
+    profile.statements[statement] += 1
+    if seconds * 1000 >= settings.slow_query_ms:
+        settings.slow_queries += 1
+        logger.warning("Slow query (%.1f ms) in %s: %s", seconds * 1000, profile.route(), short_sql(statement))
+
+
+_hooks_attached = False
+_hooks_lock = threading.Lock()
+
+
+def set_profiling(enabled: bool, slow_query_ms: float = None, repeat_threshold: int = None) -> dict:
+    """Switch profiling on or off, optionally changing the thresholds"""
+    global _hooks_attached
+    if slow_query_ms is not None:
+        settings.slow_query_ms = slow_query_ms
+    if repeat_threshold is not None:
+        settings.repeat_threshold = repeat_threshold
+    with _hooks_lock:
+        if enabled and not _hooks_attached:
+            for target in (engine, async_engine and async_engine.sync_engine):
+                if target is not None:
+                    event.listen(target, "before_cursor_execute", before_cursor_execute)
+                    event.listen(target, "after_cursor_execute", after_cursor_execute)
+            _hooks_attached = True
+        settings.enabled = enabled
+    return settings.as_dict()
+
+
+# =============================================================================
+# MIDDLEWARE
+# =============================================================================
+
+class ProfilingMiddleware:
+    """ASGI middleware that profiles each request while profiling is on"""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or not settings.enabled:
+            return await self.app(scope, receive, send)
+        profile = RequestProfile(scope)
+        token = current_profile.set(profile)
+        settings.requests += 1
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [
+                    (SERVER_TIMING_HEADER.lower().encode(), server_timing(profile).encode())
+                ]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            current_profile.reset(token)
+
+
+def server_timing(profile: RequestProfile) -> str:
+    """Server-Timing value for a finished request, logging any likely N+1 first"""
+    repeated = profile.repeated()
+    for statement, count in repeated:
+        settings.repeated_statements += 1
+        logger.warning("Possible N+1 in %s: statement ran %d times: %s", profile.route(), count, short_sql(statement))
+    timing = f'db;dur={profile.db_seconds * 1000:.2f};desc="{profile.queries} queries"'
+    if repeated:
+        timing += f', db-repeated;desc="{len(repeated)} statements run {settings.repeat_threshold}+ times"'
+    return timing
+
+
+# Start with profiling on if the config asks for it
+if getattr(environment, "SQL_PROFILING", False):
+    set_profiling(True)
@@ -0,0 +1,20 @@
+# migrate.py
+
+# Applies any pending schema migrations (see migrations/__init__.py) to the
+# database in config/environment.py without dropping data:
+#     python migrate.py
+import sys
+
+from database import engine
+from migrations import run_migrations
+
+try:
+    print("Applying migrations...")
+    applied = run_migrations(engine)
+    for version in applied:
+        print(f"  applied {version}")
+    print("Database is up to date ✈️" if applied else "No pending migrations")
+except Exception as e:
+    # The failed migration isn't recorded, so it runs again next time
+    print("An error occurred:", e, file=sys.stderr)
+    sys.exit(1)
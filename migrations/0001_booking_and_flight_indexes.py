@@ -0,0 +1,75 @@
+# Adds the indexes behind the hot booking and flight queries, plus the
+# uq_bookings_live_seat index that stops a seat being booked twice.
+#
+# On Postgres the indexes are built CONCURRENTLY so the tables stay writable
+# while this runs. That can't happen inside a transaction, hence TRANSACTIONAL.
+# A concurrent build that fails leaves an INVALID index behind, which IF NOT
+# EXISTS would then skip, so invalid leftovers are dropped before building.
+#
+# Before this index existed two live bookings could end up on the same seat.
+# The migration stops and lists them if there are any; cancel or move one of
+# each pair, then run it again.
+
+from sqlalchemy import text
+
+TRANSACTIONAL = False
+
+LIVE_STATUSES = "('confirmed', 'checked_in')"
+MAX_LISTED_DUPLICATES = 20
+
+INDEXES = [
+    ("uq_bookings_live_seat", "UNIQUE INDEX {concurrently} IF NOT EXISTS uq_bookings_live_seat "
+     "ON bookings (flight_id, seat_number) "
+     f"WHERE booking_status IN {LIVE_STATUSES}"),
+    ("ix_bookings_flight_seat_status", "INDEX {concurrently} IF NOT EXISTS ix_bookings_flight_seat_status "
+     "ON bookings (flight_id, seat_number, booking_status)"),
+    ("ix_bookings_user_id", "INDEX {concurrently} IF NOT EXISTS ix_bookings_user_id "
+     "ON bookings (user_id)"),
+    ("ix_flights_route_status_departure", "INDEX {concurrently} IF NOT EXISTS ix_flights_route_status_departure "
+     "ON flights (departure_airport, arrival_airport, status, departure_time)"),
+]
+
+
+def check_duplicate_seats(connection) -> None:
+    """Raise, listing the bookings, if any seat has more than one live booking"""
+    duplicates = connection.exec_driver_sql(
+        "SELECT flight_id, seat_number, COUNT(*) FROM bookings "
+        f"WHERE booking_status IN {LIVE_STATUSES} "
+        "GROUP BY flight_id, seat_number HAVING COUNT(*) > 1 "
+        "ORDER BY flight_id, seat_number"
+    ).all()
+    if not duplicates:
+        return
+    lines = []
+    for flight_id, seat_number, count in duplicates[:MAX_LISTED_DUPLICATES]:
+        booking_ids = connection.execute(text(
+            "SELECT id FROM bookings WHERE flight_id = :flight_id AND seat_number = :seat_number "
+            f"AND booking_status IN {LIVE_STATUSES} ORDER BY id"
+        ), {"flight_id": flight_id, "seat_number": seat_number}).scalars().all()
+        lines.append(f"  flight {flight_id} seat {seat_number}: bookings {', '.join(map(str, booking_ids))}")
+    if len(duplicates) > MAX_LISTED_DUPLICATES:
+        lines.append(f"  ... and {len(duplicates) - MAX_LISTED_DUPLICATES} more seats")
+    raise RuntimeError(
+        f"{len(duplicates)} seat(s) have more than one live booking. Cancel or move all but one "
+        "booking on each seat, then run the migration again:\n" + "\n".join(lines)
+    )
+
+
+def drop_invalid_index(connection, name: str) -> None:
+    """Postgres only: drop an index left INVALID by a failed concurrent build"""
+    invalid = connection.execute(text(
+        "SELECT 1 FROM pg_index JOIN pg_class ON pg_class.oid = pg_index.indexrelid "
+        "WHERE pg_class.relname = :name AND NOT pg_index.indisvalid"
+    ), {"name": name}).first()
+    if invalid:
+        connection.exec_driver_sql(f"DROP INDEX CONCURRENTLY IF EXISTS {name}")
+
+
+def upgrade(connection):
+    postgres = connection.dialect.name == "postgresql"
+    concurrently = "CONCURRENTLY" if postgres else ""
+    check_duplicate_seats(connection)
+    for name, index in INDEXES:
+        if postgres:
+            drop_invalid_index(connection, name)
+        connection.exec_driver_sql("CREATE " + index.format(concurrently=concurrently))
@@ -0,0 +1,19 @@
+# Adds the sequences table used to hand out booking references in blocks
+# (see services/booking_reference.py).
+
+from sqlalchemy import BigInteger, Column, DateTime, Integer, MetaData, String, Table, func
+
+metadata = MetaData()
+
+sequences = Table(
+    "sequences", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("name", String, unique=True, nullable=False),
+    Column("next_value", BigInteger, nullable=False, default=0),
+    Column("created_at", DateTime, default=func.now()),
+    Column("updated_at", DateTime, default=func.now(), onupdate=func.now()),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(bind=connection, checkfirst=True)
@@ -0,0 +1,49 @@
+# Adds the airports reference table (filled from data/airport_data.py) and the
+# flights.distance_miles column, backfilled with one UPDATE per route from the
+# precomputed distance matrix (see services/route_distance.py).
+
+from sqlalchemy import Column, DateTime, Float, Integer, MetaData, String, Table, func, inspect, select, text
+from data.airport_data import AIRPORTS
+from services.route_distance import RouteDistances
+
+metadata = MetaData()
+
+airports = Table(
+    "airports", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("code", String, unique=True, nullable=False),
+    Column("name", String),
+    Column("city", String),
+    Column("country", String),
+    Column("latitude", Float, nullable=False),
+    Column("longitude", Float, nullable=False),
+    Column("created_at", DateTime, default=func.now()),
+    Column("updated_at", DateTime, default=func.now(), onupdate=func.now()),
+)
+
+
+def upgrade(connection):
+    metadata.create_all(bind=connection, checkfirst=True)
+    existing = set(connection.execute(select(airports.c.code)).scalars())
+    missing = [airport for airport in AIRPORTS if airport["code"] not in existing]
+    if missing:
+        connection.execute(airports.insert(), missing)
+
+    if "distance_miles" not in {column["name"] for column in inspect(connection).get_columns("flights")}:
+        connection.exec_driver_sql("ALTER TABLE flights ADD COLUMN distance_miles INTEGER")
+
+    # Built from this transaction's airports rows: the shared matrix reads the
+    # table on its own connection, which can't see them before the commit
+    all_airports = connection.execute(select(airports.c.code, airports.c.latitude, airports.c.longitude)).mappings().all()
+    distances = RouteDistances([dict(airport) for airport in all_airports])
+    routes = connection.exec_driver_sql("SELECT DISTINCT departure_airport, arrival_airport FROM flights").all()
+    updates = [
+        {"departure": departure, "arrival": arrival, "distance": distances.miles(departure, arrival)}
+        for departure, arrival in routes
+        if distances.miles(departure, arrival) is not None
+    ]
+    if updates:
+        connection.execute(text(
+            "UPDATE flights SET distance_miles = :distance "
+            "WHERE departure_airport = :departure AND arrival_airport = :arrival"
+        ), updates)
@@ -0,0 +1,35 @@
+# Adds the loyalty_accruals table that records the miles each booking earned
+# (see services/loyalty.py). Bookings checked in before it existed already got
+# their miles, so each of them gets a row with empty miles to stop the batch
+# accrual from paying them again.
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, func
+
+metadata = MetaData()
+
+# Only used for the foreign keys below
+Table("bookings", metadata, Column("id", Integer, primary_key=True))
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+loyalty_accruals = Table(
+    "loyalty_accruals", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("booking_id", Integer, ForeignKey("bookings.id"), unique=True, nullable=False),
+    Column("user_id", Integer, ForeignKey("users.id"), index=True, nullable=False),
+    Column("flight_distance", Integer),
+    Column("miles", Integer),
+    Column("points", Integer),
+    Column("loyalty_tier", String),
+    Column("created_at", DateTime, default=func.now()),
+    Column("updated_at", DateTime, default=func.now(), onupdate=func.now()),
+)
+
+
+def upgrade(connection):
+    loyalty_accruals.create(bind=connection, checkfirst=True)
+    connection.exec_driver_sql(
+        "INSERT INTO loyalty_accruals (booking_id, user_id, created_at, updated_at) "
+        "SELECT b.id, b.user_id, CURRENT_TIMESTAMP, CURRENT_TIMESTAMP FROM bookings b "
+        "WHERE b.booking_status = 'checked_in' AND b.user_id IS NOT NULL "
+        "AND NOT EXISTS (SELECT 1 FROM loyalty_accruals a WHERE a.booking_id = b.id)"
+    )
@@ -0,0 +1,25 @@
+# Adds the tier_changes table, a history of every Falconflyer tier move
+# (see services/loyalty.py).
+
+from sqlalchemy import Column, DateTime, ForeignKey, Integer, MetaData, String, Table, func
+
+metadata = MetaData()
+
+# Only used for the foreign key below
+Table("users", metadata, Column("id", Integer, primary_key=True))
+
+tier_changes = Table(
+    "tier_changes", metadata,
+    Column("id", Integer, primary_key=True, index=True),
+    Column("user_id", Integer, ForeignKey("users.id"), index=True, nullable=False),
+    Column("old_tier", String),
+    Column("new_tier", String, nullable=False),
+    Column("total_points", Integer),
+    Column("reason", String, nullable=False),
+    Column("created_at", DateTime, default=func.now()),
+    Column("updated_at", DateTime, default=func.now(), onupdate=func.now()),
+)
+
+
+def upgrade(connection):
+    tier_changes.create(bind=connection, checkfirst=True)
@@ -0,0 +1,24 @@
+# Adds sequences.permutation_key, the key that shuffles booking reference
+# counter values (see services/booking_reference.py). It used to come from
+# config (BOOKING_REFERENCE_KEY, or the JWT secret when that wasn't set), so
+# rotating the JWT secret changed it and new references could repeat old ones.
+#
+# A counter that has already handed out references keeps the key it was using:
+# that config value is copied into its row here, once. After that the key only
+# lives in the database. Counters without references get a random key on first use.
+
+from sqlalchemy import inspect, text
+from config import environment
+
+BOOKING_REFERENCE_SEQUENCE = "booking_reference"
+
+
+def upgrade(connection):
+    if "permutation_key" not in {column["name"] for column in inspect(connection).get_columns("sequences")}:
+        connection.exec_driver_sql("ALTER TABLE sequences ADD COLUMN permutation_key VARCHAR")
+
+    current_key = getattr(environment, "BOOKING_REFERENCE_KEY", None) or environment.secret
+    connection.execute(text(
+        "UPDATE sequences SET permutation_key = :key "
+        "WHERE name = :name AND permutation_key IS NULL AND next_value > 0"
+    ), {"key": current_key, "name": BOOKING_REFERENCE_SEQUENCE})
@@ -0,0 +1,80 @@
+# =============================================================================
+# MIGRATIONS - Versioned schema changes for existing databases
+# =============================================================================
+# seed.py rebuilds the database from scratch, which is fine locally but throws
+# away all data. Migrations change a live database in place instead.
+#
+# Each migration is a module in this folder named "<number>_<description>.py"
+# with an upgrade(connection) function. They run in filename order, and the
+# names of the ones already applied are stored in the schema_migrations table.
+# A migration can set TRANSACTIONAL = False when it needs to run outside a
+# transaction (e.g. CREATE INDEX CONCURRENTLY on Postgres).
+
+import importlib
+import pkgutil
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, MetaData, String, Table, select
+from sqlalchemy.engine import Engine
+
+# Kept outside models.base.Base so drop_all/create_all in seed.py don't touch it
+schema_metadata = MetaData()
+schema_migrations = Table(
+    "schema_migrations", schema_metadata,
+    Column("version", String, primary_key=True),
+    Column("applied_at", DateTime),
+)
+
+
+def available_migrations() -> list:
+    """All migration modules in this package, oldest first"""
+    names = sorted(
+        module.name for module in pkgutil.iter_modules(__path__)
+        if module.name[:1].isdigit()
+    )
+    return [importlib.import_module(f"{__name__}.{name}") for name in names]
+
+
+def applied_versions(engine: Engine) -> set:
+    schema_metadata.create_all(bind=engine)
+    with engine.connect() as connection:
+        return set(connection.execute(select(schema_migrations.c.version)).scalars())
+
+
+def version_of(migration) -> str:
+    return migration.__name__.rsplit(".", 1)[-1]
+
+
+def run_migrations(engine: Engine) -> list:
+    """Apply every pending migration. Returns the versions that were applied."""
+    done = applied_versions(engine)
+    applied = []
+    for migration in available_migrations():
+        version = version_of(migration)
+        if version in done:
+            continue
+
+        if getattr(migration, "TRANSACTIONAL", True):
+            with engine.begin() as connection:
+                migration.upgrade(connection)
+                _record(connection, version)
+        else:
+            # Each statement commits on its own, so upgrade() must be safe to re-run
+            with engine.connect().execution_options(isolation_level="AUTOCOMMIT") as connection:
+                migration.upgrade(connection)
+                _record(connection, version)
+        applied.append(version)
+    return applied
+
+
+def mark_all_applied(engine: Engine) -> None:
+    """Record every migration as applied, for a schema just built by create_all"""
+    done = applied_versions(engine)
+    with engine.begin() as connection:
+        for migration in available_migrations():
+            if version_of(migration) not in done:
+                _record(connection, version_of(migration))
+
+
+def _record(connection, version: str) -> None:
+    connection.execute(schema_migrations.insert().values(version=version, applied_at=datetime.now()))
@@ -0,0 +1,22 @@
+# =============================================================================
+# AIRPORT MODEL - Reference data for every airport on the network
+# =============================================================================
+# One row per airport with its coordinates, first filled from
+# data/airport_data.py. The route distance matrix is built from this table
+# (see services/route_distance.py), so new airports only need a row here.
+
+from sqlalchemy import Column, Integer, String, Float
+from .base import BaseModel
+
+class AirportModel(BaseModel):
+    """Airport model - an airport and where it is"""
+
+    __tablename__ = "airports"  # Database table name
+
+    id = Column(Integer, primary_key=True, index=True)  # Unique airport ID
+    code = Column(String, unique=True, nullable=False)  # IATA code like "BAH"
+    name = Column(String)  # Airport name like "Bahrain International"
+    city = Column(String)  # City served, like "Bahrain"
+    country = Column(String)
+    latitude = Column(Float, nullable=False)  # Degrees north
+    longitude = Column(Float, nullable=False)  # Degrees east
@@ -4,10 +4,13 @@
 # This model links users to flights and stores all booking details
 # Includes passenger information, seat selection, and payment details
 
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from .base import BaseModel
 from sqlalchemy.orm import relationship
 
+# Bookings in these states still occupy their seat on the flight
+LIVE_BOOKING_STATUSES = ("confirmed", "checked_in")
+
 class BookingModel(BaseModel):
     """Booking model - stores passenger flight bookings"""
 
@@ -15,10 +18,10 @@ class BookingModel(BaseModel):
 
     # Basic booking identification
     id = Column(Integer, primary_key=True, index=True)  # Unique booking ID
-    booking_reference = Column(String, unique=True)  # Unique code like "GA8C30A70F"
+    booking_reference = Column(String, unique=True)  # Unique code like "GA8C30A70F" (the unique constraint also indexes lookups)
     
     # Links to other tables - who booked what flight
-    user_id = Column(Integer, ForeignKey('users.id'))    # Which user made the booking
+    user_id = Column(Integer, ForeignKey('users.id'), index=True)    # Which user made the booking
     flight_id = Column(Integer, ForeignKey('flights.id')) # Which flight was booked
     
     # Passenger information - who is traveling
@@ -38,3 +41,17 @@ class BookingModel(BaseModel):
     # Relationship to other tables: Each booking connects a user to a flight.
     user = relationship('UserModel', back_populates='bookings')
     flight = relationship('FlightModel', back_populates='bookings')
+
+    # Indexes - keep in sync with the migrations/ folder for existing databases
+    __table_args__ = (
+        # A seat can only belong to one live booking per flight. This is a partial
+        # unique index, so cancelled bookings don't block the seat from being resold.
+        Index(
+            "uq_bookings_live_seat", "flight_id", "seat_number",
+            unique=True,
+            sqlite_where=booking_status.in_(LIVE_BOOKING_STATUSES),
+            postgresql_where=booking_status.in_(LIVE_BOOKING_STATUSES),
+        ),
+        # Seat lookups by flight, seat and status (create/reschedule, seat maps)
+        Index("ix_bookings_flight_seat_status", "flight_id", "seat_number", "booking_status"),
+    )
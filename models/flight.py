@@ -4,7 +4,7 @@
 # This model stores details about each specific flight (route, time, pricing, availability)
 # Each flight is linked to an aircraft and has separate pricing for economy/business classes
 
-from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey
+from sqlalchemy import Column, Integer, String, DateTime, Float, ForeignKey, Index
 from .base import BaseModel
 from sqlalchemy.orm import relationship
 
@@ -20,6 +20,7 @@ class FlightModel(BaseModel):
     # Route information - where the flight goes
     departure_airport = Column(String)  # Airport code like "BAH" (Bahrain)
     arrival_airport = Column(String)    # Airport code like "DXB" (Dubai)
+    distance_miles = Column(Integer, nullable=True)  # Route distance, from services/route_distance.py
     
     # Schedule information - when the flight operates
     departure_time = Column(DateTime)  # When the flight leaves
@@ -44,3 +45,10 @@ class FlightModel(BaseModel):
 
     # Relationship to bookings (a flight can have many bookings)
     bookings = relationship('BookingModel', back_populates='flight', lazy='dynamic')
+
+    # Indexes - keep in sync with the migrations/ folder for existing databases
+    __table_args__ = (
+        # Route search: equality on route and status, then range/order on departure time
+        Index("ix_flights_route_status_departure",
+              "departure_airport", "arrival_airport", "status", "departure_time"),
+    )
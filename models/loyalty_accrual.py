@@ -0,0 +1,23 @@
+# =============================================================================
+# LOYALTY ACCRUAL MODEL - Miles and points awarded for each checked-in booking
+# =============================================================================
+# One row per booking, written in the same transaction that adds the miles to
+# the user. The unique booking_id is what stops a booking from earning twice,
+# whether it was accrued at check-in or by the batch job at departure
+# (see services/loyalty.py).
+
+from sqlalchemy import Column, Integer, String, ForeignKey
+from .base import BaseModel
+
+class LoyaltyAccrualModel(BaseModel):
+    """Loyalty accrual model - the miles a booking earned"""
+
+    __tablename__ = "loyalty_accruals"  # Database table name
+
+    id = Column(Integer, primary_key=True, index=True)  # Unique accrual ID
+    booking_id = Column(Integer, ForeignKey('bookings.id'), unique=True, nullable=False)  # Each booking earns once
+    user_id = Column(Integer, ForeignKey('users.id'), index=True, nullable=False)  # Who got the miles
+    flight_distance = Column(Integer)  # Miles flown, before multipliers
+    miles = Column(Integer)  # Miles earned (empty for check-ins from before this table existed)
+    points = Column(Integer)  # Points earned
+    loyalty_tier = Column(String)  # Tier whose multiplier was applied
@@ -0,0 +1,19 @@
+# =============================================================================
+# SEQUENCE MODEL - Named counters handed out in blocks
+# =============================================================================
+# Each row is one counter (e.g. "booking_reference"). Servers reserve a block
+# of values with a single UPDATE and then hand them out from memory, so the
+# database is only touched once per block instead of once per value.
+
+from sqlalchemy import Column, Integer, String, BigInteger
+from .base import BaseModel
+
+class SequenceModel(BaseModel):
+    """Sequence model - a named counter"""
+
+    __tablename__ = "sequences"  # Database table name
+
+    id = Column(Integer, primary_key=True, index=True)  # Unique sequence ID
+    name = Column(String, unique=True, nullable=False)  # Counter name like "booking_reference"
+    next_value = Column(BigInteger, nullable=False, default=0)  # First value not yet handed out
+    permutation_key = Column(String)  # Key that shuffles the values (see services/booking_reference.py)
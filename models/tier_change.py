@@ -0,0 +1,21 @@
+# =============================================================================
+# TIER CHANGE MODEL - History of Falconflyer tier moves
+# =============================================================================
+# One row every time a member moves tier, written in the same transaction as
+# the move itself (see services/loyalty.py). Other systems, e.g. the mailer
+# that sends "welcome to Gold" emails, read new rows from here.
+
+from sqlalchemy import Column, Integer, String, ForeignKey
+from .base import BaseModel
+
+class TierChangeModel(BaseModel):
+    """Tier change model - one member moving from one tier to another"""
+
+    __tablename__ = "tier_changes"  # Database table name
+
+    id = Column(Integer, primary_key=True, index=True)  # Unique event ID, increasing
+    user_id = Column(Integer, ForeignKey('users.id'), index=True, nullable=False)  # Who moved
+    old_tier = Column(String)  # Tier before the move
+    new_tier = Column(String, nullable=False)  # Tier after the move
+    total_points = Column(Integer)  # Points that decided the new tier
+    reason = Column(String, nullable=False)  # "accrual" or "recalculation"
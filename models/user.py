@@ -2,14 +2,12 @@
 
 from sqlalchemy import Column, Integer, String
 from .base import BaseModel
-from passlib.context import CryptContext # Import new package
 from datetime import datetime, timedelta, timezone  # New import for timestamps
 import jwt  # New import for token generation
 from config.environment import secret # Import the secret from the environment file
 from sqlalchemy.orm import relationship
-
-# Creating a password hashing context using bcrypt
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Password hashing context using bcrypt (shared with the bcrypt worker pool)
+from services.password_pool import get_pwd_context
 
 # Inherits from BaseModel
 class UserModel(BaseModel):
@@ -36,14 +34,15 @@ class UserModel(BaseModel):
     bookings = relationship('BookingModel', back_populates='user')
     
     # password hashing: Takes a plain password and hashes it using bcrypt (passlib).
+    # These run in the calling thread - request handlers use services.password_pool instead.
     def set_password(self, password: str):
-        self.password_hash = pwd_context.hash(password)
+        self.password_hash = get_pwd_context().hash(password)
 
     # Method to verify the password
     # Compares a plain password with the stored hash.
     # Returns True if it matches, False otherwise.
     def verify_password(self, password: str) -> bool:
-        return pwd_context.verify(password, self.password_hash)
+        return get_pwd_context().verify(password, self.password_hash)
     
     # generates a JWT token
     def generate_token(self):        
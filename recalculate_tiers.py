@@ -0,0 +1,43 @@
+# recalculate_tiers.py
+
+# Moves every Falconflyer member to the tier their loyalty points earn, e.g.
+# after changing LOYALTY_TIER_THRESHOLDS (see services/loyalty.py):
+#     python recalculate_tiers.py --dry-run
+#     python recalculate_tiers.py
+# Each move is logged in the tier_changes table.
+import argparse
+import json
+import time
+
+from database import engine
+# Import all models to ensure they are registered
+from models.user import UserModel
+from models.flight import FlightModel
+from models.booking import BookingModel
+from models.aircraft import AircraftModel
+from models.airport import AirportModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from services.loyalty import TIER_CHUNK_SIZE, recalculate_tiers
+
+parser = argparse.ArgumentParser(description="Recalculate every member's loyalty tier from their points")
+parser.add_argument("--chunk-size", type=int, default=TIER_CHUNK_SIZE,
+                    help="User IDs per transaction (0 for one UPDATE over the whole table)")
+parser.add_argument("--dry-run", action="store_true", help="Only count the moves, change nothing")
+parser.add_argument("--json", action="store_true", help="Print the full report as JSON")
+args = parser.parse_args()
+
+try:
+    start = time.perf_counter()
+    report = recalculate_tiers(engine, chunk_size=args.chunk_size or None, dry_run=args.dry_run)
+    elapsed = time.perf_counter() - start
+    if args.json:
+        print(json.dumps(report.as_dict(), indent=2))
+    else:
+        verb = "Would move" if args.dry_run else "Moved"
+        print(f"Checked {report.users} members in {elapsed:.1f}s. "
+              f"{verb} {report.upgrades + report.downgrades}: {report.upgrades} up, {report.downgrades} down")
+        for change, members in sorted(report.changes.items()):
+            print(f"  {change}: {members}")
+except Exception as e:
+    print("An error occurred:", e)
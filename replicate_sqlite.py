@@ -0,0 +1,57 @@
+# replicate_sqlite.py
+
+# Stand-in replication for trying read replicas locally with SQLite. Copies the
+# database in db_URI over every file listed in replica_db_URIs (see database.py
+# and services/read_replicas.py):
+#     python replicate_sqlite.py              # copy once
+#     python replicate_sqlite.py --every 2    # keep copying, replicas up to ~2s behind
+# The copy uses SQLite's online backup, so it is safe while the API is running
+# and the API's open replica connections see the new data.
+import argparse
+import sqlite3
+import time
+
+from sqlalchemy.engine import make_url
+from config.environment import db_URI
+from database import replica_db_URIs
+
+
+def sqlite_path(url: str) -> str:
+    url = make_url(url)
+    if url.get_backend_name() != "sqlite" or (url.database or ":memory:") == ":memory:":
+        raise SystemExit(f"Only SQLite database files can be copied, not {url.render_as_string()}")
+    return url.database
+
+
+def copy(source_path: str, replica_paths: list) -> None:
+    source = sqlite3.connect(source_path)
+    try:
+        for path in replica_paths:
+            replica = sqlite3.connect(path, timeout=30)  # Waits for readers holding a lock on the replica
+            try:
+                source.backup(replica)
+            finally:
+                replica.close()
+    finally:
+        source.close()
+
+
+parser = argparse.ArgumentParser(description="Copy the SQLite database to the replica files in replica_db_URIs")
+parser.add_argument("--every", type=float, metavar="SECONDS", help="Keep copying every SECONDS instead of once")
+args = parser.parse_args()
+
+if not replica_db_URIs:
+    raise SystemExit("No replicas: set replica_db_URIs in config/environment.py")
+source_path = sqlite_path(db_URI)
+replica_paths = [sqlite_path(url) for url in replica_db_URIs]
+
+try:
+    while True:
+        start = time.perf_counter()
+        copy(source_path, replica_paths)
+        print(f"Copied {source_path} to {len(replica_paths)} replica(s) in {time.perf_counter() - start:.2f}s")
+        if not args.every:
+            break
+        time.sleep(args.every)
+except KeyboardInterrupt:
+    pass
@@ -9,6 +9,11 @@ from models.user import UserModel
 from models.flight import FlightModel
 from models.booking import BookingModel
 from models.aircraft import AircraftModel
+from models.sequence import SequenceModel
+from models.airport import AirportModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from migrations import mark_all_applied
 
 engine = create_engine(db_URI)
 SessionLocal = sessionmaker(bind=engine)
@@ -20,14 +25,16 @@ try:
     # our data, changing our models, this seed program will allow us to rapidly throw out the old data and replace it.
     Base.metadata.drop_all(bind=engine)
     Base.metadata.create_all(bind=engine)
+    # create_all already builds the latest schema, so nothing is left to migrate
+    mark_all_applied(engine)
 
     print("Seeding the database...")
     db = SessionLocal()
 
     # Add users first (they are referenced by bookings)
     print("Adding users...")
-    from data.user_data import user_list
-    db.add_all(user_list)
+    from data.user_data import create_test_users
+    db.add_all(create_test_users())
     db.commit()
 
     # Add aircraft first (they are referenced by flights)
@@ -39,16 +46,22 @@ try:
     db.add_all(aircraft_list)
     db.commit()
 
+    # Add airports (flight distances come from the same list)
+    print("Adding airports...")
+    from data.airport_data import AIRPORTS
+    db.add_all([AirportModel(**airport) for airport in AIRPORTS])
+    db.commit()
+
     # Add flights
     print("Adding flights...")
-    from data.gulf_air_flights import flights_list
-    db.add_all(flights_list)
+    from data.gulf_air_flights import create_gulf_air_flights
+    db.add_all(create_gulf_air_flights())
     db.commit()
 
     # Add bookings (after users and flights are created)
     print("Adding bookings...")
-    from data.booking_data import bookings_list
-    db.add_all(bookings_list)
+    from data.booking_data import create_bookings
+    db.add_all(create_bookings())
     db.commit()
 
     db.close()
@@ -5,7 +5,7 @@
 # They ensure passenger information is correct and handle seat class validation
 
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 from .user import UserResponseSchema
 from .flight import FlightSchema
@@ -50,11 +50,40 @@ class BookingCreate(BaseModel):
     seat_number: str  # Specific seat like "12A"
     total_price: float  # Amount to pay
 
+# =============================================================================
+# GROUP BOOKING - For booking several passengers in one request
+# =============================================================================
+# A group booking has one segment per flight (one segment, or several for an
+# itinerary with connections). Each segment lists the passengers on that flight
+# and their seats. Either every seat is booked or none are.
+
+MAX_GROUP_PASSENGERS = 9  # Passengers per segment, larger groups go through the groups desk
+
+
+class GroupPassenger(BaseModel):
+    passenger_name: str  # Full name of passenger
+    passenger_email: str  # Email for notifications
+    passport_number: str  # Required for international flights
+    seat_class: str = "economy"  # "economy" or "business"
+    seat_number: str  # Specific seat like "12A"
+    total_price: float  # Amount to pay for this passenger on this flight
+
+
+class GroupBookingSegment(BaseModel):
+    flight_id: int  # Which flight to book
+    passengers: List[GroupPassenger] = Field(min_length=1, max_length=MAX_GROUP_PASSENGERS)
+
+
+class GroupBookingCreate(BaseModel):
+    segments: List[GroupBookingSegment] = Field(min_length=1, max_length=4)  # Up to 4 flights per itinerary
+
 # =============================================================================
 # BOOKING UPDATE - For updating existing bookings
 # =============================================================================
 # Used when user wants to modify their booking
 # All fields are optional - only update what's provided
+# The status isn't one of them: cancelling (DELETE) and checking in (POST
+# .../checkin) change seat counts and earn loyalty miles, so only they set it
 
 class BookingUpdate(BaseModel):
     passenger_name: Optional[str] = None  # Change passenger name
@@ -62,5 +91,4 @@ class BookingUpdate(BaseModel):
     passport_number: Optional[str] = None  # Update passport
     seat_class: Optional[str] = None  # Change seat class
     seat_number: Optional[str] = None  # Change seat number
-    booking_status: Optional[str] = None  # Change status (admin only)
     total_price: Optional[float] = None  # Update price
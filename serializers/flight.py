@@ -19,6 +19,7 @@ class FlightSchema(BaseModel):
     flight_number: str  # Flight number like "GF001"
     departure_airport: str  # Airport code like "BAH"
     arrival_airport: str    # Airport code like "DXB"
+    distance_miles: Optional[int] = None  # Route distance in miles
     departure_time: datetime  # When flight leaves
     arrival_time: datetime    # When flight arrives
     aircraft_id: int  # Which aircraft is used
@@ -0,0 +1,195 @@
+# =============================================================================
+# BOOKING REFERENCES - Unique references without a database lookup per booking
+# =============================================================================
+# References used to be 6 random letters, with a SELECT to check each one was
+# unused. Now every reference comes from a counter, so it is unique by design:
+#
+#   1. Each server reserves a block of counter values with one UPDATE on the
+#      sequences table and hands them out from memory (BLOCK_SIZE per trip).
+#   2. The counter value is shuffled with a keyed permutation (a small Feistel
+#      network), so references can't be guessed from each other. That matters
+#      because anyone with a reference can look the booking up.
+#   3. The result is written as 6 characters from an alphabet without the
+#      easily confused 0/O and 1/I, plus a check character (Luhn mod 32) that
+#      catches any single mistyped character.
+#
+# New references are 7 characters long, e.g. "K7QM3TZ", so they can never
+# clash with the older 6-letter or "GA12345678" style references.
+#
+# The permutation key is stored in the counter's row of the sequences table
+# (a random one is made when the row is created), so every server uses the
+# same key and it never changes with the JWT secret. A different key would
+# shuffle new counter values onto references that were already handed out.
+#
+# Optional settings in config/environment.py:
+#   BOOKING_REFERENCE_BLOCK_SIZE - counter values reserved per database trip (default 1000)
+
+import hashlib
+import secrets
+import threading
+from array import array
+
+from sqlalchemy import create_engine, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+from sqlalchemy.exc import IntegrityError
+from models.sequence import SequenceModel
+from config import environment
+
+ALPHABET = "23456789ABCDEFGHJKLMNPQRSTUVWXYZ"  # 32 characters = 5 bits each
+PAYLOAD_LENGTH = 6
+REFERENCE_LENGTH = PAYLOAD_LENGTH + 1  # Plus the check character
+HALF_BITS = PAYLOAD_LENGTH * 5 // 2  # 15 bits per Feistel half
+HALF_MASK = (1 << HALF_BITS) - 1
+CAPACITY = 1 << (2 * HALF_BITS)  # 2^30, about a billion references
+FEISTEL_ROUNDS = 4
+
+BLOCK_SIZE = getattr(environment, "BOOKING_REFERENCE_BLOCK_SIZE", 1000)
+SEQUENCE_NAME = "booking_reference"
+
+_round_tables = {}  # permutation key -> round tables
+_round_tables_lock = threading.Lock()
+
+
+def get_round_tables(key: str) -> list:
+    """Feistel round functions as lookup tables (built once per key, about 256 KB)"""
+    with _round_tables_lock:
+        if key not in _round_tables:
+            tables = []
+            for round_number in range(FEISTEL_ROUNDS):
+                round_key = hashlib.sha256(f"{key}:{round_number}".encode()).digest()
+                table = array("H", (
+                    int.from_bytes(hashlib.blake2b(value.to_bytes(2, "big"), key=round_key, digest_size=2).digest(), "big") & HALF_MASK
+                    for value in range(1 << HALF_BITS)
+                ))
+                tables.append(table)
+            _round_tables[key] = tables
+        return _round_tables[key]
+
+
+def permute(value: int, key: str) -> int:
+    """Shuffle a counter value into another value in [0, CAPACITY). One to one, so never collides."""
+    left, right = value >> HALF_BITS, value & HALF_MASK
+    for table in get_round_tables(key):
+        left, right = right, left ^ table[right]
+    return (left << HALF_BITS) | right
+
+
+def check_character(payload: str) -> str:
+    """Luhn mod N check character for a payload written in ALPHABET"""
+    base = len(ALPHABET)
+    factor = 2
+    total = 0
+    for char in reversed(payload):
+        addend = factor * ALPHABET.index(char)
+        total += addend // base + addend % base
+        factor = 1 if factor == 2 else 2
+    return ALPHABET[(base - total % base) % base]
+
+
+def format_reference(value: int, key: str) -> str:
+    """Turn a counter value into a booking reference like "K7QM3TZ" """
+    if not 0 <= value < CAPACITY:
+        raise ValueError("Booking reference counter is out of range")
+    number = permute(value, key)
+    payload = "".join(ALPHABET[(number >> shift) & 31] for shift in range(5 * (PAYLOAD_LENGTH - 1), -1, -5))
+    return payload + check_character(payload)
+
+
+def is_plausible_reference(reference: str) -> bool:
+    """False only for references in the current format whose check character is wrong.
+
+    Older references (other lengths or characters) can't be checked, so they pass.
+    """
+    if len(reference) != REFERENCE_LENGTH or any(char not in ALPHABET for char in reference):
+        return True
+    return check_character(reference[:-1]) == reference[-1]
+
+
+class BookingReferenceAllocator:
+    """Hands out unique booking references from blocks reserved in the sequences table"""
+
+    def __init__(self, name: str = SEQUENCE_NAME, block_size: int = BLOCK_SIZE):
+        self.name = name
+        self.block_size = block_size
+        self.blocks_reserved = 0
+        self._next_value = 0
+        self._block_end = 0
+        self.key = None  # Permutation key, read from the sequences table with the first block
+        self._lock = threading.Lock()
+        self._engines = {}
+
+    def next(self, engine: Engine) -> str:
+        """A new, never used booking reference.
+
+        Call this before the request writes anything. Reserving a block uses its
+        own connection, and on SQLite that waits for the single write lock.
+        """
+        with self._lock:
+            if self._next_value >= self._block_end:
+                self._next_value, self._block_end = self._reserve_block(engine)
+            value = self._next_value
+            self._next_value += 1
+        return self.format(value)
+
+    def reserve_range(self, engine: Engine, count: int) -> range:
+        """Reserve `count` counter values at once (e.g. for bulk loads). Turn them into references with format()."""
+        start, end = self._reserve_block(engine, count)
+        return range(start, end)
+
+    def format(self, value: int) -> str:
+        """The booking reference for a counter value reserved by this allocator"""
+        return format_reference(value, self.key)
+
+    def _unpooled(self, engine: Engine) -> Engine:
+        # The request calling next() already holds one of the pool's connections.
+        # Under load every pooled connection can be held by a request waiting for
+        # this block, so borrowing another from the same pool would wait forever.
+        # Blocks are reserved on a short-lived connection of their own instead.
+        if engine.url.get_backend_name() == "sqlite" and (engine.url.database or ":memory:") == ":memory:":
+            return engine  # A new connection would be a new, empty in-memory database
+        if engine not in self._engines:
+            self._engines[engine] = create_engine(engine.url, poolclass=NullPool)
+        return self._engines[engine]
+
+    def _reserve_block(self, engine: Engine, size: int = None) -> tuple:
+        # Runs in its own short transaction, so a booking that rolls back doesn't
+        # hand its block back. The skipped values are simply never used.
+        size = size or self.block_size
+        engine = self._unpooled(engine)
+        table = SequenceModel.__table__
+        for _ in range(2):
+            with engine.begin() as connection:
+                # The UPDATE locks the row, so two servers can't get the same block
+                updated = connection.execute(
+                    update(table).where(table.c.name == self.name)
+                    .values(next_value=table.c.next_value + size)
+                ).rowcount
+                if updated:
+                    end, key = connection.execute(
+                        select(table.c.next_value, table.c.permutation_key).where(table.c.name == self.name)
+                    ).one()
+                    if key is None:
+                        key = self._store_new_key(connection, table)
+                    self.key = key
+                    self.blocks_reserved += 1
+                    return end - size, end
+            try:
+                with engine.begin() as connection:
+                    connection.execute(table.insert().values(name=self.name, next_value=0, permutation_key=secrets.token_hex(32)))
+            except IntegrityError:
+                pass  # Another server created it first, just try the UPDATE again
+        raise RuntimeError(f"Could not reserve a block from sequence {self.name!r}")
+
+    def _store_new_key(self, connection, table) -> str:
+        # Only for a row without a key, i.e. one that hasn't handed out any
+        # references yet (migration 0006 keeps the key of rows that have)
+        connection.execute(
+            update(table).where(table.c.name == self.name, table.c.permutation_key.is_(None))
+            .values(permutation_key=secrets.token_hex(32))
+        )
+        return connection.execute(select(table.c.permutation_key).where(table.c.name == self.name)).scalar_one()
+
+
+# Shared instance used by the booking controller
+reference_allocator = BookingReferenceAllocator()
@@ -0,0 +1,128 @@
+# =============================================================================
+# FLIGHT RESPONSE CACHE - Cached JSON + ETags for the flight catalogue
+# =============================================================================
+# The mobile app polls the flight list, single flights and flight status all
+# the time, and most polls see exactly the same data as last time. Responses
+# for those endpoints are kept here as ready-made JSON bytes with a strong ETag:
+#   - a repeat request is answered without touching the database
+#   - a request with a matching If-None-Match header gets an empty 304
+#
+# Every cached response records the data version it was built from:
+#   - the catalogue version (any flight changed) for the flight list
+#   - the flight's own version for single flight / status responses
+# Endpoints that change flights or seat counts call invalidate() after their
+# commit, which bumps those versions so stale entries are never served again.
+# The versions are per process, so FLIGHT_CACHE_TTL_SECONDS bounds how long a
+# change made by another worker process can go unseen.
+#
+# A response read from a replica (see services/read_replicas.py) can be older
+# than the version it was built under, so it is only cached once the data it
+# covers has been unchanged for longer than the replica can be behind.
+
+import hashlib
+import threading
+import time
+
+from fastapi import Request, Response
+from services.cache import TTLCache, MISSING
+
+FLIGHT_CACHE_SIZE = 5000
+FLIGHT_CACHE_TTL_SECONDS = 5
+
+
+class CachedResponse:
+    """One cached response body and the data version it was built from"""
+
+    def __init__(self, version: int, flight_id, body: bytes, headers: dict):
+        self.version = version
+        self.flight_id = flight_id
+        self.body = body
+        self.headers = headers
+        self.etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+class FlightResponseCache:
+    def __init__(self, maxsize: int = FLIGHT_CACHE_SIZE, ttl_seconds: float = FLIGHT_CACHE_TTL_SECONDS):
+        self.entries = TTLCache(maxsize=maxsize, ttl_seconds=ttl_seconds)
+        self.catalogue_version = 0
+        # Never shrinks: SQLite can reuse a deleted flight's ID, and the new
+        # flight must not match entries cached for the old one.
+        self.flight_versions = {}
+        self.all_flights_version = 0  # Added to every flight's version, see invalidate_all()
+        # time.monotonic() of the last change, for responses read from a replica
+        self.catalogue_changed_at = 0.0
+        self.flight_changed_at = {}
+        self.all_flights_changed_at = 0.0
+        self._lock = threading.Lock()
+
+    def version(self, flight_id: int = None) -> int:
+        """Current data version of one flight, or of the whole catalogue"""
+        if flight_id is None:
+            return self.catalogue_version
+        return self.all_flights_version + self.flight_versions.get(flight_id, 0)
+
+    def changed_at(self, flight_id: int = None) -> float:
+        """When version(flight_id) last changed (time.monotonic())"""
+        if flight_id is None:
+            return self.catalogue_changed_at
+        return max(self.all_flights_changed_at, self.flight_changed_at.get(flight_id, 0.0))
+
+    def invalidate(self, flight_id: int = None) -> None:
+        """Call after committing a change to a flight (or None for a new flight)"""
+        with self._lock:
+            now = time.monotonic()
+            self.catalogue_version += 1
+            self.catalogue_changed_at = now
+            if flight_id is not None:
+                self.flight_versions[flight_id] = self.flight_versions.get(flight_id, 0) + 1
+                self.flight_changed_at[flight_id] = now
+
+    def invalidate_all(self) -> None:
+        """Call after a change that may touch any flight, e.g. a schedule import"""
+        with self._lock:
+            now = time.monotonic()
+            self.catalogue_version += 1
+            self.all_flights_version += 1
+            self.catalogue_changed_at = self.all_flights_changed_at = now
+
+    def get(self, key):
+        """The cached response for key, or None if missing or out of date"""
+        entry = self.entries.get(key)
+        if entry is MISSING or entry.version != self.version(entry.flight_id):
+            return None
+        return entry
+
+    def put(self, key, version: int, body: bytes, headers: dict = None, flight_id: int = None,
+            stale_seconds: float = 0) -> CachedResponse:
+        """Cache a response. `version` must be read with version() BEFORE querying the data.
+
+        stale_seconds is how far behind the primary the data may be (see
+        stale_seconds() in services/read_replicas.py). The response is returned
+        but not cached if the data changed more recently than that.
+        """
+        entry = CachedResponse(version, flight_id, body, headers or {})
+        if not stale_seconds or time.monotonic() - self.changed_at(flight_id) >= stale_seconds:
+            self.entries.set(key, entry)
+        return entry
+
+
+def etag_matches(if_none_match: str, etag: str) -> bool:
+    if not if_none_match:
+        return False
+    for candidate in if_none_match.split(","):
+        candidate = candidate.strip()
+        if candidate == "*" or candidate.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+def cached_response(request: Request, entry: CachedResponse) -> Response:
+    """200 with the cached body, or 304 if the client already has this version"""
+    headers = {"ETag": entry.etag, "Cache-Control": "no-cache", **entry.headers}
+    if etag_matches(request.headers.get("if-none-match"), entry.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+
+# Shared instance used by the flight and booking controllers
+flight_cache = FlightResponseCache()
@@ -0,0 +1,360 @@
+# =============================================================================
+# FALCONFLYER LOYALTY - Miles, points and tiers for checked-in bookings
+# =============================================================================
+# The accrual engine works on a whole set of checked-in bookings at once, e.g.
+# every booking on a flight when it departs, or the one booking being checked in:
+#   1. One SELECT reads the bookings with their flight distance and user tier.
+#   2. Miles are distance x seat class multiplier x tier multiplier, computed
+#      for the whole chunk at once with NumPy arrays.
+#   3. One INSERT ... ON CONFLICT DO NOTHING writes a loyalty_accruals row per
+#      booking. Bookings that already have one are skipped, so a booking never
+#      earns twice, however often the job runs.
+#   4. One executemany adds each user's total to their miles and points
+#      (loyalty_miles = loyalty_miles + :miles, so parallel accruals add up).
+#   5. One UPDATE moves every affected user to the tier their points now earn.
+# Steps 3-5 run in the caller's transaction, so they stand or fall together.
+#
+# recalculate_tiers() puts every member on the tier their points earn with a
+# chunked UPDATE ... SET loyalty_tier = CASE ..., e.g. after the thresholds
+# change. Both it and the accrual log each move in the tier_changes table.
+#
+# Optional settings in config/environment.py:
+#   LOYALTY_ACCRUAL_CHUNK_SIZE - bookings per transaction for batch runs (default 1000)
+#   LOYALTY_TIER_THRESHOLDS    - points needed for each tier (defaults below)
+#   LOYALTY_TIER_CHUNK_SIZE    - user IDs per transaction for recalculate_tiers (default 50000)
+
+from collections import Counter
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional
+
+from sqlalchemy import bindparam, case, func, select, update
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.orm import Session
+from models.booking import BookingModel
+from models.flight import FlightModel
+from models.loyalty_accrual import LoyaltyAccrualModel
+from models.tier_change import TierChangeModel
+from models.user import UserModel
+from services.route_distance import route_distance
+from config import environment
+
+ACCRUAL_CHUNK_SIZE = getattr(environment, "LOYALTY_ACCRUAL_CHUNK_SIZE", 1000)
+TIER_CHUNK_SIZE = getattr(environment, "LOYALTY_TIER_CHUNK_SIZE", 50000)
+
+# Loyalty points needed for each tier. After changing them, run
+# recalculate_tiers.py to move existing members.
+TIER_THRESHOLDS = getattr(environment, "LOYALTY_TIER_THRESHOLDS", {
+    "BLUE": 0,         # Starting tier
+    "SILVER": 500,     # 500 points for Silver
+    "GOLD": 1000,      # 1,000 points for Gold
+    "PLATINUM": 2000,  # 2,000 points for Platinum
+})
+TIER_ORDER = sorted(TIER_THRESHOLDS, key=TIER_THRESHOLDS.get)  # Lowest first
+TIER_RANKS = {tier: rank for rank, tier in enumerate(TIER_ORDER)}
+
+TIER_MULTIPLIERS = {
+    "BLUE": 1.0,       # Base tier
+    "SILVER": 1.25,    # 25% bonus
+    "GOLD": 1.5,       # 50% bonus
+    "PLATINUM": 2.0,   # 100% bonus
+}
+SEAT_CLASS_MULTIPLIERS = {
+    "economy": 1.0,    # Base miles
+    "business": 1.5,   # Business class gets 50% bonus
+}
+MILES_PER_POINT = 10
+DEFAULT_FLIGHT_DISTANCE = 500  # For airports missing from data/airport_data.py
+
+
+def flight_distance(distance_miles: Optional[int], departure_airport: str, arrival_airport: str) -> int:
+    """A flight's stored distance, or the route table's for older rows without one"""
+    if distance_miles:
+        return distance_miles
+    distance = route_distance(departure_airport, arrival_airport)
+    return DEFAULT_FLIGHT_DISTANCE if distance is None else distance
+
+
+def tier_for_points(points: int) -> str:
+    return next(tier for tier in reversed(TIER_ORDER) if (points or 0) >= TIER_THRESHOLDS[tier])
+
+
+def tier_case(points_column):
+    """SQL CASE giving the tier for a points column, highest tier first"""
+    return case(
+        *[(func.coalesce(points_column, 0) >= TIER_THRESHOLDS[tier], tier) for tier in reversed(TIER_ORDER[1:])],
+        else_=TIER_ORDER[0],
+    )
+
+
+def next_tier_threshold(tier: str) -> Optional[int]:
+    """Points needed for the tier above, or None at the top tier"""
+    position = TIER_ORDER.index(tier)
+    return TIER_THRESHOLDS[TIER_ORDER[position + 1]] if position < len(TIER_ORDER) - 1 else None
+
+
+# NumPy is imported inside the functions that use it: it adds a noticeable
+# amount to the API's startup time and is only needed once bookings accrue.
+
+def multipliers(values: list, table: dict) -> "numpy.ndarray":
+    """Look up every value in `table` (1.0 if missing) with one lookup per distinct value"""
+    import numpy as np
+    keys, positions = np.unique(np.array(values, dtype=str), return_inverse=True)
+    return np.array([table.get(key, 1.0) for key in keys], dtype=np.float64)[positions.reshape(-1)]
+
+
+def earned_miles(distances: list, seat_classes: list, tiers: list) -> "numpy.ndarray":
+    """Miles earned per booking, truncated to whole miles"""
+    import numpy as np
+    distance = np.asarray(distances, dtype=np.float64)
+    return (distance * multipliers(seat_classes, SEAT_CLASS_MULTIPLIERS) * multipliers(tiers, TIER_MULTIPLIERS)).astype(np.int64)
+
+
+# =============================================================================
+# ACCRUAL - Award miles for a set of checked-in bookings
+# =============================================================================
+
+@dataclass
+class Accrual:
+    booking_id: int
+    user_id: int
+    flight_distance: int
+    miles: int
+    points: int
+    loyalty_tier: str
+
+
+@dataclass
+class AccrualBatch:
+    accruals: list = field(default_factory=list)      # Bookings that earned miles in this batch
+    tier_changes: list = field(default_factory=list)  # {"user_id", "old_tier", "new_tier", "total_points"}
+    selected: int = 0                                 # Bookings read, including ones accrued in parallel
+
+    @property
+    def user_ids(self) -> set:
+        return {accrual.user_id for accrual in self.accruals}
+
+
+@dataclass
+class AccrualReport:
+    bookings: int = 0
+    miles: int = 0
+    points: int = 0
+    user_ids: set = field(default_factory=set)
+    tier_changes: list = field(default_factory=list)
+
+    def add(self, batch: AccrualBatch) -> None:
+        self.bookings += len(batch.accruals)
+        self.miles += sum(accrual.miles for accrual in batch.accruals)
+        self.points += sum(accrual.points for accrual in batch.accruals)
+        self.user_ids |= batch.user_ids
+        self.tier_changes.extend(batch.tier_changes)
+
+    def as_dict(self) -> dict:
+        return {
+            "bookings": self.bookings,
+            "miles": self.miles,
+            "points": self.points,
+            "users": len(self.user_ids),
+            "tier_changes": self.tier_changes,
+        }
+
+
+def insert_ignoring_duplicates(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Loyalty accrual does not support {dialect_name} databases")
+    table = LoyaltyAccrualModel.__table__
+    return insert(table).on_conflict_do_nothing(index_elements=[table.c.booking_id]).returning(table.c.booking_id)
+
+
+def accrue(db: Session, *conditions, limit: Optional[int] = None) -> AccrualBatch:
+    """Award miles for checked-in bookings matching `conditions` that haven't earned yet.
+    Runs in the session's transaction, the caller commits."""
+    import numpy as np
+    batch = AccrualBatch()
+    query = (
+        select(
+            BookingModel.id, BookingModel.user_id, func.coalesce(BookingModel.seat_class, ""),
+            FlightModel.distance_miles, FlightModel.departure_airport, FlightModel.arrival_airport,
+            func.coalesce(UserModel.loyalty_tier, TIER_ORDER[0]),
+        )
+        .join(FlightModel, FlightModel.id == BookingModel.flight_id)
+        .join(UserModel, UserModel.id == BookingModel.user_id)
+        .outerjoin(LoyaltyAccrualModel, LoyaltyAccrualModel.booking_id == BookingModel.id)
+        .where(BookingModel.booking_status == "checked_in", LoyaltyAccrualModel.id.is_(None), *conditions)
+        .order_by(BookingModel.id)
+        .limit(limit)
+    )
+    rows = db.execute(query).all()
+    batch.selected = len(rows)
+    if not rows:
+        return batch
+
+    booking_ids, user_ids, seat_classes, stored_distances, departures, arrivals, tiers = zip(*rows)
+    distances = [flight_distance(*route) for route in zip(stored_distances, departures, arrivals)]
+    miles = earned_miles(distances, seat_classes, tiers)
+    points = miles // MILES_PER_POINT
+
+    # Claim the bookings. Ones another run got to first come back missing.
+    claimed = set(db.execute(insert_ignoring_duplicates(db.get_bind().dialect.name), [
+        {"booking_id": booking_id, "user_id": user_id, "flight_distance": distance,
+         "miles": int(earned), "points": int(earned_points), "loyalty_tier": tier}
+        for booking_id, user_id, distance, earned, earned_points, tier
+        in zip(booking_ids, user_ids, distances, miles, points, tiers)
+    ]).scalars())
+    if not claimed:
+        return batch
+    batch.accruals = [
+        Accrual(*values) for values in zip(booking_ids, user_ids, distances, miles.tolist(), points.tolist(), tiers)
+        if values[0] in claimed
+    ]
+
+    # Each user's totals for this batch
+    keep = np.isin(np.array(booking_ids), list(claimed))
+    users, positions = np.unique(np.array(user_ids)[keep], return_inverse=True)
+    user_miles = np.zeros(len(users), dtype=np.int64)
+    user_points = np.zeros(len(users), dtype=np.int64)
+    np.add.at(user_miles, positions.reshape(-1), miles[keep])
+    np.add.at(user_points, positions.reshape(-1), points[keep])
+
+    table = UserModel.__table__
+    db.execute(
+        update(table)
+        .where(table.c.id == bindparam("accrual_user_id"))
+        .values(
+            loyalty_miles=func.coalesce(table.c.loyalty_miles, 0) + bindparam("accrual_miles"),
+            loyalty_points=func.coalesce(table.c.loyalty_points, 0) + bindparam("accrual_points"),
+        ),
+        [
+            {"accrual_user_id": user_id, "accrual_miles": user_miles_total, "accrual_points": user_points_total}
+            for user_id, user_miles_total, user_points_total
+            in zip(users.tolist(), user_miles.tolist(), user_points.tolist())
+        ],
+    )
+
+    # Tier changes, only for the users whose tier is now different
+    new_tier = tier_case(table.c.loyalty_points)
+    old_tiers = dict(zip(user_ids, tiers))
+    changed = db.execute(
+        update(table)
+        .where(table.c.id.in_(users.tolist()), table.c.loyalty_tier.is_distinct_from(new_tier))
+        .values(loyalty_tier=new_tier)
+        .returning(table.c.id, table.c.loyalty_tier, table.c.loyalty_points)
+    ).all()
+    batch.tier_changes = [
+        {"user_id": user_id, "old_tier": old_tiers[user_id], "new_tier": tier, "total_points": total_points}
+        for user_id, tier, total_points in sorted(changed)
+    ]
+    record_tier_changes(db, batch.tier_changes, "accrual")
+    return batch
+
+
+def accrue_bookings(db: Session, booking_ids: list) -> AccrualBatch:
+    """Award miles for specific bookings (check-in). The caller commits."""
+    return accrue(db, BookingModel.id.in_(booking_ids))
+
+
+def accrue_pending(db: Session, flight_ids: Optional[list] = None, departed_before: Optional[datetime] = None,
+                   chunk_size: int = ACCRUAL_CHUNK_SIZE, progress=None) -> AccrualReport:
+    """Award miles for every checked-in booking still waiting for them, one committed chunk at a time"""
+    conditions = []
+    if flight_ids is not None:
+        conditions.append(BookingModel.flight_id.in_(flight_ids))
+    if departed_before is not None:
+        conditions.append(FlightModel.departure_time <= departed_before)
+    report = AccrualReport()
+    while True:
+        batch = accrue(db, *conditions, limit=chunk_size)
+        db.commit()
+        if not batch.selected:
+            return report
+        report.add(batch)
+        progress and progress(report)
+
+
+# =============================================================================
+# TIER RECALCULATION - Every member on the tier their points earn
+# =============================================================================
+
+@dataclass
+class TierReport:
+    users: int = 0
+    upgrades: int = 0
+    downgrades: int = 0
+    changes: Counter = field(default_factory=Counter)  # "GOLD -> SILVER": members
+
+    def add(self, old_tier: Optional[str], new_tier: str) -> None:
+        if TIER_RANKS[new_tier] > TIER_RANKS.get(old_tier, -1):
+            self.upgrades += 1
+        else:
+            self.downgrades += 1
+        self.changes[f"{old_tier} -> {new_tier}"] += 1
+
+    def as_dict(self) -> dict:
+        return {
+            "users": self.users,
+            "upgrades": self.upgrades,
+            "downgrades": self.downgrades,
+            "changes": dict(sorted(self.changes.items())),
+        }
+
+
+def record_tier_changes(connection, changes: list, reason: str) -> None:
+    """Log tier moves ({"user_id", "old_tier", "new_tier", "total_points"}) in tier_changes"""
+    if changes:
+        connection.execute(TierChangeModel.__table__.insert(), [dict(change, reason=reason) for change in changes])
+
+
+def recalculate_chunk(connection: Connection, *conditions, dry_run: bool = False) -> list:
+    """Move the users matching `conditions` whose tier is out of date. Returns the moves."""
+    table = UserModel.__table__
+    current_tier = func.coalesce(table.c.loyalty_tier, TIER_ORDER[0])
+    new_tier = tier_case(table.c.loyalty_points)
+    out_of_date = [*conditions, current_tier != new_tier]
+    pending = connection.execute(
+        select(table.c.id, current_tier, new_tier, table.c.loyalty_points).where(*out_of_date).with_for_update()
+    ).all()
+    old_tiers = {user_id: old_tier for user_id, old_tier, _, _ in pending}
+    if dry_run:
+        moved = [(user_id, tier, total_points) for user_id, _, tier, total_points in pending]
+    else:
+        # The UPDATE checks the tier again itself, so a member moved in between
+        # (by a check-in) isn't moved or logged twice
+        moved = connection.execute(
+            update(table).where(*out_of_date).values(loyalty_tier=new_tier)
+            .returning(table.c.id, table.c.loyalty_tier, table.c.loyalty_points)
+        ).all()
+    changes = [
+        {"user_id": user_id, "old_tier": old_tiers.get(user_id), "new_tier": tier, "total_points": total_points}
+        for user_id, tier, total_points in sorted(moved)
+    ]
+    if not dry_run:
+        record_tier_changes(connection, changes, "recalculation")
+    return changes
+
+
+def recalculate_tiers(engine: Engine, chunk_size: Optional[int] = TIER_CHUNK_SIZE, dry_run: bool = False,
+                      progress=None) -> TierReport:
+    """Put every member on the tier their points earn, one user ID range per transaction
+    (chunk_size=None does the whole table in one UPDATE)"""
+    table = UserModel.__table__
+    report = TierReport()
+    with engine.connect() as connection:
+        report.users, first_id, last_id = connection.execute(
+            select(func.count(), func.min(table.c.id), func.max(table.c.id))
+        ).one()
+    if not report.users:
+        return report
+
+    step = chunk_size or last_id - first_id + 1
+    for start in range(first_id, last_id + 1, step):
+        with engine.begin() as connection:
+            changes = recalculate_chunk(connection, table.c.id >= start, table.c.id < start + step, dry_run=dry_run)
+        for change in changes:
+            report.add(change["old_tier"], change["new_tier"])
+        progress and progress(report)
+    return report
@@ -0,0 +1,142 @@
+# =============================================================================
+# PASSWORD POOL - Runs bcrypt on a dedicated pool of worker processes
+# =============================================================================
+# bcrypt is deliberately slow and CPU bound. Running it in FastAPI's default
+# threadpool means a burst of logins can use up every thread and stall
+# unrelated requests like flight search. This module hashes and verifies
+# passwords on a separate, bounded process pool instead. The auth endpoints
+# are async and await the result on the event loop, so a login waiting for
+# bcrypt doesn't hold a threadpool thread either.
+#
+# Each register/login request takes one of PASSWORD_POOL_MAX_PENDING slots
+# before it does anything (dependencies/password_slot.py) and keeps it until
+# it is done, user lookup and save included. So a login storm has at most
+# that many requests hashing or on the threadpool, and the ones over it are
+# rejected straight away (HTTP 503) rather than queueing up.
+#
+# Optional settings in config/environment.py:
+#   BCRYPT_ROUNDS             - bcrypt cost factor (default 12). Existing hashes
+#                               with a different cost are re-hashed on next login.
+#   PASSWORD_POOL_WORKERS     - worker processes (default: one per CPU core)
+#   PASSWORD_POOL_MAX_PENDING - register/login requests in progress at once
+#                               (default PENDING_PER_WORKER per worker)
+
+import asyncio
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+
+from config import environment
+
+BCRYPT_ROUNDS = getattr(environment, "BCRYPT_ROUNDS", 12)
+PASSWORD_POOL_WORKERS = getattr(environment, "PASSWORD_POOL_WORKERS", os.cpu_count() or 1)
+# At the default cost a worker verifies about 4 passwords a second, so a full
+# queue is at most ~4 seconds of waiting, better for a login burst than a 503
+PENDING_PER_WORKER = 16
+PASSWORD_POOL_MAX_PENDING = getattr(environment, "PASSWORD_POOL_MAX_PENDING", PASSWORD_POOL_WORKERS * PENDING_PER_WORKER)
+
+_pwd_context = None
+_pwd_context_lock = threading.Lock()
+
+
+def get_pwd_context():
+    """The bcrypt CryptContext, built on first use.
+
+    passlib is slow to import and the API process never hashes a password
+    itself (the worker processes do), so it isn't loaded at startup. Pinning
+    min/max rounds to the configured cost makes passlib flag any hash with
+    another cost for update.
+    """
+    global _pwd_context
+    with _pwd_context_lock:
+        if _pwd_context is None:
+            from passlib.context import CryptContext
+            _pwd_context = CryptContext(
+                schemes=["bcrypt"],
+                deprecated="auto",
+                bcrypt__default_rounds=BCRYPT_ROUNDS,
+                bcrypt__min_rounds=BCRYPT_ROUNDS,
+                bcrypt__max_rounds=BCRYPT_ROUNDS,
+            )
+        return _pwd_context
+
+
+# These run inside the worker processes, so they must be plain module-level functions
+def hash_password(password: str) -> str:
+    return get_pwd_context().hash(password)
+
+
+def verify_and_update(password: str, password_hash: str) -> tuple:
+    """Returns (is_valid, new_hash). new_hash is only set when the stored hash needs upgrading."""
+    if not password_hash:
+        return False, None
+    return get_pwd_context().verify_and_update(password, password_hash)
+
+
+class PasswordPool:
+    """Bounded process pool for bcrypt work"""
+
+    def __init__(self, workers: int, max_pending: int):
+        self.workers = workers
+        self.max_pending = max_pending
+        self.in_flight = 0
+        self.rejected = 0
+        self._slots = threading.BoundedSemaphore(max_pending)
+        self._lock = threading.Lock()
+        self._executor = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        # Started on first use so importing the app doesn't spawn processes.
+        # "spawn" avoids forking a process that already has server threads running.
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                )
+            return self._executor
+
+    def acquire(self) -> bool:
+        """Take a slot for one auth request. False (counted as rejected) when all max_pending are taken."""
+        if not self._slots.acquire(blocking=False):
+            with self._lock:
+                self.rejected += 1
+            return False
+        with self._lock:
+            self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        with self._lock:
+            self.in_flight -= 1
+        self._slots.release()
+
+    # hash() and verify_and_update() are called while holding a slot
+    async def _run(self, fn, *args):
+        # Wait on the event loop, not on a thread
+        return await asyncio.wrap_future(self._get_executor().submit(fn, *args))
+
+    async def hash(self, password: str) -> str:
+        return await self._run(hash_password, password)
+
+    async def verify_and_update(self, password: str, password_hash: str) -> tuple:
+        return await self._run(verify_and_update, password, password_hash)
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.workers,
+            "max_pending": self.max_pending,
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=False, cancel_futures=True)
+                self._executor = None
+
+
+# Shared instance used by the auth endpoints
+password_pool = PasswordPool(PASSWORD_POOL_WORKERS, PASSWORD_POOL_MAX_PENDING)
@@ -0,0 +1,237 @@
+# =============================================================================
+# READ REPLICAS - Reads from replicas, writes and fresh reads from the primary
+# =============================================================================
+# With replica_db_URIs set (see database.py), endpoints that take get_read_db
+# (dependencies/read_db.py) read from a replica, taking turns between the
+# healthy ones. Writes, and every endpoint that takes get_db, use the primary.
+# A get_read_db read still goes to the primary when:
+#   - the caller committed a change in the last READ_YOUR_WRITES_SECONDS, so a
+#     customer who has just booked sees the booking in their next GET
+#   - no replica is within REPLICA_MAX_LAG_SECONDS of the primary (or reachable)
+#
+# Lag is measured with a heartbeat. Every REPLICA_CHECK_SECONDS a background
+# thread (started with the app, see main.py) writes the current time into the
+# "replication_heartbeat" row of the sequences table on the primary, and reads
+# each replica's copy of that row back. How old the replica's copy is gives its
+# lag. That can overstate the lag by up to REPLICA_CHECK_SECONDS, but never
+# understates it. Requests only look at what the last check found, and if the
+# checks fall behind (a check still running after two intervals, or the thread
+# not started) every read goes to the primary until they catch up.
+#
+# Recent writers are remembered per worker process, like the other caches, so
+# with several workers READ_YOUR_WRITES_SECONDS only covers reads that reach
+# the same worker as the write.
+#
+# Optional settings in config/environment.py:
+#   REPLICA_MAX_LAG_SECONDS    - replicas further behind are skipped (default 5)
+#   REPLICA_CHECK_SECONDS      - how often the lag is measured (default 1)
+#   READ_YOUR_WRITES_SECONDS   - reads go to the primary this long after the
+#                                caller writes (default max lag + 2 check intervals)
+
+import itertools
+import logging
+import threading
+import time
+
+from sqlalchemy import create_engine, event, select, update
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import NullPool
+from config import environment
+from database import engine, replica_engines, SessionLocal
+from models.sequence import SequenceModel
+from services.cache import TTLCache, MISSING
+
+logger = logging.getLogger("gulf_air.replicas")
+
+REPLICA_MAX_LAG_SECONDS = getattr(environment, "REPLICA_MAX_LAG_SECONDS", 5)
+REPLICA_CHECK_SECONDS = getattr(environment, "REPLICA_CHECK_SECONDS", 1)
+READ_YOUR_WRITES_SECONDS = getattr(environment, "READ_YOUR_WRITES_SECONDS", REPLICA_MAX_LAG_SECONDS + 2 * REPLICA_CHECK_SECONDS)
+RECENT_WRITERS_SIZE = 100000
+HEARTBEAT_NAME = "replication_heartbeat"  # Row in the sequences table, next_value is epoch milliseconds
+
+
+class Replica:
+    """One replica engine and what the last check found"""
+
+    __slots__ = ("name", "engine", "healthy", "lag_seconds", "error", "reads")
+
+    def __init__(self, name: str, engine: Engine):
+        self.name = name
+        self.engine = engine
+        self.healthy = False  # Until the first check
+        self.lag_seconds = None
+        self.error = None
+        self.reads = 0
+
+    def as_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "healthy": self.healthy,
+            "lag_seconds": None if self.lag_seconds is None else round(self.lag_seconds, 3),
+            "error": self.error,
+            "reads": self.reads,
+        }
+
+
+class ReplicaRouter:
+    """Picks the engine a read-only session should use"""
+
+    def __init__(self, primary: Engine, replicas: dict, max_lag_seconds: float = REPLICA_MAX_LAG_SECONDS,
+                 check_seconds: float = REPLICA_CHECK_SECONDS, read_your_writes_seconds: float = READ_YOUR_WRITES_SECONDS):
+        self.primary = primary
+        self.replicas = [Replica(name, replica) for name, replica in replicas.items()]
+        self.max_lag_seconds = max_lag_seconds
+        self.check_seconds = check_seconds
+        self.recent_writers = TTLCache(maxsize=RECENT_WRITERS_SIZE, ttl_seconds=read_your_writes_seconds)  # user ID -> True
+        self.sticky_reads = 0  # Sent to the primary because the caller wrote recently
+        self.fallback_reads = 0  # Sent to the primary because no replica was healthy
+        self.checks = 0
+        self._turn = itertools.count()
+        self._checked_at = None  # time.monotonic() when the last finished check started
+        self._heartbeat_engine = None
+        self._thread = None
+        self._stop = threading.Event()
+
+    @property
+    def max_stale_seconds(self) -> float:
+        """How far behind the primary a replica read can be.
+
+        A replica is used while its lag at the last check was under
+        max_lag_seconds and that check started under 2 check intervals ago.
+        """
+        return self.max_lag_seconds + 2 * self.check_seconds
+
+    def engine_for(self, user_id: int = None) -> Engine:
+        """Engine for a read by this user (None for anonymous reads)"""
+        if not self.replicas:
+            return self.primary
+        if user_id is not None and self.recent_writers.get(user_id) is not MISSING:
+            self.sticky_reads += 1
+            return self.primary
+        checked_at = self._checked_at
+        if checked_at is None or time.monotonic() - checked_at > 2 * self.check_seconds:
+            healthy = []  # What the last check found is too old to rely on
+        else:
+            healthy = [replica for replica in self.replicas if replica.healthy]
+        if not healthy:
+            self.fallback_reads += 1
+            return self.primary
+        replica = healthy[next(self._turn) % len(healthy)]
+        replica.reads += 1
+        return replica.engine
+
+    def wrote(self, user_id: int) -> None:
+        """Send this user's reads to the primary for the next READ_YOUR_WRITES_SECONDS"""
+        self.recent_writers.set(user_id, True)
+
+    def start(self) -> None:
+        """Start checking the replicas in a background thread (no-op without replicas)"""
+        if not self.replicas or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="replica-heartbeat", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join(timeout=self.check_seconds + 5)
+        self._thread = None
+        if self._heartbeat_engine is not None:
+            self._heartbeat_engine.dispose()
+
+    def _run(self) -> None:
+        # Checks start every check_seconds, however long each one takes
+        next_check = time.monotonic()
+        while not self._stop.is_set():
+            try:
+                self.check()
+            except Exception:
+                logger.exception("Replica check failed")
+            next_check = max(next_check + self.check_seconds, time.monotonic())
+            self._stop.wait(next_check - time.monotonic())
+
+    def check(self) -> None:
+        """Write a new heartbeat on the primary and measure every replica's lag"""
+        started = time.monotonic()
+        self.checks += 1
+        now = time.time()
+        try:
+            self._beat(int(now * 1000))
+        except Exception as exc:
+            # The replicas' heartbeats only get older, so they are judged safely anyway
+            logger.warning("Could not write the replication heartbeat: %s", exc)
+
+        table = SequenceModel.__table__
+        for replica in self.replicas:
+            was_healthy = replica.healthy
+            try:
+                with replica.engine.connect() as connection:
+                    beat = connection.execute(select(table.c.next_value).where(table.c.name == HEARTBEAT_NAME)).scalar()
+                if beat is None:
+                    raise LookupError("No heartbeat has reached this replica yet")
+                replica.lag_seconds = max(0.0, now - beat / 1000)
+                replica.healthy = replica.lag_seconds <= self.max_lag_seconds
+                replica.error = None
+            except Exception as exc:
+                replica.healthy, replica.lag_seconds, replica.error = False, None, str(exc).split("\n", 1)[0] or type(exc).__name__
+            if was_healthy and not replica.healthy:
+                if replica.error:
+                    logger.warning("Replica %s skipped, reading from the primary: %s", replica.name, replica.error)
+                else:
+                    logger.warning("Replica %s is %.1fs behind, reading from the primary", replica.name, replica.lag_seconds)
+            elif replica.healthy and not was_healthy:
+                logger.info("Replica %s back in use (lag %.3fs)", replica.name, replica.lag_seconds)
+        self._checked_at = started
+
+    def _beat(self, value: int) -> None:
+        # On a short-lived connection of its own, like booking reference blocks,
+        # so the heartbeat never waits for (or takes) a request's pooled connection
+        if self._heartbeat_engine is None:
+            self._heartbeat_engine = create_engine(self.primary.url, poolclass=NullPool)
+        table = SequenceModel.__table__
+        with self._heartbeat_engine.begin() as connection:
+            updated = connection.execute(
+                update(table).where(table.c.name == HEARTBEAT_NAME).values(next_value=value)
+            ).rowcount
+            if not updated:
+                connection.execute(table.insert().values(name=HEARTBEAT_NAME, next_value=value))
+
+    def stats(self) -> dict:
+        return {
+            "replicas": [replica.as_dict() for replica in self.replicas],
+            "max_lag_seconds": self.max_lag_seconds,
+            "check_seconds": self.check_seconds,
+            "last_check_age_seconds": None if self._checked_at is None else round(time.monotonic() - self._checked_at, 3),
+            "read_your_writes_seconds": self.recent_writers.ttl_seconds,
+            "recent_writers": len(self.recent_writers),
+            "sticky_reads": self.sticky_reads,
+            "fallback_reads": self.fallback_reads,
+            "checks": self.checks,
+        }
+
+
+# Shared instance used by get_read_db
+replica_router = ReplicaRouter(engine, replica_engines)
+
+
+def stale_seconds(db) -> float:
+    """How far behind the primary this session's reads may be (0 unless it is on a replica)"""
+    if not replica_router.replicas:
+        return 0
+    # Compared with the replica engines rather than the primary, as sessions
+    # run for the DB_ASYNC endpoints are bound to the async engine's sync_engine
+    bind = db.get_bind()
+    if not any(bind is replica.engine for replica in replica_router.replicas):
+        return 0
+    return replica_router.max_stale_seconds
+
+
+# get_current_user puts the user's ID in session.info, so any commit made for
+# a signed-in user keeps their reads on the primary for a while
+@event.listens_for(SessionLocal, "after_commit")
+def remember_writer(session):
+    user_id = session.info.get("user_id")
+    if user_id is not None and replica_router.replicas:
+        replica_router.wrote(user_id)
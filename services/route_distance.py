@@ -0,0 +1,92 @@
+# =============================================================================
+# ROUTE DISTANCES - Miles between every pair of airports, computed once
+# =============================================================================
+# Check-in used to run the haversine formula (and rebuild a coordinate table)
+# for every request, and fell back to 500 miles for airports it didn't know.
+# Now the distance between every pair of airports in the airports table is
+# computed in one vectorized NumPy pass the first time it's needed. After that
+# a lookup is two dict reads and an array read, with no trig at all.
+#
+# The table is read again when a lookup asks for an airport the matrix doesn't
+# have (at most every AIRPORT_RELOAD_SECONDS), so airports added to it are
+# picked up without a restart. data/airport_data.py is only the seed data, used
+# while the table doesn't exist or is empty.
+#
+# New flights store their distance in flights.distance_miles, so check-in
+# normally doesn't even need the matrix.
+
+import threading
+import time
+from typing import Optional
+
+from sqlalchemy import select
+from sqlalchemy.exc import SQLAlchemyError
+from data.airport_data import AIRPORTS
+from database import engine
+from models.airport import AirportModel
+
+EARTH_RADIUS_MILES = 3959
+AIRPORT_RELOAD_SECONDS = 60
+
+
+def haversine_matrix(latitudes, longitudes) -> "numpy.ndarray":
+    """Great circle distance in whole miles between every pair of points"""
+    import numpy as np  # Only needed once per process, so not loaded at startup
+    lat = np.radians(np.asarray(latitudes, dtype=np.float64))
+    lon = np.radians(np.asarray(longitudes, dtype=np.float64))
+    dlat = lat[:, None] - lat[None, :]
+    dlon = lon[:, None] - lon[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlon / 2) ** 2
+    a = np.clip(a, 0.0, 1.0)  # Rounding can push it just past 1
+    return (2 * EARTH_RADIUS_MILES * np.arctan2(np.sqrt(a), np.sqrt(1 - a))).astype(np.int32)
+
+
+class RouteDistances:
+    def __init__(self, airports: list):
+        self.index = {airport["code"]: position for position, airport in enumerate(airports)}
+        self.matrix = haversine_matrix(
+            [airport["latitude"] for airport in airports],
+            [airport["longitude"] for airport in airports],
+        )
+
+    def miles(self, departure_airport: str, arrival_airport: str) -> Optional[int]:
+        """Distance in miles, or None if either airport isn't in the table"""
+        departure = self.index.get(departure_airport)
+        arrival = self.index.get(arrival_airport)
+        if departure is None or arrival is None:
+            return None
+        return int(self.matrix[departure, arrival])
+
+
+def load_airports() -> list:
+    """Every airport in the airports table, or the seed list if the table is missing or empty"""
+    table = AirportModel.__table__
+    try:
+        with engine.connect() as connection:
+            rows = connection.execute(select(table.c.code, table.c.latitude, table.c.longitude)).mappings().all()
+    except SQLAlchemyError:
+        rows = []  # Not migrated yet
+    return [dict(row) for row in rows] or AIRPORTS
+
+
+_route_distances = None
+_loaded_at = 0.0  # time.monotonic() of the last load
+_route_distances_lock = threading.Lock()
+
+
+def get_route_distances(reload: bool = False) -> RouteDistances:
+    """The shared matrix. reload=True reads the table again, unless it was read in the last AIRPORT_RELOAD_SECONDS."""
+    global _route_distances, _loaded_at
+    with _route_distances_lock:
+        if _route_distances is None or (reload and time.monotonic() - _loaded_at >= AIRPORT_RELOAD_SECONDS):
+            _route_distances = RouteDistances(load_airports())
+            _loaded_at = time.monotonic()
+        return _route_distances
+
+
+def route_distance(departure_airport: str, arrival_airport: str) -> Optional[int]:
+    """Miles between two airports, or None if either is unknown"""
+    distances = get_route_distances()
+    if departure_airport not in distances.index or arrival_airport not in distances.index:
+        distances = get_route_distances(reload=True)  # Maybe added to the table since
+    return distances.miles(departure_airport, arrival_airport)
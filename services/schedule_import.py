@@ -0,0 +1,225 @@
+# =============================================================================
+# SCHEDULE IMPORT - Load a season's flights from a CSV or NDJSON file
+# =============================================================================
+# Reads the file one row at a time, so memory use doesn't grow with its size:
+#   1. Rows are collected into chunks of IMPORT_CHUNK_SIZE.
+#   2. Each chunk is validated with the FlightCreate schema. Bad rows are
+#      reported with their line number and skipped, the rest carry on.
+#   3. Each chunk is upserted on flight_number with one executemany (or COPY
+#      into a staging table on Postgres) and committed on its own.
+#
+# Existing flights get their schedule, aircraft, prices and status updated.
+# Their seat counters are left alone, because bookings have already been
+# taken from them.
+#
+# Optional setting in config/environment.py:
+#   SCHEDULE_IMPORT_CHUNK_SIZE - rows per executemany/commit (default 1000)
+
+import csv
+import io
+import json
+from dataclasses import dataclass, field
+from typing import Iterator, List, Optional, Tuple
+
+from pydantic import TypeAdapter, ValidationError
+from sqlalchemy import select
+from sqlalchemy.engine import Connection, Engine
+from sqlalchemy.exc import SQLAlchemyError
+from models.aircraft import AircraftModel
+from models.flight import FlightModel
+from serializers.flight import FlightCreate
+from services.route_distance import route_distance
+from config import environment
+
+IMPORT_CHUNK_SIZE = getattr(environment, "SCHEDULE_IMPORT_CHUNK_SIZE", 1000)
+MAX_REPORTED_ERRORS = 1000  # Keeps the report small for a badly broken file
+FORMATS = ("csv", "ndjson")
+
+IMPORT_COLUMNS = list(FlightCreate.model_fields) + ["distance_miles"]  # Distance is filled in from the route
+# Seat counters are only set when a flight is created, never by an update
+UPDATE_COLUMNS = [name for name in IMPORT_COLUMNS if not name.startswith("available_")]
+
+flight_batch_adapter = TypeAdapter(List[FlightCreate])
+
+
+@dataclass
+class ImportReport:
+    rows: int = 0
+    created: int = 0
+    updated: int = 0
+    failed: int = 0
+    errors: list = field(default_factory=list)
+
+    def add_error(self, line: int, message: str, flight_number: Optional[str] = None) -> None:
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"line": line, "flight_number": flight_number, "error": message})
+
+    def as_dict(self) -> dict:
+        return {
+            "rows": self.rows,
+            "created": self.created,
+            "updated": self.updated,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+# =============================================================================
+# READING - Turn the file into (line number, row dict) pairs
+# =============================================================================
+
+def read_csv(text: io.TextIOBase) -> Iterator[Tuple[int, object]]:
+    reader = csv.DictReader(text)
+    for row in reader:
+        # Empty cells mean "not given", so schema defaults (like status) apply
+        yield reader.line_num, {key.strip(): value for key, value in row.items() if key and value not in ("", None)}
+
+
+def read_ndjson(text: io.TextIOBase) -> Iterator[Tuple[int, object]]:
+    for line_number, line in enumerate(text, start=1):
+        if not line.strip():
+            continue
+        try:
+            yield line_number, json.loads(line)
+        except ValueError as e:
+            yield line_number, e  # Reported as a row error by the caller
+
+
+def read_rows(stream, file_format: str) -> Iterator[Tuple[int, object]]:
+    """Rows from a binary file object, decoded as UTF-8 (a BOM is allowed)"""
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown import format {file_format!r}, expected one of {', '.join(FORMATS)}")
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    return read_csv(text) if file_format == "csv" else read_ndjson(text)
+
+
+# =============================================================================
+# VALIDATING - One schema call per chunk, row by row only if it has errors
+# =============================================================================
+
+def validate_chunk(chunk: list, aircraft_ids: set, report: ImportReport) -> list:
+    """The valid rows of a chunk as (line number, column dict) pairs"""
+    try:
+        flights = flight_batch_adapter.validate_python([row for _, row in chunk])
+        candidates = list(zip((line for line, _ in chunk), flights))
+    except ValidationError:
+        candidates = []
+        for line, row in chunk:
+            try:
+                candidates.append((line, FlightCreate.model_validate(row)))
+            except ValidationError as e:
+                flight_number = row.get("flight_number") if isinstance(row, dict) else None
+                report.add_error(line, format_validation_error(e), flight_number)
+
+    valid = {}
+    for line, flight in candidates:
+        if flight.aircraft_id not in aircraft_ids:
+            report.add_error(line, f"Unknown aircraft_id {flight.aircraft_id}", flight.flight_number)
+        elif flight.arrival_time <= flight.departure_time:
+            report.add_error(line, "arrival_time must be after departure_time", flight.flight_number)
+        else:
+            # A flight number repeated in one chunk: the last row wins, as it would across chunks
+            row = flight.model_dump()
+            row["distance_miles"] = route_distance(flight.departure_airport, flight.arrival_airport)
+            valid[flight.flight_number] = (line, row)
+    return list(valid.values())
+
+
+def format_validation_error(error: ValidationError) -> str:
+    return "; ".join(
+        f"{'.'.join(str(part) for part in item['loc']) or 'row'}: {item['msg']}" for item in error.errors()
+    )
+
+
+# =============================================================================
+# WRITING - Upsert one chunk in its own transaction
+# =============================================================================
+
+def upsert_statement(dialect_name: str):
+    if dialect_name == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert
+    elif dialect_name == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert
+    else:
+        raise RuntimeError(f"Schedule import does not support {dialect_name} databases")
+    table = FlightModel.__table__
+    statement = insert(table)
+    return statement.on_conflict_do_update(
+        index_elements=[table.c.flight_number],
+        set_={name: statement.excluded[name] for name in UPDATE_COLUMNS},
+    )
+
+
+def copy_chunk(connection: Connection, rows: list) -> None:
+    """Postgres: COPY the chunk into a temporary table, then upsert it with one INSERT ... SELECT"""
+    columns = ", ".join(IMPORT_COLUMNS)
+    updates = ", ".join(f"{name} = EXCLUDED.{name}" for name in UPDATE_COLUMNS)
+    connection.exec_driver_sql(
+        f"CREATE TEMP TABLE IF NOT EXISTS flights_import ON COMMIT DELETE ROWS "
+        f"AS SELECT {columns} FROM flights WITH NO DATA"
+    )
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    for row in rows:
+        writer.writerow(row[name] for name in IMPORT_COLUMNS)
+    buffer.seek(0)
+    cursor = connection.connection.dbapi_connection.cursor()  # psycopg2 cursor on the same transaction
+    try:
+        cursor.copy_expert(f"COPY flights_import ({columns}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+    connection.exec_driver_sql(
+        f"INSERT INTO flights ({columns}) SELECT {columns} FROM flights_import "
+        f"ON CONFLICT (flight_number) DO UPDATE SET {updates}"
+    )
+
+
+def write_chunk(engine: Engine, rows: list, report: ImportReport) -> None:
+    flight_numbers = [row["flight_number"] for row in rows]
+    with engine.begin() as connection:
+        existing = set(connection.execute(
+            select(FlightModel.flight_number).where(FlightModel.flight_number.in_(flight_numbers))
+        ).scalars())
+        if engine.dialect.name == "postgresql":
+            copy_chunk(connection, rows)
+        else:
+            connection.execute(upsert_statement(engine.dialect.name), rows)  # executemany
+    report.updated += len(existing)
+    report.created += len(rows) - len(existing)
+
+
+def import_schedule(engine: Engine, stream, file_format: str, chunk_size: int = IMPORT_CHUNK_SIZE) -> ImportReport:
+    """Import flights from a binary file object. Bad rows are reported, not fatal."""
+    report = ImportReport()
+    with engine.connect() as connection:
+        aircraft_ids = set(connection.execute(select(AircraftModel.id)).scalars())
+
+    def flush(chunk: list) -> None:
+        valid = validate_chunk(chunk, aircraft_ids, report)
+        if not valid:
+            return
+        try:
+            write_chunk(engine, [row for _, row in valid], report)
+        except (SQLAlchemyError, engine.dialect.loaded_dbapi.Error) as e:
+            # The chunk's transaction rolled back, so none of its rows were saved
+            for line, row in valid:
+                report.add_error(line, f"Not saved, the chunk failed: {e.__class__.__name__}", row["flight_number"])
+
+    chunk = []
+    for line, row in read_rows(stream, file_format):
+        report.rows += 1
+        if isinstance(row, Exception):
+            report.add_error(line, f"Invalid JSON: {row}")
+            continue
+        if not isinstance(row, dict):
+            report.add_error(line, "Each row must be a JSON object")
+            continue
+        chunk.append((line, row))
+        if len(chunk) >= chunk_size:
+            flush(chunk)
+            chunk = []
+    if chunk:
+        flush(chunk)
+    return report
@@ -0,0 +1,183 @@
+# =============================================================================
+# SEAT HOLDS - Short-lived holds on seats during checkout
+# =============================================================================
+# A customer picks a seat on the seat map, then fills in passenger details
+# before POST /api/bookings. Without a hold, someone else can book the seat in
+# between and the first customer only finds out when their booking fails.
+#
+# A hold reserves one seat for one user for SEAT_HOLD_TTL_SECONDS:
+#   - other users can't hold or book it while the hold is live
+#   - booking the seat turns the hold into the booking (the hold is released
+#     once the booking commits)
+#   - holds that are never booked expire on their own
+#
+# Holds live in process memory. Expiry uses a hashed timer wheel: each hold is
+# dropped into the slot for the tick it expires in, and every call sweeps only
+# the slots whose tick has passed, so expiring holds costs nothing per request
+# however many are live. Like the seat map, holds are only a fast path: the
+# uq_bookings_live_seat index still guarantees a seat is never sold twice, and
+# with several worker processes each worker only sees its own holds.
+#
+# Optional settings in config/environment.py:
+#   SEAT_HOLD_TTL_SECONDS      - how long a hold lasts (default 300)
+#   SEAT_HOLD_MAX_PER_FLIGHT   - seats one user can hold on one flight (default 9)
+
+import math
+import threading
+import time
+from dataclasses import dataclass
+
+from config import environment
+from serializers.booking import MAX_GROUP_PASSENGERS
+
+SEAT_HOLD_TTL_SECONDS = getattr(environment, "SEAT_HOLD_TTL_SECONDS", 300)
+SEAT_HOLD_MAX_PER_FLIGHT = getattr(environment, "SEAT_HOLD_MAX_PER_FLIGHT", MAX_GROUP_PASSENGERS)
+SEAT_HOLD_TICK_SECONDS = 1
+
+
+@dataclass
+class SeatHold:
+    flight_id: int
+    seat_number: str
+    user_id: int
+    expires_at: float  # time.monotonic()
+
+    def as_dict(self) -> dict:
+        return {
+            "flight_id": self.flight_id,
+            "seat_number": self.seat_number,
+            "expires_in_seconds": max(0, round(self.expires_at - time.monotonic(), 1)),
+        }
+
+
+class TimerWheel:
+    """Hashed timer wheel: keys are filed under the tick they expire in.
+
+    A key that expires more than one turn of the wheel ahead comes back from
+    advance() early; callers check the real expiry time and schedule it again.
+    """
+
+    def __init__(self, tick_seconds: float, slots: int):
+        self.tick_seconds = tick_seconds
+        self._slots = [set() for _ in range(slots)]
+        self._tick = math.floor(time.monotonic() / tick_seconds)  # Last tick swept
+
+    def schedule(self, key, expires_at: float) -> None:
+        tick = max(math.ceil(expires_at / self.tick_seconds), self._tick + 1)
+        self._slots[tick % len(self._slots)].add(key)
+
+    def advance(self, now: float) -> list:
+        """Every key filed under a tick that has passed since the last call"""
+        target = math.floor(now / self.tick_seconds)
+        due = []
+        for tick in range(self._tick + 1, min(target, self._tick + len(self._slots)) + 1):
+            slot = self._slots[tick % len(self._slots)]
+            if slot:
+                due.extend(slot)
+                slot.clear()
+        self._tick = max(self._tick, target)
+        return due
+
+
+class SeatHoldStore:
+    """Process-wide seat holds keyed by flight ID and seat number"""
+
+    def __init__(self, ttl_seconds: float = SEAT_HOLD_TTL_SECONDS, max_per_flight: int = SEAT_HOLD_MAX_PER_FLIGHT):
+        self.ttl_seconds = ttl_seconds
+        self.max_per_flight = max_per_flight
+        self.expired = 0
+        self.converted = 0
+        self._holds = {}  # flight_id -> {seat_number: SeatHold}
+        self._wheel = TimerWheel(SEAT_HOLD_TICK_SECONDS, math.ceil(ttl_seconds / SEAT_HOLD_TICK_SECONDS) + 1)
+        self._lock = threading.Lock()
+
+    def _expire(self, now: float) -> None:
+        # Called with the lock held
+        for flight_id, seat_number in self._wheel.advance(now):
+            seats = self._holds.get(flight_id)
+            hold = seats and seats.get(seat_number)
+            if hold is None:
+                continue  # Released or booked already
+            if hold.expires_at > now:
+                self._wheel.schedule((flight_id, seat_number), hold.expires_at)  # Renewed since
+                continue
+            del seats[seat_number]
+            if not seats:
+                del self._holds[flight_id]
+            self.expired += 1
+
+    def claim(self, user_id: int, seats: list) -> list:
+        """Hold every (flight_id, seat_number) in `seats` for the user, all or nothing.
+
+        Seats the user already holds get a fresh TTL. Returns the seats held by
+        someone else (nothing is held then), or [] on success.
+        """
+        with self._lock:
+            return self._claim(user_id, seats, time.monotonic())
+
+    def _claim(self, user_id: int, seats: list, now: float) -> list:
+        # Called with the lock held
+        self._expire(now)
+        conflicts = []
+        for flight_id, seat_number in seats:
+            hold = self._holds.get(flight_id, {}).get(seat_number)
+            if hold is not None and hold.user_id != user_id:
+                conflicts.append((flight_id, seat_number))
+        if conflicts:
+            return conflicts
+        expires_at = now + self.ttl_seconds
+        for flight_id, seat_number in seats:
+            self._holds.setdefault(flight_id, {})[seat_number] = SeatHold(flight_id, seat_number, user_id, expires_at)
+            self._wheel.schedule((flight_id, seat_number), expires_at)
+        return []
+
+    def hold(self, flight_id: int, seat_number: str, user_id: int):
+        """Hold one seat for the user. Returns the SeatHold, or None if someone else holds it."""
+        with self._lock:
+            if self._claim(user_id, [(flight_id, seat_number)], time.monotonic()):
+                return None
+            return self._holds[flight_id][seat_number]
+
+    def release(self, seats: list, user_id: int = None, booked: bool = False) -> int:
+        """Drop the holds on `seats` (only the user's own, if user_id is given).
+
+        booked=True counts them as turned into bookings. Returns how many were dropped.
+        """
+        released = 0
+        with self._lock:
+            for flight_id, seat_number in seats:
+                flight_holds = self._holds.get(flight_id)
+                hold = flight_holds and flight_holds.get(seat_number)
+                if hold is None or (user_id is not None and hold.user_id != user_id):
+                    continue
+                del flight_holds[seat_number]
+                if not flight_holds:
+                    del self._holds[flight_id]
+                released += 1
+            if booked:
+                self.converted += released
+        return released
+
+    def holds_for(self, flight_id: int) -> list:
+        """Live holds on one flight"""
+        with self._lock:
+            self._expire(time.monotonic())
+            return list(self._holds.get(flight_id, {}).values())
+
+    def user_hold_count(self, flight_id: int, user_id: int) -> int:
+        return sum(1 for hold in self.holds_for(flight_id) if hold.user_id == user_id)
+
+    def stats(self) -> dict:
+        with self._lock:
+            self._expire(time.monotonic())
+            return {
+                "ttl_seconds": self.ttl_seconds,
+                "live": sum(len(seats) for seats in self._holds.values()),
+                "flights": len(self._holds),
+                "converted": self.converted,
+                "expired": self.expired,
+            }
+
+
+# Shared instance used by the flight and booking controllers
+seat_holds = SeatHoldStore()
@@ -0,0 +1,53 @@
+# =============================================================================
+# SEAT INVENTORY - Atomic seat counters for flights
+# =============================================================================
+# Seat counts on FlightModel are only ever changed with a single conditional
+# UPDATE statement. The database checks and decrements in one step, so two
+# parallel bookings can never both take the last seat on a flight.
+
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from models.flight import FlightModel
+
+SEAT_INDEX = "uq_bookings_live_seat"
+
+# Which FlightModel column holds the seat counter for each seat class
+SEAT_COLUMNS = {
+    "economy": FlightModel.available_economy_seats,
+    "business": FlightModel.available_business_seats,
+}
+
+
+def reserve_seat(db: Session, flight_id: int, seat_class: str, count: int = 1) -> bool:
+    """Take `count` seats of the given class. Returns False (and takes none) if too few are left."""
+    column = SEAT_COLUMNS[seat_class]
+    # UPDATE flights SET available = available - :count WHERE id = ? AND available >= :count
+    updated = db.query(FlightModel).filter(
+        FlightModel.id == flight_id,
+        column >= count
+    ).update({column: column - count}, synchronize_session=False)
+    return updated == 1
+
+
+def release_seat(db: Session, flight_id: int, seat_class: str, count: int = 1) -> None:
+    """Give `count` seats of the given class back to the flight"""
+    column = SEAT_COLUMNS.get(seat_class)
+    if column is None:
+        return
+    db.query(FlightModel).filter(FlightModel.id == flight_id).update(
+        {column: column + count}, synchronize_session=False
+    )
+
+
+def is_seat_conflict(error: IntegrityError) -> bool:
+    """True if a failed booking insert broke uq_bookings_live_seat (the seat has a live booking).
+
+    Any other unique constraint, like a repeated booking reference, is a
+    different problem and must not be reported as a taken seat.
+    """
+    diag = getattr(error.orig, "diag", None)  # Postgres names the constraint
+    if diag is not None and getattr(diag, "constraint_name", None):
+        return diag.constraint_name == SEAT_INDEX
+    # SQLite lists the columns instead: "UNIQUE constraint failed: bookings.flight_id, bookings.seat_number"
+    message = str(error.orig)
+    return SEAT_INDEX in message or "bookings.flight_id, bookings.seat_number" in message
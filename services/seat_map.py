@@ -0,0 +1,194 @@
+# =============================================================================
+# SEAT MAP - In-memory per-flight seat bitmap
+# =============================================================================
+# Keeps one bit per seat for every flight that has been looked at recently, so
+# the seat map screen and the "Seat already taken" check don't have to scan the
+# bookings table. Maps are built lazily from the database on a cache miss and
+# kept up to date by the booking endpoints after each successful commit.
+#
+# The bitmap is only a fast path. The uq_bookings_live_seat index on bookings is
+# still what guarantees a seat is never sold twice, so a map that is briefly out
+# of date (e.g. another worker booked the seat) can never cause a double booking.
+
+import base64
+import math
+import string
+import threading
+import time
+
+from sqlalchemy.orm import Session
+from models.aircraft import AircraftModel
+from models.booking import BookingModel, LIVE_BOOKING_STATUSES
+from models.flight import FlightModel
+from data.gulf_air_fleet_info import get_seat_configuration
+
+# Maps older than this are rebuilt from the database on the next read, which
+# picks up bookings made by other worker processes.
+SEAT_MAP_TTL_SECONDS = 30
+
+# Seat letters used for each cabin width (airlines skip I and J)
+ROW_LETTERS = {
+    4: "ACDF",
+    6: "ABCDEF",
+    9: "ABCDEFGHK",
+}
+
+
+def seats_per_row(layout: str) -> int:
+    """Turn a layout like "3-3-3" into the number of seats in a row (9)"""
+    return sum(int(part) for part in layout.split("-"))
+
+
+class SeatMap:
+    """Bitmap of taken seats for one flight, one bit per (row, letter)"""
+
+    def __init__(self, rows: int, letters: str):
+        self.rows = rows
+        self.letters = letters
+        self.bits = bytearray(math.ceil(rows * len(letters) / 8))
+        # Seat labels that don't fit the cabin grid (e.g. typed in by hand)
+        self.extra = set()
+        self.built_at = time.monotonic()
+
+    def _index(self, seat_number: str):
+        """Bit position for a seat label like "12A", or None if it isn't on the grid"""
+        row, letter = seat_number[:-1], seat_number[-1:]
+        if not row.isdigit() or letter not in self.letters:
+            return None
+        row = int(row)
+        if row < 1 or row > self.rows:
+            return None
+        return (row - 1) * len(self.letters) + self.letters.index(letter)
+
+    def is_taken(self, seat_number: str) -> bool:
+        index = self._index(seat_number)
+        if index is None:
+            return seat_number in self.extra
+        return bool(self.bits[index >> 3] & (0x80 >> (index & 7)))
+
+    def set_taken(self, seat_number: str, taken: bool) -> None:
+        index = self._index(seat_number)
+        if index is None:
+            if taken:
+                self.extra.add(seat_number)
+            else:
+                self.extra.discard(seat_number)
+        elif taken:
+            self.bits[index >> 3] |= 0x80 >> (index & 7)
+        else:
+            self.bits[index >> 3] &= ~(0x80 >> (index & 7)) & 0xFF
+
+    def taken_seats(self) -> list:
+        """All taken seat labels, in seat-map order"""
+        seats = []
+        width = len(self.letters)
+        for index in range(self.rows * width):
+            if self.bits[index >> 3] & (0x80 >> (index & 7)):
+                seats.append(f"{index // width + 1}{self.letters[index % width]}")
+        return seats + sorted(self.extra)
+
+    def encode(self, held: list = ()) -> dict:
+        """Compact encoding for the mobile app.
+
+        Bit i of the decoded bitmap is row i // len(letters) + 1, seat letter
+        letters[i % len(letters)], most significant bit of each byte first.
+        "held_bitmap" has the same layout for the `held` seats (seats on hold
+        during someone's checkout, see services/seat_holds.py).
+        """
+        held_bits = bytearray(len(self.bits))
+        for seat_number in held:
+            index = self._index(seat_number)
+            if index is not None:
+                held_bits[index >> 3] |= 0x80 >> (index & 7)
+        return {
+            "rows": self.rows,
+            "letters": self.letters,
+            "bitmap": base64.b64encode(bytes(self.bits)).decode("ascii"),
+            "held_bitmap": base64.b64encode(bytes(held_bits)).decode("ascii"),
+        }
+
+
+class SeatMapCache:
+    """Process-wide store of SeatMaps keyed by flight ID"""
+
+    def __init__(self, ttl_seconds: float = SEAT_MAP_TTL_SECONDS):
+        self.ttl_seconds = ttl_seconds
+        self._maps = {}
+        self._lock = threading.Lock()
+
+    def get(self, db: Session, flight_id: int):
+        """Seat map for a flight, building it from the database on a miss.
+
+        Returns None if the flight doesn't exist.
+        """
+        seat_map = self._maps.get(flight_id)
+        if seat_map is not None and time.monotonic() - seat_map.built_at < self.ttl_seconds:
+            return seat_map
+
+        seat_map = self._build(db, flight_id)
+        with self._lock:
+            if seat_map is None:
+                self._maps.pop(flight_id, None)
+            else:
+                self._maps[flight_id] = seat_map
+        return seat_map
+
+    def _build(self, db: Session, flight_id: int):
+        aircraft = db.query(
+            AircraftModel.aircraft_type,
+            AircraftModel.economy_seats,
+            AircraftModel.business_seats
+        ).join(FlightModel, FlightModel.aircraft_id == AircraftModel.id).filter(
+            FlightModel.id == flight_id
+        ).first()
+        if not aircraft:
+            return None
+
+        # Business rows come first, then economy rows, all on the economy-width grid
+        config = get_seat_configuration(aircraft.aircraft_type)
+        business_width = seats_per_row(config["business"]["layout"])
+        economy_width = seats_per_row(config["economy"]["layout"])
+        rows = (math.ceil((aircraft.business_seats or 0) / business_width)
+                + math.ceil((aircraft.economy_seats or 0) / economy_width))
+        letters = ROW_LETTERS.get(economy_width, string.ascii_uppercase[:economy_width])
+        seat_map = SeatMap(rows, letters)
+
+        booked = db.query(BookingModel.seat_number).filter(
+            BookingModel.flight_id == flight_id,
+            BookingModel.booking_status.in_(LIVE_BOOKING_STATUSES)
+        ).all()
+        for (seat_number,) in booked:
+            if seat_number:
+                seat_map.set_taken(seat_number, True)
+        return seat_map
+
+    def is_taken(self, db: Session, flight_id: int, seat_number: str) -> bool:
+        seat_map = self.get(db, flight_id)
+        return seat_map is not None and seat_map.is_taken(seat_number)
+
+    def mark_taken(self, flight_id: int, seat_number: str) -> None:
+        self._set(flight_id, seat_number, True)
+
+    def mark_free(self, flight_id: int, seat_number: str) -> None:
+        self._set(flight_id, seat_number, False)
+
+    def _set(self, flight_id: int, seat_number: str, taken: bool) -> None:
+        # Flights that aren't cached yet will pick the change up when they're built
+        if not seat_number:
+            return
+        with self._lock:
+            seat_map = self._maps.get(flight_id)
+            if seat_map is not None:
+                seat_map.set_taken(seat_number, taken)
+
+    def invalidate(self, flight_id: int = None) -> None:
+        """Drop one flight's map (or all of them) so it's rebuilt on next use"""
+        with self._lock:
+            if flight_id is None:
+                self._maps.clear()
+            else:
+                self._maps.pop(flight_id, None)
+
+
+# Shared instance used by the flight and booking controllers
+seat_maps = SeatMapCache()
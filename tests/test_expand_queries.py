@@ -0,0 +1,97 @@
+# =============================================================================
+# EXPAND QUERY COUNT - A page of bookings costs the same queries at any size
+# =============================================================================
+# GET /api/bookings loads the nested flight and user only when asked for with
+# ?expand=, in the same query as the bookings (see dependencies/expand.py).
+# These tests count the SQL statements each request runs, so a lazy load
+# creeping back in (one query per booking, an N+1) fails here instead of in
+# production. Run from the project root:
+#     python -m pytest tests
+
+import asyncio
+import os
+import tempfile
+
+import pytest
+
+PAGE_SIZES = (1, 50)
+EXPANSIONS = (None, "flight", "user", "flight,user")
+QUERIES_PER_PAGE = 2  # The total count and the page itself
+
+
+@pytest.fixture(scope="module")
+def app_and_engine():
+    # Point the app at a throwaway database before database.py is imported,
+    # like benchmarks/load.py
+    from config import environment
+    directory = tempfile.mkdtemp()
+    environment.db_URI = f"sqlite:///{os.path.join(directory, 'expand.db')}"
+
+    from database import engine
+    from models.base import Base
+    from migrations import mark_all_applied
+    from data.synthetic import generate
+    import main
+
+    Base.metadata.create_all(bind=engine)
+    mark_all_applied(engine)
+    generate(engine, users=1, flights=10, bookings=max(PAGE_SIZES) + 10)  # Every booking belongs to user 1
+    yield main.app, engine
+    engine.dispose()
+
+
+@pytest.fixture(scope="module")
+def auth(app_and_engine):
+    from database import SessionLocal
+    from models.user import UserModel
+    with SessionLocal() as db:
+        return {"Authorization": f"Bearer {db.get(UserModel, 1).generate_token()}"}
+
+
+def get_counting_statements(app, engine, url: str, headers: dict, params: dict):
+    """GET url through the app, returning the response and the SQL statements it ran"""
+    import httpx
+    from sqlalchemy import event
+
+    statements = []
+
+    def count(connection, cursor, statement, parameters, context, executemany):
+        statements.append(statement)
+
+    async def get():
+        async with httpx.AsyncClient(transport=httpx.ASGITransport(app=app), base_url="http://test") as client:
+            return await client.get(url, headers=headers, params=params)
+
+    event.listen(engine, "before_cursor_execute", count)
+    try:
+        response = asyncio.run(get())
+    finally:
+        event.remove(engine, "before_cursor_execute", count)
+    return response, statements
+
+
+@pytest.mark.parametrize("expand", EXPANSIONS)
+@pytest.mark.parametrize("limit", PAGE_SIZES)
+def test_booking_list_query_count(app_and_engine, auth, expand, limit):
+    app, engine = app_and_engine
+    params = {"limit": limit}
+    if expand:
+        params["expand"] = expand
+    # The first request looks the user up for the auth cache, count the next one
+    get_counting_statements(app, engine, "/api/bookings", auth, params)
+    response, statements = get_counting_statements(app, engine, "/api/bookings", auth, params)
+
+    assert response.status_code == 200
+    bookings = response.json()
+    assert len(bookings) == limit
+    assert len(statements) == QUERIES_PER_PAGE, statements
+
+    expanded = set(expand.split(",")) if expand else set()
+    for booking in bookings:
+        for name in ("flight", "user"):
+            if name in expanded:
+                assert booking[name] is not None
+            else:
+                assert booking[name] is None  # Not expanded, not loaded
+    if "flight" in expanded:
+        assert all(booking["flight"]["id"] == booking["flight_id"] for booking in bookings)